@@ -1,17 +1,63 @@
 import logging
+import threading
+import time
 from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
 from flasgger import Swagger
 from config import load_config
 from utils.logging_config import configure_logging
+from utils.json_provider import FastJSONProvider
+from extensions import db, limiter, migrate, warm_up_db
 from routes.routes import routes_bp
+from routes.health import health_bp
+from routes.webhooks import webhooks_bp
+from services import hubspot_sync, job_queue, hubspot_async, metrics
+from services.hubspot_client import hubspot_client
+import services.rate_limit_storage  # registers the db:// rate limit storage
+
+_startup_lock = threading.Lock()
+
+def start_services(app):
+    """Per-process startup: warms the DB pool and starts the configured background threads.
+
+    Runs on the first request (or earlier, from a server's post-fork hook) rather
+    than in create_app, so a preloading master never opens connections or threads
+    that its forked workers would inherit. Later calls are no-ops.
+    """
+    with _startup_lock:
+        if app.extensions.get("services_started"):
+            return
+        app.extensions["services_started"] = True
+
+    warm_up_db(app, app.config["DB_POOL_WARMUP"])
+    hubspot_sync.start(app)
+    job_queue.start(app)
+
+def stop_services(app, timeout=30):
+    """Drains this process before it exits; /healthz reports 503 from here on.
+
+    Background threads finish their current unit of work, in-flight HubSpot calls
+    get until ``timeout`` seconds to complete, then the HTTP and DB pools close.
+    """
+    app.extensions["services_stopping"] = True
+    deadline = time.monotonic() + timeout
+
+    def remaining():
+        return max(0, deadline - time.monotonic())
+
+    job_queue.stop(remaining())
+    hubspot_sync.stop(remaining())
+    if not hubspot_client.in_flight.wait_idle(remaining()):
+        logging.warning(f"{hubspot_client.in_flight.count} HubSpot calls still running at shutdown")
+    hubspot_client.close()
+    hubspot_async.shutdown(remaining())
+    with app.app_context():
+        db.engine.dispose()
 
 def create_app(env_name=None):
     
     app = Flask(__name__)
+    app.json = FastJSONProvider(app)
 
-    db = SQLAlchemy()
-    
     # Load config from environment
     config_obj = load_config(env_name)
     app.config.from_object(config_obj)
@@ -22,10 +68,14 @@ def create_app(env_name=None):
 
     logging.info("Creating Flask app with environment: %s", env_name)
 
-    # Initialize DB
-    db.init_app(app)    
+    # First, so its request hooks also time requests other extensions reject
+    metrics.init_app(app)
+
+    # Initialize DB and the Flask-Migrate commands (flask db upgrade, ...)
+    db.init_app(app)
+    migrate.init_app(app, db)
+    limiter.init_app(app)
 
-    
     # Configure Swagger
     app.config['SWAGGER'] = {
         "title": "HubSpot CRM Integration API",
@@ -40,6 +90,17 @@ def create_app(env_name=None):
         return " Project is running!"
     
     app.register_blueprint(routes_bp)
+    limiter.exempt(health_bp)  # probes must never be throttled
+    app.register_blueprint(health_bp)
+    limiter.exempt(webhooks_bp)  # HubSpot's delivery rate follows our CRM's change volume
+    app.register_blueprint(webhooks_bp)
+    hubspot_sync.init_app(app)
+    job_queue.init_app(app)
+
+    @app.before_request
+    def ensure_services_started():
+        start_services(app)
+
     return app
 
 app = create_app()
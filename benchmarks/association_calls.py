@@ -0,0 +1,54 @@
+"""Compares upstream call counts for per-record vs batched association lookups.
+
+Run from the repository root::
+
+    python -m benchmarks.association_calls --contacts 300
+"""
+import argparse
+import os
+from utils.logging_config import configure_logging
+
+configure_logging("WARNING")
+
+from benchmarks.fake_hubspot import FakeHubSpot  # noqa: E402
+
+
+def per_record_deals(hubspot_client, contact_ids):
+    """The pre-batching access pattern: one association call and one read per deal, per contact."""
+    contacts = {}
+    for contact_id in contact_ids:
+        response = hubspot_client.get(f"/crm/v4/objects/contacts/{contact_id}/associations/deals")
+        deal_ids = [str(item["toObjectId"]) for item in response.json().get("results", [])]
+        contacts[contact_id] = [
+            hubspot_client.post("/crm/v3/objects/deals/batch/read", json={"inputs": [{"id": deal_id}]}).json()
+            for deal_id in deal_ids
+        ]
+    return contacts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--contacts", type=int, default=300)
+    parser.add_argument("--deals-per-contact", type=int, default=2)
+    args = parser.parse_args()
+
+    with FakeHubSpot(contacts=args.contacts, deals_per_contact=args.deals_per_contact) as fake:
+        # Config is read at import time, so point it at the fake before loading the clients
+        os.environ["HUBSPOT_API_BASE_URL"] = fake.url
+        os.environ.pop("HUBSPOT_OAUTH_TOKEN_URL", None)
+        os.environ["CRM_CACHE_BACKEND"] = "none"
+        from services.hubspot_client import hubspot_client
+        from services.hubspot_async import resolve_associations, run_sync
+
+        contact_ids = sorted(fake.contacts, key=int)
+
+        per_record_deals(hubspot_client, contact_ids)
+        print(f"per-record: {fake.total_calls} calls {dict(fake.calls)}")
+
+        fake.reset_calls()
+        run_sync(lambda client: resolve_associations(client, "contacts", "deals", contact_ids))
+        print(f"batched:    {fake.total_calls} calls {dict(fake.calls)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+"""In-process fake of the HubSpot endpoints this service talks to.
+
+Every request is counted per route so benchmarks can report how many
+upstream calls an operation costs. Responses can be slowed down (``latency``,
+``jitter``) and a share of API calls answered with HubSpot's secondly-limit 429
+(``throttle_rate``); throttled calls are counted under ``throttled``.
+"""
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class FakeHubSpot:
+    """Serves a synthetic CRM dataset over HTTP on localhost."""
+
+    def __init__(self, contacts=50, deals_per_contact=2, tickets=50, latency=0.0, jitter=0.0,
+                 throttle_rate=0.0, seed=None):
+        self.calls = Counter()
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle_rate = throttle_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+        self._build_dataset(contacts, deals_per_contact, tickets)
+
+    # Dataset ---------------------------------------------------------------
+
+    def _build_dataset(self, contacts, deals_per_contact, tickets):
+        now = int(time.time() * 1000)
+        self.contacts = {}
+        self.deals = {}
+        self.tickets = {}
+        self.contact_deals = {}
+        self.deal_contacts = {}
+        self.ticket_contacts = {}
+        self.ticket_deals = {}
+
+        for vid in range(1, contacts + 1):
+            self.contacts[str(vid)] = {
+                "email": f"contact{vid}@example.com",
+                "firstname": f"First{vid}",
+                "lastname": f"Last{vid}",
+                "phone": f"+1555{vid:07d}",
+                "lastmodifieddate": str(now - vid * 1000),
+            }
+            self.contact_deals[str(vid)] = []
+
+        deal_id = 1000
+        for vid in range(1, contacts + 1):
+            for _ in range(deals_per_contact):
+                deal_id += 1
+                self.deals[str(deal_id)] = {
+                    "dealname": f"Deal {deal_id}",
+                    "amount": str(deal_id * 10),
+                    "dealstage": "appointmentscheduled",
+                    "pipeline": "default",
+                    "createdate": str(now - deal_id * 1000),
+                    "hs_lastmodifieddate": str(now - deal_id * 1000),
+                }
+                self.contact_deals[str(vid)].append(str(deal_id))
+                self.deal_contacts[str(deal_id)] = [str(vid)]
+
+        for ticket_id in range(5000, 5000 + tickets):
+            self.tickets[str(ticket_id)] = {
+                "subject": f"Ticket {ticket_id}",
+                "content": "Synthetic ticket",
+                "hs_pipeline": "0",
+                "hs_pipeline_stage": "1",
+                "hs_ticket_priority": "MEDIUM",
+                "createdate": str(now - ticket_id),
+                "hs_lastmodifieddate": str(now - ticket_id),
+            }
+            if contacts:
+                vid = str(ticket_id % contacts + 1)
+                self.ticket_contacts[str(ticket_id)] = [vid]
+                self.ticket_deals[str(ticket_id)] = self.contact_deals[vid][:1]
+
+    def _store(self, object_type):
+        return {"contacts": self.contacts, "deals": self.deals, "tickets": self.tickets}[object_type]
+
+    def _edges(self, from_type, to_type):
+        if (from_type, to_type) == ("contacts", "deals"):
+            return self.contact_deals
+        if (from_type, to_type) == ("deals", "contacts"):
+            return self.deal_contacts
+        if (from_type, to_type) == ("tickets", "contacts"):
+            return self.ticket_contacts
+        if (from_type, to_type) == ("tickets", "deals"):
+            return self.ticket_deals
+        return {}
+
+    @staticmethod
+    def _v1_properties(properties):
+        return {name: {"value": value} for name, value in properties.items()}
+
+    @staticmethod
+    def _v3_object(object_id, properties, wanted=None):
+        if wanted:
+            properties = {name: value for name, value in properties.items() if name in wanted}
+        return {"id": object_id, "properties": properties, "archived": False}
+
+    # Routes ----------------------------------------------------------------
+
+    def oauth_token(self, params, body):
+        return 200, {"access_token": "fake-access-token", "refresh_token": "fake", "expires_in": 1800}
+
+    def batch_associations(self, params, body, from_type, to_type):
+        edges = self._edges(from_type, to_type)
+        results = [
+            {
+                "from": {"id": item["id"]},
+                "to": [{"toObjectId": int(to_id), "associationTypes": []} for to_id in edges.get(item["id"], [])],
+            }
+            for item in body.get("inputs", [])
+        ]
+        return 200, {"status": "COMPLETE", "results": results}
+
+    def single_associations(self, params, body, from_type, object_id, to_type):
+        edges = self._edges(from_type, to_type)
+        return 200, {"results": [{"toObjectId": int(to_id)} for to_id in edges.get(object_id, [])]}
+
+    def _matches(self, object_type, object_id, properties, flt):
+        name, value = flt["propertyName"], flt["value"]
+        if flt["operator"] == "EQ":
+            if name == "hs_object_id":
+                return object_id == value
+            if name == "associations.contact":
+                return value in self._edges(object_type, "contacts").get(object_id, [])
+            return properties.get(name) == value
+        compare = {"GT": int.__gt__, "GTE": int.__ge__, "LT": int.__lt__, "LTE": int.__le__}[flt["operator"]]
+        return compare(int(properties.get(name, 0)), int(value))
+
+    def search(self, params, body, object_type):
+        store = self._store(object_type)
+        matches = list(store.items())
+        for group in body.get("filterGroups", [])[:1]:
+            for flt in group.get("filters", []):
+                matches = [(oid, props) for oid, props in matches if self._matches(object_type, oid, props, flt)]
+        for sort in reversed(body.get("sorts", [])):
+            matches.sort(key=lambda item: int(item[1].get(sort["propertyName"], 0)),
+                         reverse=sort.get("direction") == "DESCENDING")
+
+        after = int(body.get("after", 0))
+        limit = int(body.get("limit", 10))
+        page = matches[after:after + limit]
+        payload = {
+            "total": len(matches),
+            "results": [self._v3_object(oid, props, body.get("properties")) for oid, props in page],
+        }
+        if after + limit < len(matches):
+            payload["paging"] = {"next": {"after": str(after + limit)}}
+        return 200, payload
+
+    def batch_read(self, params, body, object_type):
+        store = self._store(object_type)
+        wanted = body.get("properties")
+        results = [
+            self._v3_object(item["id"], store[item["id"]], wanted)
+            for item in body.get("inputs", []) if item["id"] in store
+        ]
+        return 200, {"status": "COMPLETE", "results": results}
+
+    def create_or_update_contact(self, params, body, email):
+        properties = {item["property"]: item["value"] for item in body.get("properties", [])}
+        with self._lock:
+            vid = next((vid for vid, props in self.contacts.items() if props.get("email") == email), None)
+            is_new = vid is None
+            if is_new:
+                vid = str(max(map(int, self.contacts), default=0) + 1)
+                self.contacts[vid] = {}
+                self.contact_deals[vid] = []
+            self.contacts[vid].update(properties, lastmodifieddate=str(int(time.time() * 1000)))
+        return 200, {"vid": int(vid), "isNew": is_new}
+
+    def create_deal(self, params, body):
+        properties = {item["name"]: item["value"] for item in body.get("properties", [])}
+        vids = [str(vid) for vid in body.get("associations", {}).get("associatedVids", [])]
+        with self._lock:
+            deal_id = str(max(map(int, self.deals), default=1000) + 1)
+            self.deals[deal_id] = dict(properties, hs_lastmodifieddate=str(int(time.time() * 1000)))
+            self.deal_contacts[deal_id] = vids
+            for vid in vids:
+                self.contact_deals.setdefault(vid, []).append(deal_id)
+        return 200, {"dealId": int(deal_id), "properties": self._v1_properties(self.deals[deal_id])}
+
+    def create_ticket(self, params, body):
+        properties = {item["name"]: item["value"] for item in body.get("properties", [])}
+        with self._lock:
+            ticket_id = str(max(map(int, self.tickets), default=5000) + 1)
+            self.tickets[ticket_id] = dict(properties, hs_lastmodifieddate=str(int(time.time() * 1000)))
+        return 200, {"objectId": int(ticket_id), "properties": self._v1_properties(self.tickets[ticket_id])}
+
+    def batch_write(self, params, body, object_type, mode):
+        store = self._store(object_type)
+        results = []
+        with self._lock:
+            for item in body.get("inputs", []):
+                properties = dict(item.get("properties", {}))
+                properties["hs_lastmodifieddate" if object_type != "contacts" else "lastmodifieddate"] = \
+                    str(int(time.time() * 1000))
+                object_id = None
+                if mode == "upsert":
+                    id_property = item.get("idProperty", "hs_object_id")
+                    object_id = next((oid for oid, props in store.items() if props.get(id_property) == item["id"]), None)
+                is_new = object_id is None
+                if is_new:
+                    object_id = str(max(map(int, store), default=0) + 1)
+                    store[object_id] = {}
+                    if object_type == "contacts":
+                        self.contact_deals[object_id] = []
+                store[object_id].update(properties)
+                result = self._v3_object(object_id, store[object_id])
+                result["new"] = is_new
+                if "objectWriteTraceId" in item:
+                    result["objectWriteTraceId"] = item["objectWriteTraceId"]
+                results.append(result)
+        return 201 if mode == "create" else 200, {"status": "COMPLETE", "results": results}
+
+    ROUTES = [
+        ("POST", r"/oauth/v1/token", "oauth_token"),
+        ("POST", r"/crm/v4/associations/(\w+)/(\w+)/batch/read", "batch_associations"),
+        ("GET", r"/crm/v4/objects/(\w+)/(\w+)/associations/(\w+)", "single_associations"),
+        ("POST", r"/crm/v3/objects/(\w+)/batch/read", "batch_read"),
+        ("POST", r"/crm/v3/objects/(\w+)/search", "search"),
+        ("POST", r"/crm/v3/objects/(\w+)/batch/(create|upsert)", "batch_write"),
+        ("POST", r"/contacts/v1/contact/createOrUpdate/email/([^/]+)", "create_or_update_contact"),
+        ("POST", r"/deals/v1/deal", "create_deal"),
+        ("POST", r"/crm-objects/v1/objects/tickets", "create_ticket"),
+    ]
+
+    def _throttled(self, path):
+        if not self.throttle_rate or path == "/oauth/v1/token":
+            return False
+        with self._lock:
+            throttled = self._random.random() < self.throttle_rate
+            if throttled:
+                self.calls["throttled"] += 1
+        return throttled
+
+    def dispatch(self, method, path, params, body):
+        delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            time.sleep(delay)
+        if self._throttled(path):
+            return 429, {"status": "error", "message": "You have reached your secondly limit.",
+                         "errorType": "RATE_LIMIT", "policyName": "SECONDLY"}
+        for route_method, pattern, handler in self.ROUTES:
+            match = re.fullmatch(pattern, path)
+            if route_method == method and match:
+                with self._lock:
+                    self.calls[handler] += 1
+                return getattr(self, handler)(params, body, *match.groups())
+        return 404, {"status": "error", "message": f"No fake route for {method} {path}"}
+
+    # Server lifecycle ------------------------------------------------------
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def total_calls(self):
+        return sum(self.calls.values())
+
+    def reset_calls(self):
+        with self._lock:
+            self.calls.clear()
+
+    def start(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _handle(self, method):
+                parsed = urlparse(self.path)
+                params = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                try:
+                    body = json.loads(raw) if raw else {}
+                except ValueError:
+                    body = {}
+                status, payload = fake.dispatch(method, parsed.path, params, body)
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._handle("GET")
+
+            def do_POST(self):
+                self._handle("POST")
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,135 @@
+"""Load-tests the API with HubSpot replaced by the local fake.
+
+Needs a migrated scratch database (the DB_* settings, then ``flask db upgrade``);
+the POST scenarios write to it. Run from the repository root::
+
+    python -m benchmarks.load --scenario new-crm-objects --requests 500 --concurrency 8 --latency 50
+    python -m benchmarks.load --throttle-rate 0.05
+
+Prints throughput, latency percentiles and upstream HubSpot calls per request.
+"""
+import argparse
+import os
+import statistics
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from utils.logging_config import configure_logging
+
+configure_logging("WARNING")
+
+from benchmarks.fake_hubspot import FakeHubSpot  # noqa: E402
+
+
+def contact_body(n, context):
+    return {"email": f"load-{uuid.uuid4().hex[:12]}@example.com", "firstname": "Load", "lastname": str(n),
+            "phone": "+15550000000"}
+
+
+def deal_body(n, context):
+    return {"dealname": f"Load deal {n}", "amount": 100 + n, "dealstage": "appointmentscheduled",
+            "contact_id": context["contact_id"]}
+
+
+def ticket_body(n, context):
+    return {"subject": f"Load ticket {n}", "description": "Load test", "category": "general_inquiry",
+            "pipeline": "0", "hs_ticket_priority": "MEDIUM", "hs_pipeline_stage": "1",
+            "contact_id": context["contact_id"]}
+
+
+# name -> (method, path, body builder)
+SCENARIOS = {
+    "new-crm-objects": ("GET", "/api/v1/new-crm-objects?limit=20", None),
+    "post-contacts": ("POST", "/api/v1/contacts", contact_body),
+    "post-deals": ("POST", "/api/v1/deals", deal_body),
+    "post-tickets": ("POST", "/api/v1/tickets", ticket_body),
+}
+
+
+def run_scenario(app, fake, name, requests, concurrency):
+    """Sends ``requests`` requests from ``concurrency`` threads and returns the measurements."""
+    method, path, build_body = SCENARIOS[name]
+    context = {}
+    if name in ("post-deals", "post-tickets"):
+        # Deals and tickets reference an existing contact by its HubSpot ID
+        contact = app.test_client().post("/api/v1/contacts", json=contact_body(0, {})).get_json()
+        context["contact_id"] = int(contact["hubspot_id"])
+
+    local = threading.local()
+    latencies = []
+    statuses = Counter()
+    lock = threading.Lock()
+
+    def send(n):
+        if not hasattr(local, "client"):
+            local.client = app.test_client()
+        body = build_body(n, context) if build_body else None
+        started = time.perf_counter()
+        response = local.client.open(path, method=method, json=body)
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            statuses[response.status_code] += 1
+
+    fake.reset_calls()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(send, range(requests)))
+    elapsed = time.perf_counter() - started
+
+    percentiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "throughput": requests / elapsed,
+        "p50": percentiles[49] * 1000,
+        "p95": percentiles[94] * 1000,
+        "p99": percentiles[98] * 1000,
+        "upstream": (fake.total_calls - fake.calls["throttled"]) / requests,
+        "throttled": fake.calls["throttled"],
+        "statuses": dict(sorted(statuses.items())),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", choices=list(SCENARIOS) + ["all"], default="all")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--contacts", type=int, default=200)
+    parser.add_argument("--deals-per-contact", type=int, default=2)
+    parser.add_argument("--tickets", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0, help="ms added to every fake HubSpot response")
+    parser.add_argument("--jitter", type=float, default=0, help="up to this many random ms on top of --latency")
+    parser.add_argument("--throttle-rate", type=float, default=0, help="share of API calls answered with 429")
+    parser.add_argument("--read-source", choices=["hubspot", "db"], default="hubspot")
+    parser.add_argument("--cache", default="none", help="CRM_CACHE_BACKEND for the run")
+    args = parser.parse_args()
+
+    with FakeHubSpot(
+        contacts=args.contacts, deals_per_contact=args.deals_per_contact, tickets=args.tickets,
+        latency=args.latency / 1000, jitter=args.jitter / 1000, throttle_rate=args.throttle_rate, seed=0,
+    ) as fake:
+        # Config is read at import time, so point it at the fake before loading the app
+        os.environ["HUBSPOT_API_BASE_URL"] = fake.url
+        os.environ.pop("HUBSPOT_OAUTH_TOKEN_URL", None)
+        os.environ["CRM_READ_SOURCE"] = args.read_source
+        os.environ["CRM_CACHE_BACKEND"] = args.cache
+        from app import app
+        from extensions import limiter
+
+        # Measure the service, not our own inbound rate limits
+        limiter.enabled = False
+
+        names = list(SCENARIOS) if args.scenario == "all" else [args.scenario]
+        for name in names:
+            result = run_scenario(app, fake, name, args.requests, args.concurrency)
+            print(
+                f"{name:<16} {result['throughput']:8.1f} req/s"
+                f"  p50 {result['p50']:7.1f} ms  p95 {result['p95']:7.1f} ms  p99 {result['p99']:7.1f} ms"
+                f"  upstream {result['upstream']:5.2f}/req  throttled {result['throttled']}  {result['statuses']}"
+            )
+
+
+if __name__ == "__main__":
+    main()
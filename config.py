@@ -20,22 +20,125 @@ class BaseConfig:
     SQLALCHEMY_DATABASE_URI = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Connection pool, per process
+    DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 10))
+    DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 20))
+    DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 30))
+    DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", 1800))
+    DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "true").lower() == "true"
+    DB_POOL_WARMUP = int(os.environ.get("DB_POOL_WARMUP", 1))  # connections opened when a worker starts
+    # Server-side cap on any single statement, in milliseconds (0 disables it)
+    DB_STATEMENT_TIMEOUT = int(os.environ.get("DB_STATEMENT_TIMEOUT", 30000))
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "connect_args": {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT}"},
+    }
+
     # Hubspot Rate Limit
     HUBSPOT_MAX_RETRIES = int(os.environ.get("HUBSPOT_MAX_RETRIES", 3))
     HUBSPOT_BACKOFF_FACTOR = float(os.environ.get("HUBSPOT_BACKOFF_FACTOR", 2.0))
     HUBSPOT_BACKOFF_MULTIPLIER = float(os.environ.get("HUBSPOT_BACKOFF_MULTIPLIER", 1.0))
+    # Client-side budget until HubSpot's X-HubSpot-RateLimit-* headers say otherwise
+    HUBSPOT_RATE_LIMIT = int(os.environ.get("HUBSPOT_RATE_LIMIT", 100))
+    HUBSPOT_RATE_LIMIT_INTERVAL = float(os.environ.get("HUBSPOT_RATE_LIMIT_INTERVAL", 10))
+
+    # Inbound rate limits (Flask-Limiter), counted per API client. "db://" keeps the
+    # windows in Postgres so every worker and replica enforces one shared limit;
+    # "memory://" is per process, "redis://host:6379" needs the redis package
+    RATELIMIT_STORAGE_URI = os.environ.get("RATELIMIT_STORAGE_URI", "db://")
+    RATELIMIT_STRATEGY = os.environ.get("RATELIMIT_STRATEGY", "moving-window")
+    RATELIMIT_CLIENT_HEADER = os.environ.get("RATELIMIT_CLIENT_HEADER", "X-API-Key")  # falls back to the remote address
+    RATELIMIT_DEFAULT = os.environ.get("RATELIMIT_DEFAULT", "200 per day;50 per hour")
+    RATELIMIT_API = os.environ.get("RATELIMIT_API", "50 per hour")  # /api/v1 routes
+    RATELIMIT_WRITE = os.environ.get("RATELIMIT_WRITE", "5 per minute")  # each POST route
+    # Fleet-wide cap on requests that call HubSpot, so all replicas together stay within
+    # the HubSpot budget; a batch request counts once per HUBSPOT_BATCH_SIZE chunk
+    RATELIMIT_HUBSPOT = os.environ.get(
+        "RATELIMIT_HUBSPOT", f"{HUBSPOT_RATE_LIMIT} per {int(HUBSPOT_RATE_LIMIT_INTERVAL)} seconds"
+    )
+    RATELIMIT_HEADERS_ENABLED = True
+    # If the storage is unreachable, limit per process in memory instead of failing requests
+    RATELIMIT_SWALLOW_ERRORS = True
+    RATELIMIT_IN_MEMORY_FALLBACK_ENABLED = True
 
     # HubSpot OAuth
     HUBSPOT_CLIENT_ID = os.environ.get("HUBSPOT_CLIENT_ID", "")
     HUBSPOT_CLIENT_SECRET = os.environ.get("HUBSPOT_CLIENT_SECRET", "")
     HUBSPOT_REFRESH_TOKEN = os.environ.get("HUBSPOT_REFRESH_TOKEN", "")
-    HUBSPOT_OAUTH_TOKEN_URL = "https://api.hubapi.com/oauth/v1/token"
-    HUBSPOT_API_BASE_URL = "https://api.hubapi.com"
+    # Point both at a local fake (see benchmarks/) to run without the real API
+    HUBSPOT_API_BASE_URL = os.environ.get("HUBSPOT_API_BASE_URL", "https://api.hubapi.com").rstrip("/")
+    HUBSPOT_OAUTH_TOKEN_URL = os.environ.get("HUBSPOT_OAUTH_TOKEN_URL", f"{HUBSPOT_API_BASE_URL}/oauth/v1/token")
+
+    # Webhooks: POST /api/v1/webhooks/hubspot verifies the v3 signature with HUBSPOT_CLIENT_SECRET.
+    # Set HUBSPOT_WEBHOOK_URL to the public target URL when a proxy rewrites the request URL.
+    HUBSPOT_WEBHOOK_URL = os.environ.get("HUBSPOT_WEBHOOK_URL", "")
+    HUBSPOT_WEBHOOK_MAX_AGE = int(os.environ.get("HUBSPOT_WEBHOOK_MAX_AGE", 300))  # seconds
+    HUBSPOT_WEBHOOK_RETENTION_DAYS = int(os.environ.get("HUBSPOT_WEBHOOK_RETENTION_DAYS", 7))  # eventId dedup window
+
+    # HubSpot HTTP client
+    HUBSPOT_CONNECT_TIMEOUT = float(os.environ.get("HUBSPOT_CONNECT_TIMEOUT", 3.05))
+    HUBSPOT_READ_TIMEOUT = float(os.environ.get("HUBSPOT_READ_TIMEOUT", 10))
+    HUBSPOT_POOL_CONNECTIONS = int(os.environ.get("HUBSPOT_POOL_CONNECTIONS", 10))
+    HUBSPOT_POOL_MAXSIZE = int(os.environ.get("HUBSPOT_POOL_MAXSIZE", 20))
+    # CRM v3/v4 batch endpoints accept up to 100 inputs per call
+    HUBSPOT_BATCH_SIZE = int(os.environ.get("HUBSPOT_BATCH_SIZE", 100))
+    # Items accepted by one POST /<object>/batch request
+    HUBSPOT_BATCH_MAX_ITEMS = int(os.environ.get("HUBSPOT_BATCH_MAX_ITEMS", 1000))
+    HUBSPOT_FALLBACK_CONCURRENCY = int(os.environ.get("HUBSPOT_FALLBACK_CONCURRENCY", 4))
+    # Max in-flight calls on the async client; keep below HubSpot's per-second allowance
+    HUBSPOT_MAX_CONCURRENCY = int(os.environ.get("HUBSPOT_MAX_CONCURRENCY", 10))
+
+    # Local mirror: "db" serves reads from Postgres (kept fresh by `flask sync-hubspot`
+    # or the scheduler), "hubspot" calls the HubSpot API on every request
+    CRM_READ_SOURCE = os.environ.get("CRM_READ_SOURCE", "db")
+    # Seconds between background sync runs; 0 disables the in-process scheduler
+    HUBSPOT_SYNC_INTERVAL = int(os.environ.get("HUBSPOT_SYNC_INTERVAL", 0))
+    CRM_MAX_PAGE_LIMIT = int(os.environ.get("CRM_MAX_PAGE_LIMIT", 100))  # upper bound for ?limit=
+    # With CRM_READ_SOURCE=hubspot, flatten records to {id, <properties>, updated_at};
+    # "false" passes HubSpot's objects through unchanged
+    CRM_COMPACT_RECORDS = os.environ.get("CRM_COMPACT_RECORDS", "true").lower() == "true"
+    CRM_EXPORT_BATCH_SIZE = int(os.environ.get("CRM_EXPORT_BATCH_SIZE", 1000))  # rows per DB fetch in /export
+
+    # Async writes: POST /contacts, /deals and /tickets queue a job and return 202 when
+    # ASYNC_WRITES is on or the caller sends "Prefer: respond-async"
+    ASYNC_WRITES = os.environ.get("ASYNC_WRITES", "false").lower() == "true"
+    JOB_WORKER_THREADS = int(os.environ.get("JOB_WORKER_THREADS", 0))  # in-process workers; 0 = use `flask run-job-worker`
+    JOB_POLL_INTERVAL = float(os.environ.get("JOB_POLL_INTERVAL", 1))
+    JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", 5))
+    JOB_VISIBILITY_TIMEOUT = int(os.environ.get("JOB_VISIBILITY_TIMEOUT", 300))  # reclaim "running" jobs after this
+
+    # POSTs sent with an Idempotency-Key header are answered once and replayed for IDEMPOTENCY_TTL
+    # seconds. A duplicate that arrives while the first is running waits up to IDEMPOTENCY_WAIT_TIMEOUT;
+    # a first request still unfinished after IDEMPOTENCY_LOCK_TIMEOUT is presumed dead
+    IDEMPOTENCY_TTL = int(os.environ.get("IDEMPOTENCY_TTL", 86400))
+    IDEMPOTENCY_WAIT_TIMEOUT = float(os.environ.get("IDEMPOTENCY_WAIT_TIMEOUT", 30))
+    IDEMPOTENCY_LOCK_TIMEOUT = int(os.environ.get("IDEMPOTENCY_LOCK_TIMEOUT", 120))
+
+    # Cache in front of the HubSpot feed fetchers: "memory" (per process), "file" (shared
+    # by workers on a host via CRM_CACHE_DIR) or "none"
+    CRM_CACHE_BACKEND = os.environ.get("CRM_CACHE_BACKEND", "memory")
+    CRM_CACHE_TTL = float(os.environ.get("CRM_CACHE_TTL", 60))
+    CRM_CACHE_MAX_ENTRIES = int(os.environ.get("CRM_CACHE_MAX_ENTRIES", 128))
+    CRM_CACHE_DIR = os.environ.get("CRM_CACHE_DIR", "/tmp/hubspot_crm_cache")
+    # Concurrent cache misses for the same feed share one HubSpot fetch: "process" (across
+    # threads), "host" (also across workers, through lock files in CRM_CACHE_DIR; needs the
+    # file backend so the others can read the result) or "off"
+    CRM_SINGLE_FLIGHT = os.environ.get("CRM_SINGLE_FLIGHT", "process")
+    # Seconds a contact/deal/ticket association list read from HubSpot is served from the
+    # crm_associations table before it is read again; 0 disables the store
+    CRM_ASSOCIATION_TTL = int(os.environ.get("CRM_ASSOCIATION_TTL", 3600))
 
     # Local in-memory store of the currently valid access token
-    HUBSPOT_ACCESS_TOKEN = None
+    HUBSPOT_ACCESS_TOKEN = os.environ.get("HUBSPOT_ACCESS_TOKEN") or None
     HUBSPOT_TOKEN_EXPIRES_AT = float(os.environ.get("HUBSPOT_TOKEN_EXPIRES_AT", 0))
     TOKEN_REFRESH_BUFFER = float(os.environ.get("TOKEN_REFRESH_BUFFER", 60))
+    # Optional JSON file shared by all workers on a host; empty keeps the token per-process
+    HUBSPOT_TOKEN_STORE_PATH = os.environ.get("HUBSPOT_TOKEN_STORE_PATH", "")
+    HUBSPOT_TOKEN_BACKGROUND_REFRESH = os.environ.get("HUBSPOT_TOKEN_BACKGROUND_REFRESH", "true").lower() == "true"
 
 
 class DevelopmentConfig(BaseConfig):
@@ -45,7 +148,11 @@ class DevelopmentConfig(BaseConfig):
 class TestingConfig(BaseConfig):
     TESTING = True
     TEST_DB_NAME = os.environ.get("TEST_DB_NAME", "hubspot_crm_db_test")
-    SQLALCHEMY_DATABASE_URI = f"postgresql://{BaseConfig.DB_USER}:{BaseConfig.DB_PASSWORD}@{BaseConfig.DB_HOST}:{BaseConfig.DB_PORT}/{TEST_DB_NAME}"
+    SQLALCHEMY_DATABASE_URI = os.environ.get("TEST_DATABASE_URL") or (
+        f"postgresql://{BaseConfig.DB_USER}:{BaseConfig.DB_PASSWORD}@{BaseConfig.DB_HOST}:{BaseConfig.DB_PORT}/{TEST_DB_NAME}"
+    )
+    RATELIMIT_ENABLED = False
+    HUBSPOT_TOKEN_BACKGROUND_REFRESH = False
 
 
 class ProductionConfig(BaseConfig):
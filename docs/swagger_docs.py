@@ -3,23 +3,80 @@
 # Swagger documentation for GET /new-crm-objects
 NEW_CRM_OBJECTS_GET = {
     "tags": ["CRM Objects"],
-    "description": "Fetches new contacts, deals, and tickets with pagination support.",
+    "description": "Fetches new contacts, deals, and tickets with cursor pagination and filters.",
     "parameters": [
         {
-            "name": "page",
+            "name": "limit",
             "in": "query",
             "type": "integer",
             "required": False,
-            "default": 1,
-            "description": "Page number for pagination."
+            "default": 10,
+            "description": "Number of items per object type, capped at CRM_MAX_PAGE_LIMIT."
         },
         {
-            "name": "limit",
+            "name": "contacts_cursor",
+            "in": "query",
+            "type": "string",
+            "required": False,
+            "description": "pagination.next_cursors.contacts from the previous response."
+        },
+        {
+            "name": "deals_cursor",
+            "in": "query",
+            "type": "string",
+            "required": False,
+            "description": "pagination.next_cursors.deals from the previous response."
+        },
+        {
+            "name": "tickets_cursor",
+            "in": "query",
+            "type": "string",
+            "required": False,
+            "description": "pagination.next_cursors.tickets from the previous response."
+        },
+        {
+            "name": "since",
+            "in": "query",
+            "type": "string",
+            "required": False,
+            "description": "Only objects modified at or after this time (epoch milliseconds or ISO-8601)."
+        },
+        {
+            "name": "dealstage",
+            "in": "query",
+            "type": "string",
+            "required": False,
+            "description": "Only deals in this stage."
+        },
+        {
+            "name": "pipeline",
+            "in": "query",
+            "type": "string",
+            "required": False,
+            "description": "Only deals and tickets in this pipeline."
+        },
+        {
+            "name": "hubspot_contact_id",
             "in": "query",
             "type": "integer",
             "required": False,
-            "default": 10,
-            "description": "Number of items per page."
+            "description": "Only the contact with this HubSpot ID and the deals and tickets associated with it."
+        },
+        {
+            "name": "include",
+            "in": "query",
+            "type": "string",
+            "required": False,
+            "description": "Comma-separated object types to return and/or 'associations' to embed related objects "
+                           "(e.g. 'tickets' or 'deals,associations'). Default: all types with associations."
+        },
+        {
+            "name": "fields",
+            "in": "query",
+            "type": "string",
+            "required": False,
+            "description": "Comma-separated fields to return, e.g. 'email,deals.amount'. Bare names apply to every "
+                           "type; with CRM_READ_SOURCE=hubspot they are requested as HubSpot properties."
         }
     ],
     "responses": {
@@ -95,15 +152,23 @@ NEW_CRM_OBJECTS_GET = {
                     "pagination": {
                         "type": "object",
                         "properties": {
-                            "page": {"type": "integer"},
                             "limit": {"type": "integer"},
-                            "total_contacts": {"type": "integer"},
-                            "total_deals": {"type": "integer"},
-                            "total_tickets": {"type": "integer"}
+                            "next_cursors": {
+                                "type": "object",
+                                "description": "Cursor for the next page of each object type; null on its last page.",
+                                "properties": {
+                                    "contacts": {"type": "string"},
+                                    "deals": {"type": "string"},
+                                    "tickets": {"type": "string"}
+                                }
+                            }
                         }
                     }
                 }
             }
+        },
+        400: {
+            "description": "Invalid limit, cursor, filter, include or fields."
         }
     }
 }
@@ -127,6 +192,13 @@ CONTACTS_POST = {
                 },
                 "required": ["email", "firstname", "lastname", "phone"]
             }
+        },
+        {
+            "name": "Prefer",
+            "in": "header",
+            "required": False,
+            "type": "string",
+            "description": "Send respond-async to queue the write and get 202 with a job ID."
         }
     ],
     "responses": {
@@ -140,11 +212,15 @@ CONTACTS_POST = {
                     "firstname": {"type": "string"},
                     "lastname": {"type": "string"},
                     "phone": {"type": "string"},
+                    "warning": {"type": "string", "description": "Set when only HubSpot stored the write"},
                     "created_at": {"type": "string", "format": "date-time"},
                     "updated_at": {"type": "string", "format": "date-time"}
                 }
             }
         },
+        202: {
+            "description": "Queued (ASYNC_WRITES is on or the request sent Prefer: respond-async); poll the Location header."
+        },
         400: {
             "description": "Missing required fields."
         },
@@ -169,10 +245,17 @@ DEALS_POST = {
                     "dealname": {"type": "string"},
                     "amount": {"type": "number"},
                     "dealstage": {"type": "string"},
-                    "contact_id": {"type": "integer"}
+                    "contact_id": {"type": "integer", "description": "HubSpot contact ID"}
                 },
                 "required": ["dealname", "amount", "dealstage", "contact_id"]
             }
+        },
+        {
+            "name": "Prefer",
+            "in": "header",
+            "required": False,
+            "type": "string",
+            "description": "Send respond-async to queue the write and get 202 with a job ID."
         }
     ],
     "responses": {
@@ -185,12 +268,16 @@ DEALS_POST = {
                     "dealname": {"type": "string"},
                     "amount": {"type": "number"},
                     "dealstage": {"type": "string"},
-                    "contact_id": {"type": "integer"},
+                    "contact_id": {"type": "integer", "description": "Local contact ID, null until synced"},
+                    "warning": {"type": "string", "description": "Set when only HubSpot stored the write"},
                     "created_at": {"type": "string", "format": "date-time"},
                     "updated_at": {"type": "string", "format": "date-time"}
                 }
             }
         },
+        202: {
+            "description": "Queued (ASYNC_WRITES is on or the request sent Prefer: respond-async); poll the Location header."
+        },
         400: {
             "description": "Missing required fields."
         },
@@ -218,10 +305,11 @@ TICKETS_POST = {
                     "pipeline": {"type": "string"},
                     "hs_ticket_priority": {"type": "string"},
                     "hs_pipeline_stage": {"type": "string"},
-                    "contact_id": {"type": "integer"},
+                    "contact_id": {"type": "integer", "description": "HubSpot contact ID"},
                     "deal_ids": {
                         "type": "array",
-                        "items": {"type": "integer"}
+                        "items": {"type": "integer"},
+                        "description": "HubSpot deal IDs"
                     }
                 },
                 "required": [
@@ -229,6 +317,13 @@ TICKETS_POST = {
                     "hs_ticket_priority", "hs_pipeline_stage", "contact_id"
                 ]
             }
+        },
+        {
+            "name": "Prefer",
+            "in": "header",
+            "required": False,
+            "type": "string",
+            "description": "Send respond-async to queue the write and get 202 with a job ID."
         }
     ],
     "responses": {
@@ -244,16 +339,20 @@ TICKETS_POST = {
                     "pipeline": {"type": "string"},
                     "hs_ticket_priority": {"type": "string"},
                     "hs_pipeline_stage": {"type": "string"},
-                    "contact_id": {"type": "integer"},
+                    "contact_id": {"type": "integer", "description": "Local contact ID, null until synced"},
                     "deal_ids": {
                         "type": "array",
                         "items": {"type": "integer"}
                     },
+                    "warning": {"type": "string", "description": "Set when only HubSpot stored the write"},
                     "created_at": {"type": "string", "format": "date-time"},
                     "updated_at": {"type": "string", "format": "date-time"}
                 }
             }
         },
+        202: {
+            "description": "Queued (ASYNC_WRITES is on or the request sent Prefer: respond-async); poll the Location header."
+        },
         400: {
             "description": "Missing required fields."
         },
@@ -261,4 +360,307 @@ TICKETS_POST = {
             "description": "Failed to create ticket."
         }
     }
-}
\ No newline at end of file
+}
+
+
+def _batch_doc(tag, description, item_properties, required):
+    """Builds the Swagger spec for a POST /<object>/batch endpoint."""
+    return {
+        "tags": [tag],
+        "description": description,
+        "parameters": [
+            {
+                "name": "body",
+                "in": "body",
+                "required": True,
+                "schema": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": item_properties,
+                        "required": required
+                    }
+                }
+            }
+        ],
+        "responses": {
+            201: {
+                "description": "Every item was written to HubSpot and the database.",
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "results": {
+                            "type": "array",
+                            "items": {
+                                "type": "object",
+                                "properties": {
+                                    "index": {"type": "integer"},
+                                    "status": {"type": "string", "enum": ["created", "updated", "invalid", "error"]},
+                                    "data": {"type": "object"},
+                                    "errors": {"type": "object"},
+                                    "error": {"type": "string"},
+                                    "applied": {
+                                        "type": "boolean",
+                                        "description": "false when HubSpot certainly did not apply the item"
+                                    }
+                                }
+                            }
+                        },
+                        "succeeded": {"type": "integer"},
+                        "failed": {"type": "integer"}
+                    }
+                }
+            },
+            207: {
+                "description": "Some items failed; see the per-item results."
+            },
+            400: {
+                "description": "Body is not a non-empty array, has too many items, or every item is invalid."
+            }
+        }
+    }
+
+
+# Swagger documentation for POST /contacts/batch
+CONTACTS_BATCH_POST = _batch_doc(
+    "Contacts",
+    "Creates or updates contacts (matched on email) through HubSpot's batch upsert API, 100 per call.",
+    CONTACTS_POST["parameters"][0]["schema"]["properties"],
+    CONTACTS_POST["parameters"][0]["schema"]["required"],
+)
+
+# Swagger documentation for POST /deals/batch
+DEALS_BATCH_POST = _batch_doc(
+    "Deals",
+    "Creates deals through HubSpot's batch create API, 100 per call.",
+    DEALS_POST["parameters"][0]["schema"]["properties"],
+    DEALS_POST["parameters"][0]["schema"]["required"],
+)
+
+# Swagger documentation for POST /tickets/batch
+TICKETS_BATCH_POST = _batch_doc(
+    "Tickets",
+    "Creates support tickets through HubSpot's batch create API, 100 per call.",
+    TICKETS_POST["parameters"][0]["schema"]["properties"],
+    TICKETS_POST["parameters"][0]["schema"]["required"],
+)
+
+# Every write route accepts an Idempotency-Key
+IDEMPOTENCY_KEY_HEADER = {
+    "name": "Idempotency-Key",
+    "in": "header",
+    "required": False,
+    "type": "string",
+    "description": "Unique per write (e.g. a UUID). Retries with the same key and body get the first response "
+                   "back, with Idempotent-Replayed: true, for IDEMPOTENCY_TTL seconds."
+}
+for _doc in (CONTACTS_POST, DEALS_POST, TICKETS_POST, CONTACTS_BATCH_POST, DEALS_BATCH_POST, TICKETS_BATCH_POST):
+    _doc["parameters"].append(IDEMPOTENCY_KEY_HEADER)
+    _doc["responses"].update({
+        409: {"description": "A request with this Idempotency-Key is still in progress; retry after Retry-After."},
+        422: {"description": "The Idempotency-Key was already used with a different request."},
+    })
+
+# Swagger documentation for GET /jobs/<job_id>
+JOBS_GET = {
+    "tags": ["Jobs"],
+    "description": "Reports the status of a write queued by POST /contacts, /deals or /tickets.",
+    "parameters": [
+        {"name": "job_id", "in": "path", "type": "string", "required": True}
+    ],
+    "responses": {
+        200: {
+            "description": "Job status. result holds the saved object once status is succeeded.",
+            "schema": {
+                "type": "object",
+                "properties": {
+                    "id": {"type": "string"},
+                    "kind": {"type": "string", "enum": ["contact", "deal", "ticket"]},
+                    "status": {"type": "string", "enum": ["pending", "running", "succeeded", "failed"]},
+                    "attempts": {"type": "integer"},
+                    "coalesced_into": {"type": "string"},
+                    "result": {"type": "object"},
+                    "error": {"type": "string"},
+                    "created_at": {"type": "string", "format": "date-time"},
+                    "updated_at": {"type": "string", "format": "date-time"}
+                }
+            }
+        },
+        404: {
+            "description": "Job not found."
+        }
+    }
+}
+
+
+def _list_doc(tag, object_type, description):
+    """GET /<object_type> takes the /new-crm-objects parameters, with a single ``cursor``."""
+    parameters = [
+        parameter for parameter in NEW_CRM_OBJECTS_GET["parameters"]
+        if not parameter["name"].endswith("_cursor") and parameter["name"] != "include"
+    ]
+    parameters += [
+        {
+            "name": "cursor",
+            "in": "query",
+            "type": "string",
+            "required": False,
+            "description": "pagination.next_cursor from the previous response."
+        },
+        {
+            "name": "include",
+            "in": "query",
+            "type": "string",
+            "required": False,
+            "description": "'associations' to embed related objects."
+        }
+    ]
+    return {
+        "tags": [tag],
+        "description": description,
+        "parameters": parameters,
+        "responses": {
+            200: {
+                "description": f"One page of {object_type}.",
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "results": NEW_CRM_OBJECTS_GET["responses"][200]["schema"]["properties"][object_type],
+                        "pagination": {
+                            "type": "object",
+                            "properties": {
+                                "limit": {"type": "integer"},
+                                "next_cursor": {"type": "string", "description": "Null on the last page."}
+                            }
+                        }
+                    }
+                }
+            },
+            400: {
+                "description": "Invalid limit, cursor, filter, include or fields."
+            }
+        }
+    }
+
+
+# Swagger documentation for GET /contacts
+CONTACTS_GET = _list_doc("Contacts", "contacts", "Lists contacts, newest changes first, without the other object types.")
+
+# Swagger documentation for GET /deals
+DEALS_GET = _list_doc("Deals", "deals", "Lists deals, newest changes first, without the other object types.")
+
+# Swagger documentation for GET /tickets
+TICKETS_GET = _list_doc("Tickets", "tickets", "Lists support tickets, newest changes first, without the other object types.")
+
+
+# Swagger documentation for POST /webhooks/hubspot
+HUBSPOT_WEBHOOK_POST = {
+    "tags": ["Webhooks"],
+    "description": "HubSpot webhook target. Verifies the v3 signature, skips already processed eventIds "
+                   "and applies the changes to the local contacts, deals and tickets tables.",
+    "parameters": [
+        {
+            "name": "body",
+            "in": "body",
+            "required": True,
+            "schema": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "eventId": {"type": "integer"},
+                        "subscriptionType": {"type": "string", "example": "contact.propertyChange"},
+                        "objectId": {"type": "integer"},
+                        "propertyName": {"type": "string"},
+                        "propertyValue": {"type": "string"},
+                        "occurredAt": {"type": "integer"}
+                    }
+                }
+            }
+        },
+        {"name": "X-HubSpot-Signature-v3", "in": "header", "type": "string", "required": True},
+        {"name": "X-HubSpot-Request-Timestamp", "in": "header", "type": "string", "required": True}
+    ],
+    "responses": {
+        200: {
+            "description": "Events applied.",
+            "schema": {
+                "type": "object",
+                "properties": {
+                    "received": {"type": "integer"},
+                    "duplicates": {"type": "integer"},
+                    "updated": {"type": "integer"},
+                    "fetched": {"type": "integer"}
+                }
+            }
+        },
+        400: {"description": "Body is not an array of HubSpot events."},
+        401: {"description": "Missing, invalid or expired signature."},
+        500: {"description": "Events could not be applied; HubSpot retries the delivery."}
+    }
+}
+
+EXPORT_GET = {
+    "tags": ["CRM Objects"],
+    "description": "Streams every contact, deal or ticket as newline-delimited JSON, one object per line. "
+                   "Sent gzip-compressed when the request has Accept-Encoding: gzip.",
+    "produces": ["application/x-ndjson"],
+    "parameters": [
+        {
+            "name": "object_type",
+            "in": "path",
+            "type": "string",
+            "enum": ["contacts", "deals", "tickets"],
+            "required": True
+        },
+        {
+            "name": "since",
+            "in": "query",
+            "type": "string",
+            "required": False,
+            "description": "Only objects modified at or after this time (epoch milliseconds or ISO-8601)."
+        },
+        {
+            "name": "dealstage",
+            "in": "query",
+            "type": "string",
+            "required": False,
+            "description": "Only deals in this stage. Not available with CRM_READ_SOURCE=hubspot."
+        },
+        {
+            "name": "pipeline",
+            "in": "query",
+            "type": "string",
+            "required": False,
+            "description": "Only deals and tickets in this pipeline. Not available with CRM_READ_SOURCE=hubspot."
+        },
+        {
+            "name": "hubspot_contact_id",
+            "in": "query",
+            "type": "integer",
+            "required": False,
+            "description": "Only the contact with this HubSpot ID and its deals and tickets. "
+                           "Not available with CRM_READ_SOURCE=hubspot."
+        },
+        {
+            "name": "fields",
+            "in": "query",
+            "type": "string",
+            "required": False,
+            "description": "Comma-separated fields to return, e.g. 'email,firstname'."
+        },
+        {
+            "name": "max_records",
+            "in": "query",
+            "type": "integer",
+            "required": False,
+            "description": "Stop after this many records (default: no cap)."
+        }
+    ],
+    "responses": {
+        200: {"description": "One JSON object per line, in id order (modification order from HubSpot)."},
+        400: {"description": "Invalid filter or field."},
+        404: {"description": "Unknown object type."},
+        500: {"description": "HubSpot could not be read."}
+    }
+}
@@ -0,0 +1,50 @@
+import hashlib
+import logging
+from flask import current_app, request
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
+from flask_migrate import Migrate
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+# Flask extensions are created once here and bound in app.create_app(), so models,
+# services and the app all share the same instances.
+db = SQLAlchemy()
+migrate = Migrate()
+
+
+def api_client_key():
+    """Rate limit key: the caller's API client header (hashed), else its remote address.
+
+    Keying on the client rather than the IP keeps clients behind one proxy or NAT
+    from sharing a budget, and one client spread over many hosts from multiplying it.
+    """
+    client = request.headers.get(current_app.config["RATELIMIT_CLIENT_HEADER"])
+    if client:
+        return "client:" + hashlib.sha256(client.encode()).hexdigest()[:32]
+    return "ip:" + get_remote_address()
+
+
+# Limits, strategy and storage come from the RATELIMIT_* settings in config.py
+limiter = Limiter(key_func=api_client_key)
+
+
+def warm_up_db(app, connections=1):
+    """Opens ``connections`` pooled connections and pings them so the first requests skip the connect.
+
+    A database that is not reachable yet is logged, not raised; pool_pre_ping
+    recovers the connections once it is.
+    """
+    opened = []
+    with app.app_context():
+        try:
+            for _ in range(connections):
+                connection = db.engine.connect()
+                opened.append(connection)
+                connection.execute(text("SELECT 1"))
+        except SQLAlchemyError as e:
+            logging.warning(f"Database warm-up failed: {str(e)}")
+        finally:
+            for connection in opened:
+                connection.close()
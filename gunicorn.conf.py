@@ -0,0 +1,71 @@
+import multiprocessing
+import os
+import shutil
+
+# Production serving profile: `gunicorn -c gunicorn.conf.py`.
+#
+# The app spends most of a request waiting on HubSpot, so each worker process
+# runs a pool of threads ("gthread"): a slow upstream call ties up one thread,
+# not the whole worker. gevent is not used because the token refresh lock,
+# the async HubSpot client's event-loop thread and psycopg2 all rely on real
+# threads. Keep DB_POOL_SIZE + DB_MAX_OVERFLOW >= GUNICORN_THREADS.
+
+wsgi_app = "app:app"
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+
+worker_class = "gthread"
+workers = int(os.environ.get("GUNICORN_WORKERS", multiprocessing.cpu_count()))
+threads = int(os.environ.get("GUNICORN_THREADS", 8))
+# Pending connections the kernel queues for us beyond what threads are serving
+backlog = int(os.environ.get("GUNICORN_BACKLOG", 2048))
+
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 60))
+# How long a stopping worker may keep serving in-flight requests and draining HubSpot calls
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))
+
+# Recycle workers periodically to bound memory growth; jitter avoids synchronized restarts
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 0))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", 0))
+
+# Import the app once in the master so workers fork with it loaded. create_app()
+# opens no connections or threads, so nothing unsafe is inherited.
+preload_app = os.environ.get("GUNICORN_PRELOAD", "true").lower() == "true"
+
+# Metrics: each worker writes its samples under PROMETHEUS_MULTIPROC_DIR and /metrics sums
+# them. Files left by a previous run would be summed too, so start from an empty directory.
+# This file is read before the app is imported, which is when the first samples are written.
+multiproc_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+if multiproc_dir:
+    shutil.rmtree(multiproc_dir, ignore_errors=True)
+    os.makedirs(multiproc_dir, exist_ok=True)
+
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG", "-")
+errorlog = "-"
+loglevel = os.environ.get("LOG_LEVEL", "info").lower()
+
+
+def post_fork(server, worker):
+    """Warms the DB pool and starts background threads in each worker, before it takes traffic.
+
+    Every worker starts a HUBSPOT_SYNC_INTERVAL scheduler thread, but they share
+    one Postgres advisory lock (hubspot_sync.SchedulerLease): only the worker
+    holding it runs the sync, across all workers and replicas on the database.
+    If that worker exits, Postgres frees the lock and another worker takes over
+    on its next tick. It keeps one pooled DB connection for as long as it holds the lock.
+    """
+    from app import app, start_services
+    start_services(app)
+
+
+def worker_exit(server, worker):
+    """Drains background jobs and in-flight HubSpot calls before the worker process exits."""
+    from app import app, stop_services
+    # In-flight requests have already used part of graceful_timeout, after which the master kills us
+    stop_services(app, timeout=graceful_timeout / 2)
+
+
+def child_exit(server, worker):
+    """Removes the exited worker's live gauges (in-flight counts) from /metrics."""
+    from services.metrics import mark_process_dead
+    mark_process_dead(worker.pid)
@@ -1,11 +1,14 @@
 from datetime import datetime
-from flask_sqlalchemy import SQLAlchemy
-
-db = SQLAlchemy()
+from extensions import db
 
 class Contact(db.Model):
     """Model for storing HubSpot contacts."""
     __tablename__ = "contacts"
+    __table_args__ = (
+        # Keyset pagination order, newest changes first
+        db.Index("ix_contacts_updated_at_id", "updated_at", "id"),
+        db.Index("ix_contacts_created_at", "created_at"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     hubspot_id = db.Column(db.String(50), unique=True, nullable=False)
@@ -22,13 +25,23 @@ class Contact(db.Model):
 class Deal(db.Model):
     """Model for storing HubSpot deals."""
     __tablename__ = "deals"
+    __table_args__ = (
+        # Keyset pagination order, newest changes first
+        db.Index("ix_deals_updated_at_id", "updated_at", "id"),
+        db.Index("ix_deals_created_at", "created_at"),
+        db.Index("ix_deals_contact_id", "contact_id"),
+        db.Index("ix_deals_dealstage", "dealstage"),
+        db.Index("ix_deals_pipeline", "pipeline"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     hubspot_id = db.Column(db.String(50), unique=True, nullable=False)
     dealname = db.Column(db.String(120), nullable=False)
     amount = db.Column(db.Float, nullable=False)
     dealstage = db.Column(db.String(80), nullable=False)
-    contact_id = db.Column(db.Integer, db.ForeignKey("contacts.id"), nullable=False)
+    pipeline = db.Column(db.String(50))
+    # Nullable so deals synced from HubSpot without an associated contact can be stored
+    contact_id = db.Column(db.Integer, db.ForeignKey("contacts.id"), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -40,6 +53,15 @@ class Deal(db.Model):
 class Ticket(db.Model):
     """Model for storing HubSpot support tickets."""
     __tablename__ = "tickets"
+    __table_args__ = (
+        # Keyset pagination order, newest changes first
+        db.Index("ix_tickets_updated_at_id", "updated_at", "id"),
+        db.Index("ix_tickets_created_at", "created_at"),
+        db.Index("ix_tickets_contact_id", "contact_id"),
+        db.Index("ix_tickets_pipeline", "pipeline"),
+        # Answers "tickets for deal X" (deal_ids @> ARRAY[X]) without a scan
+        db.Index("ix_tickets_deal_ids", "deal_ids", postgresql_using="gin"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     hubspot_id = db.Column(db.String(50), unique=True, nullable=False)
@@ -49,12 +71,142 @@ class Ticket(db.Model):
     pipeline = db.Column(db.String(50), nullable=False)
     hs_ticket_priority = db.Column(db.String(50), nullable=False)
     hs_pipeline_stage = db.Column(db.String(50), nullable=False)
-    contact_id = db.Column(db.Integer, db.ForeignKey("contacts.id"), nullable=False)
-    deal_ids = db.Column(db.ARRAY(db.Integer))  # Array of associated deal IDs
+    # Nullable so tickets synced from HubSpot without an associated contact can be stored
+    contact_id = db.Column(db.Integer, db.ForeignKey("contacts.id"), nullable=True)
+    deal_ids = db.Column(db.ARRAY(db.BigInteger))  # HubSpot IDs of the associated deals; they outgrow int32
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     contact = db.relationship("Contact", backref=db.backref("tickets", lazy=True))
 
     def __repr__(self):
-        return f"<Ticket {self.subject}>"
\ No newline at end of file
+        return f"<Ticket {self.subject}>"
+
+class SyncState(db.Model):
+    """Per-object-type high-water mark for the incremental HubSpot sync."""
+    __tablename__ = "sync_state"
+
+    object_type = db.Column(db.String(20), primary_key=True)
+    high_water_mark = db.Column(db.BigInteger, nullable=False, default=0)  # lastmodifieddate in epoch ms
+    last_run_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f"<SyncState {self.object_type} {self.high_water_mark}>"
+
+class Job(db.Model):
+    """Queued create/update request processed by the write worker pool."""
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # Workers claim the oldest claimable job per status
+        db.Index("ix_jobs_status_created_at", "status", "created_at"),
+    )
+
+    id = db.Column(db.String(36), primary_key=True)  # uuid4, returned to the caller
+    kind = db.Column(db.String(20), nullable=False)  # "contact", "deal" or "ticket"
+    status = db.Column(db.String(20), nullable=False, default="pending")
+    payload = db.Column(db.JSON, nullable=False)
+    # Jobs sharing a key (same email / same deal) are merged and written once
+    coalesce_key = db.Column(db.String(255), index=True)
+    coalesced_into = db.Column(db.String(36))
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    run_after = db.Column(db.DateTime)  # retry backoff; NULL means runnable now
+    # Set once HubSpot accepted the write; retries then only repeat the database step
+    hubspot_id = db.Column(db.String(50))
+    result = db.Column(db.JSON)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<Job {self.id} {self.kind} {self.status}>"
+
+class WebhookEvent(db.Model):
+    """HubSpot webhook event already applied; HubSpot redelivers events, so each eventId is processed once."""
+    __tablename__ = "webhook_events"
+
+    event_id = db.Column(db.BigInteger, primary_key=True)
+    subscription_type = db.Column(db.String(64), nullable=False)
+    object_id = db.Column(db.String(50))
+    occurred_at = db.Column(db.BigInteger)  # epoch ms, as sent by HubSpot
+    received_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f"<WebhookEvent {self.event_id} {self.subscription_type}>"
+
+class RateLimitHit(db.Model):
+    """One admitted request in a moving-window rate limit, shared by every worker."""
+    __tablename__ = "rate_limit_hits"
+    __table_args__ = (
+        db.Index("ix_rate_limit_hits_key_hit_at", "key", "hit_at"),
+    )
+
+    id = db.Column(db.BigInteger, primary_key=True)
+    key = db.Column(db.String(255), nullable=False)
+    amount = db.Column(db.Integer, nullable=False, default=1)
+    hit_at = db.Column(db.Float, nullable=False)  # epoch seconds
+    expires_at = db.Column(db.Float, nullable=False, index=True)  # hit_at + window, for pruning
+
+    def __repr__(self):
+        return f"<RateLimitHit {self.key} {self.hit_at}>"
+
+class RateLimitCounter(db.Model):
+    """Fixed-window rate limit counter, shared by every worker."""
+    __tablename__ = "rate_limit_counters"
+
+    key = db.Column(db.String(255), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    expires_at = db.Column(db.Float, nullable=False)  # epoch seconds
+
+    def __repr__(self):
+        return f"<RateLimitCounter {self.key} {self.count}>"
+
+class CrmAssociation(db.Model):
+    """A HubSpot association between two CRM objects, by HubSpot ID.
+
+    Each edge is stored once, pointing from the earlier to the later type in
+    contacts -> deals -> tickets; the reverse index serves lookups the other way.
+    """
+    __tablename__ = "crm_associations"
+    __table_args__ = (
+        db.Index("ix_crm_associations_reverse", "to_type", "to_id", "from_type"),
+    )
+
+    from_type = db.Column(db.String(20), primary_key=True)
+    from_id = db.Column(db.String(50), primary_key=True)
+    to_type = db.Column(db.String(20), primary_key=True)
+    to_id = db.Column(db.String(50), primary_key=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<CrmAssociation {self.from_type}:{self.from_id} -> {self.to_type}:{self.to_id}>"
+
+class AssociationRefresh(db.Model):
+    """When an object's complete set of associations to one type was last read from HubSpot."""
+    __tablename__ = "crm_association_refreshes"
+
+    object_type = db.Column(db.String(20), primary_key=True)
+    object_id = db.Column(db.String(50), primary_key=True)
+    to_type = db.Column(db.String(20), primary_key=True)
+    refreshed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<AssociationRefresh {self.object_type}:{self.object_id} -> {self.to_type} {self.refreshed_at}>"
+
+class IdempotencyKey(db.Model):
+    """An API client's ``Idempotency-Key`` on a write route, and the response to replay for it."""
+    __tablename__ = "idempotency_keys"
+
+    client = db.Column(db.String(80), primary_key=True)  # rate limit client key, so clients can't see each other's keys
+    key = db.Column(db.String(255), primary_key=True)
+    fingerprint = db.Column(db.String(64), nullable=False)  # sha256 of method, path and body
+    status = db.Column(db.String(20), nullable=False, default="processing")  # "processing" or "completed"
+    response_status = db.Column(db.Integer)
+    response_body = db.Column(db.Text)
+    response_headers = db.Column(db.JSON)
+    # A request still "processing" after this is presumed dead and its key can be retried
+    locked_until = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<IdempotencyKey {self.key} {self.status}>"
@@ -0,0 +1,35 @@
+from flask import Blueprint, current_app, jsonify
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from extensions import db
+from services.hubspot_auth import token_manager
+from services.metrics import metrics_response
+import logging
+
+health_bp = Blueprint("health", __name__)
+
+@health_bp.route("/healthz", methods=["GET"])
+def healthz():
+    """Readiness probe: 200 when the database answers and HubSpot auth is usable, 503 otherwise."""
+    checks = {"token": token_manager.health()}
+    try:
+        db.session.execute(text("SELECT 1"))
+        checks["database"] = {"state": "ok"}
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        logging.error(f"Health check database error: {str(e)}")
+        checks["database"] = {"state": "error"}
+
+    draining = current_app.extensions.get("services_stopping", False)
+    ready = (
+        not draining
+        and checks["database"]["state"] == "ok"
+        and checks["token"]["state"] != "refresh_failed"
+    )
+    body = {"status": "draining" if draining else "ok" if ready else "unavailable", "checks": checks}
+    return jsonify(body), 200 if ready else 503
+
+@health_bp.route("/metrics", methods=["GET"])
+def metrics():
+    """Prometheus scrape endpoint."""
+    return metrics_response()
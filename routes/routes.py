@@ -1,55 +1,188 @@
-from flask import Blueprint, jsonify, request
-from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
+import math
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context, url_for
 from flasgger import swag_from
-from docs.swagger_docs import NEW_CRM_OBJECTS_GET, CONTACTS_POST, DEALS_POST, TICKETS_POST
-from services.hubspot_data import get_new_contacts, get_new_deals, get_new_tickets
-from services.hubspot_api import create_or_update_contact, create_or_update_deal, create_support_ticket
+from extensions import limiter
+from docs.swagger_docs import (
+    NEW_CRM_OBJECTS_GET, CONTACTS_GET, DEALS_GET, TICKETS_GET, CONTACTS_POST, DEALS_POST, TICKETS_POST,
+    CONTACTS_BATCH_POST, DEALS_BATCH_POST, TICKETS_BATCH_POST, JOBS_GET, EXPORT_GET,
+)
+from services.hubspot_async import load_crm_pages
+from services.crm_store import read_new_crm_objects
+from services.crm_export import export_batches, ndjson_chunks
+from services.pagination import (
+    CRM_OBJECT_TYPES, parse_fields, parse_include, parse_limit, parse_max_records, read_filters,
+)
+from services.hubspot_api import (
+    CONTACT_FIELDS, DEAL_FIELDS, TICKET_FIELDS, HubSpotWriteError,
+    create_or_update_contact, create_or_update_deal, create_support_ticket,
+)
+from services.job_queue import enqueue_job, get_job, job_status
+from services.hubspot_batch import batch_write
+from services.idempotency import REPLAYED_HEADER, allow_retry, idempotent
 import logging
 
 routes_bp = Blueprint("routes", __name__, url_prefix='/api/v1')
 
-# Initialize Flask-Limiter
-limiter = Limiter(
-    key_func=get_remote_address,  # Rate limit by client IP address
-    default_limits=["200 per day", "50 per hour"]  # Default rate limits
+def api_limit():
+    return current_app.config["RATELIMIT_API"]
+
+def write_limit():
+    return current_app.config["RATELIMIT_WRITE"]
+
+def hubspot_budget():
+    return current_app.config["RATELIMIT_HUBSPOT"]
+
+def skips_hubspot():
+    """Reads served from the local mirror and queued writes don't spend the HubSpot budget."""
+    if request.method == "GET":
+        return current_app.config["CRM_READ_SOURCE"] == "db"
+    return wants_async()
+
+def hubspot_calls():
+    """Cost of a request against the HubSpot budget: one per batch chunk, otherwise one."""
+    items = request.get_json(silent=True)
+    if request.path.endswith("/batch") and isinstance(items, list):
+        return max(1, math.ceil(len(items) / current_app.config["HUBSPOT_BATCH_SIZE"]))
+    return 1
+
+def reached_hubspot(response):
+    """Only requests that got past validation and the per-client limits, and weren't replayed, are charged."""
+    return response.status_code not in (400, 429) and REPLAYED_HEADER not in response.headers
+
+# Apply rate limiting to all routes in this Blueprint, per API client
+limiter.limit(api_limit)(routes_bp)
+
+# One bucket for the whole fleet, shared by every route that calls HubSpot
+hubspot_limit = limiter.shared_limit(
+    hubspot_budget, scope="hubspot", key_func=lambda: "fleet",
+    exempt_when=skips_hubspot, deduct_when=reached_hubspot, override_defaults=False, cost=hubspot_calls,
 )
 
-# Apply rate limiting to all routes in this Blueprint
-routes_bp = limiter.limit("50 per hour")(routes_bp)
+def conditional_json(payload):
+    """Returns ``payload`` as JSON with an ETag, or an empty 304 if it matches If-None-Match."""
+    response = jsonify(payload)
+    response.add_etag()
+    return response.make_conditional(request)
+
+def wants_async():
+    """Writes are queued when ASYNC_WRITES is on or the caller sends ``Prefer: respond-async``."""
+    return current_app.config["ASYNC_WRITES"] or "respond-async" in request.headers.get("Prefer", "")
+
+def accepted_job(kind, payload):
+    """Queues ``payload`` as a ``kind`` job and answers 202 with where to poll for it."""
+    job = enqueue_job(kind, payload)
+    if job is None:
+        allow_retry()
+        return jsonify({"error": f"Failed to queue {kind}"}), 500
+
+    response = jsonify(job_status(job))
+    response.status_code = 202
+    response.headers["Location"] = url_for("routes.get_job_status", job_id=job.id)
+    response.headers["Preference-Applied"] = "respond-async"
+    return response
+
+def crm_query(default_types, default_associations):
+    """Parses the read parameters shared by the CRM list endpoints; raises ValueError on bad input."""
+    object_types, associations = parse_include(request.args.get("include"), default_types)
+    return {
+        "limit": parse_limit(request.args.get("limit"), 10, current_app.config["CRM_MAX_PAGE_LIMIT"]),
+        "filters": read_filters(request.args),
+        "object_types": object_types,
+        "fields": parse_fields(request.args.get("fields"), object_types),
+        "associations": default_associations if associations is None else associations,
+    }
+
+def read_crm_objects(cursors, query):
+    """Reads one page per requested object type from the configured source."""
+    if current_app.config["CRM_READ_SOURCE"] == "db":
+        return read_new_crm_objects(cursors, **query)
+    # Object types are searched concurrently on the async HubSpot client
+    return load_crm_pages(cursors, **query)
 
 @routes_bp.route("/new-crm-objects", methods=["GET"])
 @swag_from(NEW_CRM_OBJECTS_GET)
+@hubspot_limit
 def get_new_crm_objects():
-    """Fetches new contacts, deals, and tickets with pagination support."""
-    page = int(request.args.get("page", 1))
-    limit = int(request.args.get("limit", 10))
-
-    contacts = get_new_contacts()
-    deals = get_new_deals()
-    tickets = get_new_tickets()
-
-    def paginate(data):
-        start = (page - 1) * limit
-        end = start + limit
-        return data[start:end] if data else []
-
-    return jsonify({
-        "contacts": paginate(contacts),
-        "deals": paginate(deals),
-        "tickets": paginate(tickets),
+    """Fetches one page of contacts, deals and tickets, each with its own cursor."""
+    try:
+        query = crm_query(CRM_OBJECT_TYPES, True)
+        cursors = {object_type: request.args.get(f"{object_type}_cursor") for object_type in query["object_types"]}
+        payload = read_crm_objects(cursors, query)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return conditional_json(payload)
+
+def list_objects(object_type):
+    """Serves one page of a single object type; associations are only expanded on request."""
+    try:
+        payload = read_crm_objects({object_type: request.args.get("cursor")}, crm_query((object_type,), False))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return conditional_json({
+        "results": payload[object_type],
         "pagination": {
-            "page": page,
-            "limit": limit,
-            "total_contacts": len(contacts) if contacts else 0,
-            "total_deals": len(deals) if deals else 0,
-            "total_tickets": len(tickets) if tickets else 0,
+            "limit": payload["pagination"]["limit"],
+            "next_cursor": payload["pagination"]["next_cursors"][object_type],
         }
-    }), 200
+    })
+
+@routes_bp.route("/contacts", methods=["GET"])
+@swag_from(CONTACTS_GET)
+@hubspot_limit
+def list_contacts():
+    """Lists contacts, newest changes first."""
+    return list_objects("contacts")
+
+@routes_bp.route("/deals", methods=["GET"])
+@swag_from(DEALS_GET)
+@hubspot_limit
+def list_deals():
+    """Lists deals, newest changes first."""
+    return list_objects("deals")
+
+@routes_bp.route("/tickets", methods=["GET"])
+@swag_from(TICKETS_GET)
+@hubspot_limit
+def list_tickets():
+    """Lists support tickets, newest changes first."""
+    return list_objects("tickets")
+
+@routes_bp.route("/export/<object_type>", methods=["GET"])
+@swag_from(EXPORT_GET)
+@hubspot_limit
+def export_objects(object_type):
+    """Streams every matching record as newline-delimited JSON, gzipped when the client accepts it."""
+    if object_type not in CRM_OBJECT_TYPES:
+        return jsonify({"error": f"Unknown object type: {object_type}"}), 404
+    try:
+        filters = read_filters(request.args)
+        fields = parse_fields(request.args.get("fields"), (object_type,)).get(object_type)
+        max_records = parse_max_records(request.args.get("max_records"))
+        batches = export_batches(object_type, filters, fields, current_app.config["CRM_READ_SOURCE"],
+                                 current_app.config["CRM_EXPORT_BATCH_SIZE"], max_records)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if batches is None:
+        return jsonify({"error": f"Failed to export {object_type}"}), 500
+
+    compress = request.accept_encodings.quality("gzip") > 0
+    response = Response(
+        stream_with_context(ndjson_chunks(batches, current_app.json.dumps, compress)),
+        mimetype="application/x-ndjson",
+    )
+    response.headers["Content-Disposition"] = f"attachment; filename={object_type}.ndjson"
+    response.headers["Vary"] = "Accept-Encoding"
+    if compress:
+        response.headers["Content-Encoding"] = "gzip"
+    return response
 
 @routes_bp.route("/contacts", methods=["POST"])
 @swag_from(CONTACTS_POST)
-@limiter.limit("5 per minute") 
+@limiter.limit(write_limit)
+@hubspot_limit
+@idempotent
 def create_update_contact():
     """Create or update a contact in HubSpot and save to the database."""
     data = request.json
@@ -61,15 +194,24 @@ def create_update_contact():
     if not all([email, firstname, lastname, phone]):
         return jsonify({"error": "Missing required fields"}), 400
 
-    result = create_or_update_contact(email, firstname, lastname, phone, **data)
-    if not result:
+    if wants_async():
+        return accepted_job("contact", data)
+
+    extra = {key: value for key, value in data.items() if key not in CONTACT_FIELDS}
+    try:
+        result = create_or_update_contact(email, firstname, lastname, phone, **extra)
+    except HubSpotWriteError as e:
+        if not e.applied:
+            allow_retry()
         return jsonify({"error": "Failed to create/update contact"}), 500
 
     return jsonify(result), 201
 
 @routes_bp.route("/deals", methods=["POST"])
 @swag_from(DEALS_POST)
-@limiter.limit("5 per minute") 
+@limiter.limit(write_limit)
+@hubspot_limit
+@idempotent
 def create_update_deal():
     """Create or update a deal in HubSpot and save to the database."""
     data = request.json
@@ -81,15 +223,24 @@ def create_update_deal():
     if not all([dealname, amount, dealstage, contact_id]):
         return jsonify({"error": "Missing required fields"}), 400
 
-    result = create_or_update_deal(dealname, amount, dealstage, contact_id, **data)
-    if not result:
+    if wants_async():
+        return accepted_job("deal", data)
+
+    extra = {key: value for key, value in data.items() if key not in DEAL_FIELDS}
+    try:
+        result = create_or_update_deal(dealname, amount, dealstage, contact_id, **extra)
+    except HubSpotWriteError as e:
+        if not e.applied:
+            allow_retry()
         return jsonify({"error": "Failed to create/update deal"}), 500
 
     return jsonify(result), 201
 
 @routes_bp.route("/tickets", methods=["POST"])
 @swag_from(TICKETS_POST)
-@limiter.limit("5 per minute") 
+@limiter.limit(write_limit)
+@hubspot_limit
+@idempotent
 def create_ticket():
     """Create a new support ticket in HubSpot and save to the database."""
     data = request.json
@@ -105,14 +256,85 @@ def create_ticket():
     if not all([subject, description, category, pipeline, hs_ticket_priority, hs_pipeline_stage, contact_id]):
         return jsonify({"error": "Missing required fields"}), 400
 
-    result = create_support_ticket(
-        subject, description, category, pipeline, hs_ticket_priority, hs_pipeline_stage, contact_id, deal_ids, **data
-    )
-    if not result:
+    if wants_async():
+        return accepted_job("ticket", dict(data, deal_ids=deal_ids))
+
+    extra = {key: value for key, value in data.items() if key not in TICKET_FIELDS}
+    try:
+        result = create_support_ticket(
+            subject, description, category, pipeline, hs_ticket_priority, hs_pipeline_stage, contact_id, deal_ids, **extra
+        )
+    except HubSpotWriteError as e:
+        if not e.applied:
+            allow_retry()
         return jsonify({"error": "Failed to create support ticket"}), 500
 
     return jsonify(result), 201
 
+def batch_response(object_type):
+    """Runs a batch write and maps the per-item results to a response status."""
+    items = request.get_json(silent=True)
+    max_items = current_app.config["HUBSPOT_BATCH_MAX_ITEMS"]
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "Request body must be a non-empty JSON array"}), 400
+    if len(items) > max_items:
+        return jsonify({"error": f"At most {max_items} items per request"}), 400
+
+    results = batch_write(object_type, items)
+    succeeded = sum(1 for result in results if result["status"] in ("created", "updated"))
+    invalid = sum(1 for result in results if result["status"] == "invalid")
+    unsent = sum(1 for result in results if result.get("applied") is False)
+    body = {"results": results, "succeeded": succeeded, "failed": len(results) - succeeded}
+    if unsent and unsent + invalid == len(results):
+        # Nothing reached HubSpot, so the same Idempotency-Key may run the batch again
+        allow_retry()
+
+    if succeeded == len(results):
+        return jsonify(body), 201
+    if invalid == len(results):
+        return jsonify(body), 400
+    return jsonify(body), 207
+
+@routes_bp.route("/contacts/batch", methods=["POST"])
+@swag_from(CONTACTS_BATCH_POST)
+@limiter.limit(write_limit)
+@hubspot_limit
+@idempotent
+def batch_upsert_contacts():
+    """Create or update up to HUBSPOT_BATCH_MAX_ITEMS contacts in HubSpot and the database."""
+    return batch_response("contacts")
+
+@routes_bp.route("/deals/batch", methods=["POST"])
+@swag_from(DEALS_BATCH_POST)
+@limiter.limit(write_limit)
+@hubspot_limit
+@idempotent
+def batch_create_deals():
+    """Create up to HUBSPOT_BATCH_MAX_ITEMS deals in HubSpot and the database."""
+    return batch_response("deals")
+
+@routes_bp.route("/tickets/batch", methods=["POST"])
+@swag_from(TICKETS_BATCH_POST)
+@limiter.limit(write_limit)
+@hubspot_limit
+@idempotent
+def batch_create_tickets():
+    """Create up to HUBSPOT_BATCH_MAX_ITEMS support tickets in HubSpot and the database."""
+    return batch_response("tickets")
+
+@routes_bp.route("/jobs/<job_id>", methods=["GET"])
+@swag_from(JOBS_GET)
+def get_job_status(job_id):
+    """Reports the status of a queued write."""
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job_status(job))
+
+
+@routes_bp.app_errorhandler(429)
+def rate_limited(error):
+    return jsonify({"error": f"Rate limit exceeded: {error.description}"}), 429
 
 @routes_bp.app_errorhandler(404)
 def not_found(error):
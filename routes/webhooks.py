@@ -0,0 +1,39 @@
+from flask import Blueprint, current_app, jsonify, request
+from flasgger import swag_from
+from docs.swagger_docs import HUBSPOT_WEBHOOK_POST
+from services.hubspot_webhooks import process_events, verify_signature
+import logging
+
+webhooks_bp = Blueprint("webhooks", __name__, url_prefix="/api/v1/webhooks")
+
+@webhooks_bp.route("/hubspot", methods=["POST"])
+@swag_from(HUBSPOT_WEBHOOK_POST)
+def hubspot_webhook():
+    """Receives HubSpot CRM change events and applies them to the local tables."""
+    config = current_app.config
+    # Behind a proxy request.url is not the address HubSpot signed; HUBSPOT_WEBHOOK_URL is
+    uri = config["HUBSPOT_WEBHOOK_URL"] or request.url
+    if not verify_signature(
+        config["HUBSPOT_CLIENT_SECRET"],
+        request.method,
+        uri,
+        request.get_data(),
+        request.headers.get("X-HubSpot-Request-Timestamp"),
+        request.headers.get("X-HubSpot-Signature-v3"),
+        max_age=config["HUBSPOT_WEBHOOK_MAX_AGE"],
+    ):
+        logging.warning("Rejected HubSpot webhook with an invalid or expired signature")
+        return jsonify({"error": "Invalid signature"}), 401
+
+    events = request.get_json(silent=True)
+    if not isinstance(events, list) or not all(
+        isinstance(event, dict) and "eventId" in event and "subscriptionType" in event for event in events
+    ):
+        return jsonify({"error": "Request body must be a JSON array of HubSpot events"}), 400
+
+    try:
+        result = process_events(events, retention_days=config["HUBSPOT_WEBHOOK_RETENTION_DAYS"])
+    except Exception:
+        # Any non-2xx answer makes HubSpot redeliver the batch
+        return jsonify({"error": "Failed to process events"}), 500
+    return jsonify(result), 200
@@ -16,6 +16,7 @@ class DealSchema(Schema):
     dealname = fields.Str(required=True)
     amount = fields.Float(required=True)
     dealstage = fields.Str(required=True)
+    pipeline = fields.Str(allow_none=True)
     contact_id = fields.Int(required=True)
     created_at = fields.DateTime(dump_only=True)
     updated_at = fields.DateTime(dump_only=True)
@@ -0,0 +1,91 @@
+from functools import lru_cache, partial
+from marshmallow import fields
+
+# Field types whose dump is a plain conversion of the attribute value
+SIMPLE_FIELDS = {
+    fields.Int: int,
+    fields.Float: float,
+    fields.Str: str,
+    fields.Email: str,
+    fields.DateTime: lambda value: value.isoformat(),
+}
+
+
+@lru_cache(maxsize=256)
+def get_schema(schema_class, many=False, only=None):
+    """Shared ``schema_class`` instance per ``(many, only)``; ``only`` must be a tuple.
+
+    Building a schema binds and copies every declared field, which costs more
+    than dumping a single object. Instances hold no per-call state, so one can
+    serve every thread.
+    """
+    return schema_class(many=many, only=only)
+
+
+def _field_converter(field):
+    if type(field) in SIMPLE_FIELDS:
+        return SIMPLE_FIELDS[type(field)]
+    if type(field) is fields.List and type(field.inner) in SIMPLE_FIELDS:
+        convert = SIMPLE_FIELDS[type(field.inner)]
+        return lambda values: [None if value is None else convert(value) for value in values]
+    return None
+
+
+@lru_cache(maxsize=256)
+def compile_dumper(schema_class, only=None):
+    """Returns ``dump(obj) -> dict`` for ``schema_class``, built once per field selection.
+
+    Output matches ``schema.dump(obj)`` for the field types in ``SIMPLE_FIELDS``
+    (and lists of them) on objects that have every attribute. A schema with any
+    other field, or with hooks, falls back to marshmallow.
+    """
+    schema = get_schema(schema_class, only=only)
+    if schema._hooks:
+        return schema.dump
+    converters = []
+    for name, field in schema.dump_fields.items():
+        convert = _field_converter(field)
+        if convert is None:
+            return schema.dump
+        converters.append((field.data_key or name, field.attribute or name, convert))
+
+    def dump(obj):
+        # Upserts return plain dicts, which marshmallow reads by key
+        get = obj.get if isinstance(obj, dict) else partial(getattr, obj)
+        item = {}
+        for key, attribute, convert in converters:
+            value = get(attribute)
+            item[key] = None if value is None else convert(value)
+        return item
+
+    return dump
+
+
+def dump(schema_class, obj, only=None):
+    return compile_dumper(schema_class, tuple(only) if only else None)(obj)
+
+
+def dump_many(schema_class, objects, only=None):
+    """Dumps a list of objects with one compiled dumper, like ``schema_class(many=True).dump``."""
+    dump_one = compile_dumper(schema_class, tuple(only) if only else None)
+    return [dump_one(obj) for obj in objects]
+
+
+def compact_record(record, properties, associations=None):
+    """Projects a HubSpot CRM v3 object down to ``{"id", <properties>..., "updated_at"}``.
+
+    Drops the default properties HubSpot always adds (``hs_object_id``,
+    ``createdate``, ...) and the ``archived``/``createdAt`` envelope, so
+    responses and cache entries carry only what was asked for. ``associations``
+    maps a key holding embedded objects to the properties to keep on those.
+    """
+    values = record.get("properties") or {}
+    item = {"id": record["id"]}
+    for name in properties:
+        if name != "id":
+            item[name] = values.get(name)
+    item["updated_at"] = record.get("updatedAt")
+    for key, nested_properties in (associations or {}).items():
+        if key in record:
+            item[key] = [compact_record(nested, nested_properties) for nested in record[key]]
+    return item
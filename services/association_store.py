@@ -0,0 +1,164 @@
+import logging
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import delete, or_, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import SQLAlchemyError
+from extensions import db
+from models.models import AssociationRefresh, CrmAssociation
+from services.persistence import transaction
+
+edges = CrmAssociation.__table__
+refreshes = AssociationRefresh.__table__
+
+# Edges point from the earlier to the later type in this order
+TYPE_ORDER = ("contacts", "deals", "tickets")
+
+
+def _ends(from_type, to_type):
+    """Returns ``(near, far, stored_from_type, stored_to_type)`` for reading ``from_type`` -> ``to_type``."""
+    if TYPE_ORDER.index(from_type) < TYPE_ORDER.index(to_type):
+        return edges.c.from_id, edges.c.to_id, from_type, to_type
+    return edges.c.to_id, edges.c.from_id, to_type, from_type
+
+
+def _edge(type_a, id_a, type_b, id_b):
+    if TYPE_ORDER.index(type_a) > TYPE_ORDER.index(type_b):
+        type_a, id_a, type_b, id_b = type_b, id_b, type_a, id_a
+    return {"from_type": type_a, "from_id": str(id_a), "to_type": type_b, "to_id": str(id_b)}
+
+
+def enabled():
+    return current_app.config["CRM_ASSOCIATION_TTL"] > 0
+
+
+def in_context(app, fn, *args):
+    """Calls ``fn(*args)`` in a fresh app context, for threads (like the async layer's) that have none."""
+    with app.app_context():
+        return fn(*args)
+
+
+def lookup(from_type, to_type, ids):
+    """Returns ``({from_id: [to_id, ...]}, stale_ids)`` from the local edge table.
+
+    Only IDs whose ``to_type`` associations were read from HubSpot within
+    CRM_ASSOCIATION_TTL seconds are answered; the rest come back in ``stale_ids``
+    for the caller to revalidate. If the store can't be read, every ID is stale.
+    """
+    ids = list(dict.fromkeys(str(object_id) for object_id in ids))
+    if not ids:
+        return {}, []
+    cutoff = datetime.utcnow() - timedelta(seconds=current_app.config["CRM_ASSOCIATION_TTL"])
+    near, far, stored_from, stored_to = _ends(from_type, to_type)
+    try:
+        with db.engine.connect() as connection:
+            fresh = set(connection.execute(
+                select(refreshes.c.object_id).where(
+                    refreshes.c.object_type == from_type,
+                    refreshes.c.to_type == to_type,
+                    refreshes.c.object_id.in_(ids),
+                    refreshes.c.refreshed_at >= cutoff,
+                )
+            ).scalars())
+            associations = {object_id: [] for object_id in ids if object_id in fresh}
+            if fresh:
+                rows = connection.execute(
+                    select(near, far)
+                    .where(edges.c.from_type == stored_from, edges.c.to_type == stored_to, near.in_(list(fresh)))
+                    .order_by(near, far)
+                )
+                for from_id, to_id in rows:
+                    associations[from_id].append(to_id)
+    except SQLAlchemyError as e:
+        logging.error(f"Failed to read stored {from_type}->{to_type} associations: {str(e)}")
+        return {}, ids
+    return associations, [object_id for object_id in ids if object_id not in fresh]
+
+
+def replace(from_type, to_type, associations):
+    """Stores ``{from_id: [to_id, ...]}`` as the complete ``to_type`` associations of each ``from_id``.
+
+    Edges those objects had before are removed, and each is marked fresh for
+    CRM_ASSOCIATION_TTL. Runs in its own transaction, so it never commits or
+    blocks on the caller's session; failures are logged, since the store only
+    mirrors HubSpot.
+    """
+    if not associations:
+        return
+    near, _, stored_from, stored_to = _ends(from_type, to_type)
+    ids = [str(object_id) for object_id in associations]
+    rows = [_edge(from_type, from_id, to_type, to_id) for from_id, to_ids in associations.items() for to_id in to_ids]
+    now = datetime.utcnow()
+    refreshed = insert(refreshes).values([
+        {"object_type": from_type, "object_id": object_id, "to_type": to_type, "refreshed_at": now}
+        for object_id in ids
+    ])
+    try:
+        with transaction() as connection:
+            connection.execute(delete(edges).where(
+                edges.c.from_type == stored_from, edges.c.to_type == stored_to, near.in_(ids)
+            ))
+            if rows:
+                connection.execute(insert(edges).values(rows).on_conflict_do_nothing())
+            connection.execute(refreshed.on_conflict_do_update(
+                index_elements=["object_type", "object_id", "to_type"],
+                set_={"refreshed_at": refreshed.excluded.refreshed_at},
+            ))
+    except SQLAlchemyError as e:
+        logging.error(f"Failed to store {from_type}->{to_type} associations: {str(e)}")
+
+
+def record_created(object_type, created):
+    """Stores the associations new objects were created with, ``{object_id: {to_type: [to_id, ...]}}``.
+
+    A created object has no other associations yet, so these are complete and
+    its first read needs no HubSpot call.
+    """
+    if not enabled():
+        return
+    by_type = {}
+    for object_id, associations in created.items():
+        for to_type, to_ids in associations.items():
+            by_type.setdefault(to_type, {})[str(object_id)] = [str(to_id) for to_id in to_ids]
+    for to_type, associations in by_type.items():
+        replace(object_type, to_type, associations)
+
+
+def add_edges(pairs, commit=True):
+    """Records ``(type_a, id_a, type_b, id_b)`` associations in the session's transaction."""
+    rows = [_edge(*pair) for pair in pairs]
+    if rows:
+        db.session.execute(insert(edges).values(rows).on_conflict_do_nothing())
+    if commit:
+        db.session.commit()
+
+
+def remove_edges(pairs, commit=True):
+    keys = [tuple(_edge(*pair).values()) for pair in pairs]
+    if keys:
+        columns = tuple_(edges.c.from_type, edges.c.from_id, edges.c.to_type, edges.c.to_id)
+        db.session.execute(delete(edges).where(columns.in_(keys)))
+    if commit:
+        db.session.commit()
+
+
+def forget(object_type, ids, commit=True):
+    """Drops the freshness marks of ``ids`` (e.g. merged objects), so their next read asks HubSpot."""
+    ids = [str(object_id) for object_id in ids]
+    if not ids:
+        return
+    db.session.execute(delete(refreshes).where(refreshes.c.object_type == object_type, refreshes.c.object_id.in_(ids)))
+    if commit:
+        db.session.commit()
+
+
+def remove_objects(object_type, ids, commit=True):
+    """Deletes every edge touching ``ids`` along with their freshness marks."""
+    ids = [str(object_id) for object_id in ids]
+    if not ids:
+        return
+    db.session.execute(delete(edges).where(or_(
+        (edges.c.from_type == object_type) & edges.c.from_id.in_(ids),
+        (edges.c.to_type == object_type) & edges.c.to_id.in_(ids),
+    )))
+    forget(object_type, ids, commit=commit)
@@ -0,0 +1,300 @@
+import asyncio
+import glob
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from config import load_config
+from services.metrics import CACHE_LOOKUPS, COALESCED_FETCHES
+from services.single_flight import AsyncSingleFlight, HostLock
+
+config = load_config()
+
+# Writes to one object type can change what the others embed as associations
+RELATED_TYPES = {
+    "contacts": ("contacts", "deals"),
+    "deals": ("deals", "contacts", "tickets"),
+    "tickets": ("tickets",),
+}
+
+
+class MemoryCache:
+    """Per-process TTL cache with LRU eviction once ``max_entries`` is reached."""
+
+    def __init__(self, ttl=60, max_entries=128):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, namespace, key):
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is None or entry[0] < time.time():
+                self._entries.pop((namespace, key), None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end((namespace, key))
+            self.hits += 1
+            return entry[1]
+
+    def set(self, namespace, key, value):
+        with self._lock:
+            self._entries[(namespace, key)] = (time.time() + self.ttl, value)
+            self._entries.move_to_end((namespace, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, namespace, key):
+        with self._lock:
+            self._entries.pop((namespace, key), None)
+
+    def generation(self, namespace):
+        with self._lock:
+            return self._generations.get(namespace, 0)
+
+    def invalidate(self, namespace):
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+            for cache_key in [cache_key for cache_key in self._entries if cache_key[0] == namespace]:
+                del self._entries[cache_key]
+
+
+class FileCache:
+    """TTL cache in a local directory shared by every worker on the host.
+
+    Entries are JSON files named ``<namespace>.<sha1(key)>.json``; reads touch
+    the file so eviction by modification time approximates LRU. Each namespace's
+    generation is a token in ``<namespace>.generation``, replaced on every
+    invalidation so all workers see it.
+    """
+
+    def __init__(self, directory, ttl=60, max_entries=128):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, namespace, key):
+        digest = hashlib.sha1(key.encode()).hexdigest()
+        return os.path.join(self.directory, f"{namespace}.{digest}.json")
+
+    def get(self, namespace, key):
+        path = self._path(namespace, key)
+        try:
+            with open(path) as fh:
+                entry = json.load(fh)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        if entry["expires_at"] < time.time():
+            self._remove(path)
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return entry["value"]
+
+    def set(self, namespace, key, value):
+        path = self._path(namespace, key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w") as fh:
+                json.dump({"expires_at": time.time() + self.ttl, "value": value}, fh)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            self._remove(tmp_path)
+            logging.error(f"Failed to write cache entry {namespace}:{key}: {str(e)}")
+            return
+        self._evict()
+
+    def delete(self, namespace, key):
+        self._remove(self._path(namespace, key))
+
+    def generation(self, namespace):
+        try:
+            with open(os.path.join(self.directory, f"{namespace}.generation")) as fh:
+                return fh.read()
+        except OSError:
+            return ""
+
+    def invalidate(self, namespace):
+        path = os.path.join(self.directory, f"{namespace}.generation")
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w") as fh:
+                fh.write(f"{time.time_ns()}.{os.getpid()}.{threading.get_ident()}")
+            os.replace(tmp_path, path)
+        except OSError as e:
+            self._remove(tmp_path)
+            logging.error(f"Failed to bump cache generation of {namespace}: {str(e)}")
+        for path in glob.glob(os.path.join(self.directory, f"{namespace}.*.json")):
+            self._remove(path)
+
+    def _evict(self):
+        paths = glob.glob(os.path.join(self.directory, "*.json"))
+        if len(paths) <= self.max_entries:
+            return
+        paths.sort(key=lambda path: os.path.getmtime(path) if os.path.exists(path) else 0)
+        for path in paths[:len(paths) - self.max_entries]:
+            self._remove(path)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class NullCache:
+    """Backend used when caching is disabled."""
+
+    hits = 0
+    misses = 0
+
+    def get(self, namespace, key):
+        return None
+
+    def set(self, namespace, key, value):
+        pass
+
+    def delete(self, namespace, key):
+        pass
+
+    def generation(self, namespace):
+        return 0
+
+    def invalidate(self, namespace):
+        pass
+
+
+class MeteredCache:
+    """Wraps a cache backend and counts its hits and misses per namespace for /metrics."""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    @property
+    def hits(self):
+        return self.backend.hits
+
+    @property
+    def misses(self):
+        return self.backend.misses
+
+    def get(self, namespace, key):
+        value = self.backend.get(namespace, key)
+        CACHE_LOOKUPS.labels(namespace, "miss" if value is None else "hit").inc()
+        return value
+
+    def set(self, namespace, key, value):
+        self.backend.set(namespace, key, value)
+
+    def delete(self, namespace, key):
+        self.backend.delete(namespace, key)
+
+    def generation(self, namespace):
+        return self.backend.generation(namespace)
+
+    def invalidate(self, namespace):
+        self.backend.invalidate(namespace)
+
+
+def build_cache(backend, ttl, max_entries, directory=None):
+    if backend == "memory":
+        return MemoryCache(ttl=ttl, max_entries=max_entries)
+    if backend == "file":
+        return FileCache(directory, ttl=ttl, max_entries=max_entries)
+    return NullCache()
+
+
+crm_cache = MeteredCache(build_cache(
+    config.CRM_CACHE_BACKEND,
+    ttl=config.CRM_CACHE_TTL,
+    max_entries=config.CRM_CACHE_MAX_ENTRIES,
+    directory=config.CRM_CACHE_DIR,
+))
+
+
+def build_host_lock(mode, backend, directory):
+    if mode != "host":
+        return None
+    if backend != "file":
+        logging.warning("CRM_SINGLE_FLIGHT=host needs CRM_CACHE_BACKEND=file; coalescing per process only")
+        return None
+    return HostLock(directory)
+
+
+host_lock = build_host_lock(config.CRM_SINGLE_FLIGHT, config.CRM_CACHE_BACKEND, config.CRM_CACHE_DIR)
+_flights = AsyncSingleFlight()
+
+
+def _store(namespace, key, value, generation):
+    """Caches ``value`` unless ``namespace`` was invalidated since ``generation`` was read.
+
+    A write can invalidate the namespace while a fill is still fetching. The
+    generation is checked again after the entry is written, so either this check
+    or the invalidation's own delete removes the stale entry.
+    """
+    if value is not None:
+        crm_cache.set(namespace, key, value)
+        if crm_cache.generation(namespace) != generation:
+            crm_cache.delete(namespace, key)
+    return value
+
+
+async def _fill(namespace, key, fetch):
+    if host_lock is None:
+        generation = crm_cache.generation(namespace)
+        return _store(namespace, key, await fetch(), generation)
+    loop = asyncio.get_running_loop()
+    handle = await loop.run_in_executor(None, host_lock.acquire, (namespace, key))
+    try:
+        generation = crm_cache.generation(namespace)
+        # Another worker may have filled the entry while this one waited for the lock
+        value = crm_cache.get(namespace, key)
+        return value if value is not None else _store(namespace, key, await fetch(), generation)
+    finally:
+        host_lock.release(handle)
+
+
+async def acached_fetch(namespace, key, fetch):
+    """Returns the cached value for ``namespace``/``key``, or awaits ``fetch()``, caching its result unless None.
+
+    Runs on the async HubSpot client's event loop. Concurrent misses for the same
+    key share a single ``fetch()`` (see CRM_SINGLE_FLIGHT), so a burst of identical
+    requests costs HubSpot one fetch instead of one per request.
+    """
+    value = crm_cache.get(namespace, key)
+    if value is not None:
+        return value
+    if config.CRM_SINGLE_FLIGHT == "off":
+        generation = crm_cache.generation(namespace)
+        return _store(namespace, key, await fetch(), generation)
+    value, shared = await _flights.do((namespace, key), lambda: _fill(namespace, key, fetch))
+    if shared:
+        COALESCED_FETCHES.labels(namespace).inc()
+    return value
+
+
+def cache_key(**window):
+    """Builds a stable key from the query window (e.g. ``after``, ``limit``)."""
+    return ",".join(f"{name}={window[name]}" for name in sorted(window))
+
+
+def invalidate_object_type(object_type):
+    """Drops cached feeds affected by a write to ``object_type``."""
+    for namespace in RELATED_TYPES.get(object_type, (object_type,)):
+        crm_cache.invalidate(namespace)
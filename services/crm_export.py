@@ -0,0 +1,92 @@
+import logging
+import zlib
+from itertools import chain
+import requests
+from sqlalchemy import select
+from extensions import db
+from schemas.serialization import compact_record, compile_dumper
+from services.crm_store import CRM_MODELS, check_fields, field_projection, filter_clauses
+from services.hubspot_sync import SYNC_OBJECTS, search_modified_since
+from services.pagination import to_epoch_ms
+
+
+def iter_db_batches(object_type, filters, fields=None, batch_size=1000, max_records=None):
+    """Yields lists of dumped rows of a local table in ``id`` order, at most ``max_records`` rows.
+
+    Rows are read as Core rows, not ORM objects, through a server-side cursor (``yield_per``),
+    ``batch_size`` at a time, so neither the session's identity map nor the
+    driver ever holds the whole table.
+    """
+    model, schema = CRM_MODELS[object_type]
+    if fields:
+        check_fields({object_type: fields})
+    dump = compile_dumper(schema, tuple(field_projection(object_type, fields)) if fields else None)
+
+    table = model.__table__
+    query = select(*table.c).where(*filter_clauses(object_type, table.c, filters)).order_by(table.c.id)
+    if max_records is not None:
+        query = query.limit(max_records)
+
+    result = db.session.execute(query.execution_options(yield_per=batch_size))
+    for rows in result.partitions():
+        yield [dump(row) for row in rows]
+
+
+def iter_hubspot_batches(object_type, filters, fields=None, max_records=None):
+    """Yields lists of compact HubSpot records, oldest modification first, one search page at a time."""
+    unsupported = sorted(set(filters) - {"since"})
+    if unsupported:
+        raise ValueError(f"Filter(s) not supported when exporting from HubSpot: {', '.join(unsupported)}")
+    spec = SYNC_OBJECTS[object_type]
+    properties = fields or spec["properties"]
+    since = to_epoch_ms(filters["since"]) if filters.get("since") else 0
+    for records in search_modified_since(object_type, since, spec["modified_property"], properties,
+                                         max_records):
+        yield [compact_record(record, properties) for record in records]
+
+
+def _logged(object_type, batches):
+    try:
+        yield from batches
+    except requests.RequestException as e:
+        # The status line is long gone; ending the stream early lets the client see the cut
+        logging.error(f"Export of {object_type} failed mid-stream: {str(e)}")
+        raise
+
+
+def export_batches(object_type, filters, fields=None, source="db", batch_size=1000, max_records=None):
+    """Returns an iterator over batches of ``object_type`` records from the local table or HubSpot.
+
+    Batches are read as the response is written, so ``max_records`` (no cap when None)
+    bounds the export without any list of records being collected.
+
+    The first batch is read before returning, so bad filters raise ValueError and
+    an unreachable HubSpot returns None while an error response can still be sent.
+    """
+    if source == "db":
+        batches = iter_db_batches(object_type, filters, fields, batch_size, max_records)
+    else:
+        batches = iter_hubspot_batches(object_type, filters, fields, max_records)
+    try:
+        first = next(batches, None)
+    except requests.RequestException as e:
+        logging.error(f"Failed to export {object_type}: {str(e)}")
+        return None
+    return chain([first] if first else [], _logged(object_type, batches))
+
+
+def ndjson_chunks(batches, dumps, compress=False):
+    """Encodes each batch as newline-delimited JSON, optionally as one continuous gzip stream.
+
+    The compressor is flushed after every batch, so clients receive data as it
+    is read instead of when the export ends.
+    """
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    for batch in batches:
+        chunk = "".join(f"{dumps(item)}\n" for item in batch).encode()
+        if compressor:
+            chunk = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if chunk:
+            yield chunk
+    if compressor:
+        yield compressor.flush()
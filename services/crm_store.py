@@ -0,0 +1,122 @@
+from datetime import datetime
+from sqlalchemy import select, tuple_
+from models.models import Contact, Deal, Ticket
+from schemas.schemas import ContactSchema, DealSchema, TicketSchema
+from schemas.serialization import dump_many, get_schema
+from services.pagination import CRM_OBJECT_TYPES, encode_cursor, decode_cursor
+
+CRM_MODELS = {
+    "contacts": (Contact, ContactSchema),
+    "deals": (Deal, DealSchema),
+    "tickets": (Ticket, TicketSchema),
+}
+
+# Query filter -> column it narrows, per table; filters a table lacks are ignored for it
+FILTER_COLUMNS = {
+    "contacts": {},
+    "deals": {"dealstage": "dealstage", "pipeline": "pipeline"},
+    "tickets": {"pipeline": "pipeline"},
+}
+
+
+def filter_clauses(object_type, columns, filters):
+    """WHERE clauses for ``filters`` on ``object_type``; ``columns`` is the model or its table's ``c``.
+
+    ``hubspot_contact_id`` is the HubSpot contact ID under either read source, so
+    deals and tickets are matched through the contact row that carries it.
+    """
+    clauses = []
+    if filters.get("since"):
+        clauses.append(columns.updated_at >= filters["since"])
+    for name, column in FILTER_COLUMNS[object_type].items():
+        if filters.get(name) is not None:
+            clauses.append(getattr(columns, column) == filters[name])
+    hubspot_contact_id = filters.get("hubspot_contact_id")
+    if hubspot_contact_id is not None:
+        if object_type == "contacts":
+            clauses.append(columns.hubspot_id == hubspot_contact_id)
+        else:
+            clauses.append(columns.contact_id.in_(
+                select(Contact.id).where(Contact.hubspot_id == hubspot_contact_id)
+            ))
+    return clauses
+
+
+def _position(object_type, cursor):
+    position = decode_cursor(object_type, cursor)
+    if position is None:
+        return None
+    try:
+        return datetime.fromisoformat(position["u"]), int(position["i"])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError(f"Invalid {object_type} cursor")
+
+
+def field_projection(object_type, names):
+    """Schema fields to dump for ``names``; ``id`` is always kept, names the type lacks are dropped."""
+    schema_fields = get_schema(CRM_MODELS[object_type][1]).fields
+    return ["id"] + [name for name in names if name in schema_fields and name != "id"]
+
+
+def check_fields(fields):
+    """Raises ValueError for requested field names no requested object type has."""
+    requested = {name for names in fields.values() for name in names}
+    known = {name for object_type, names in fields.items() for name in field_projection(object_type, names)}
+    if requested - known:
+        raise ValueError(f"Unknown field(s): {', '.join(sorted(requested - known))}")
+
+
+def _expand_associations(object_type, objects, items):
+    """Embeds related local rows the way the HubSpot source does: deals on contacts, contacts on deals."""
+    if object_type == "contacts":
+        deals = {}
+        for deal in Deal.query.filter(Deal.contact_id.in_([contact.id for contact in objects])):
+            deals.setdefault(deal.contact_id, []).append(deal)
+        for contact, item in zip(objects, items):
+            item["deals"] = dump_many(DealSchema, deals.get(contact.id, []))
+    elif object_type == "deals":
+        contact_ids = {deal.contact_id for deal in objects if deal.contact_id is not None}
+        contacts = {contact.id: contact for contact in Contact.query.filter(Contact.id.in_(contact_ids))}
+        for deal, item in zip(objects, items):
+            item["contacts"] = dump_many(ContactSchema, [contacts[deal.contact_id]] if deal.contact_id in contacts else [])
+
+
+def page_objects(object_type, filters, limit, cursor=None, fields=None, associations=False):
+    """Returns ``(items, next_cursor)`` for one page of a local table, newest changes first.
+
+    Pages are keyset-paginated on ``(updated_at, id)``, so a deep page costs the
+    same index range scan as the first one. ``next_cursor`` is None on the last page.
+    ``fields`` narrows the dumped fields; ``associations`` embeds related rows.
+    """
+    model, schema = CRM_MODELS[object_type]
+    query = model.query.filter(*filter_clauses(object_type, model, filters))
+
+    position = _position(object_type, cursor)
+    if position:
+        query = query.filter(tuple_(model.updated_at, model.id) < tuple_(*position))
+
+    objects = query.order_by(model.updated_at.desc(), model.id.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(objects) > limit:
+        last = objects[limit - 1]
+        next_cursor = encode_cursor(object_type, u=last.updated_at.isoformat(), i=last.id)
+
+    objects = objects[:limit]
+    items = dump_many(schema, objects, field_projection(object_type, fields) if fields else None)
+    if associations and objects:
+        _expand_associations(object_type, objects, items)
+    return items, next_cursor
+
+
+def read_new_crm_objects(cursors, filters, limit, object_types=CRM_OBJECT_TYPES, fields=None, associations=False):
+    """Serves the /new-crm-objects payload from the local mirror instead of HubSpot."""
+    fields = fields or {}
+    check_fields(fields)
+    payload = {"pagination": {"limit": limit, "next_cursors": {}}}
+    for object_type in object_types:
+        items, next_cursor = page_objects(
+            object_type, filters, limit, cursors.get(object_type), fields.get(object_type), associations
+        )
+        payload[object_type] = items
+        payload["pagination"]["next_cursors"][object_type] = next_cursor
+    return payload
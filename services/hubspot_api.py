@@ -1,20 +1,109 @@
 import requests
 import logging
-from services.hubspot_auth import get_access_token
-from models.models import db, Contact, Deal, Ticket
+from extensions import db
+from services.hubspot_client import hubspot_client
+from services.persistence import local_contact_ids, upsert_contacts, upsert_deals, upsert_tickets
+from services.cache import invalidate_object_type
+from services import association_store
 from schemas.schemas import ContactSchema, DealSchema, TicketSchema
+from schemas.serialization import dump
+
+# Positional fields of the create functions below; anything else is sent as an extra property
+CONTACT_FIELDS = ("email", "firstname", "lastname", "phone")
+DEAL_FIELDS = ("dealname", "amount", "dealstage", "contact_id")
+TICKET_FIELDS = (
+    "subject", "description", "category", "pipeline", "hs_ticket_priority", "hs_pipeline_stage", "contact_id", "deal_ids"
+)
+
+SAVE_WARNING = "Saved in HubSpot but not in the local database; the next sync will store it"
+
+# How a record HubSpot accepted is stored locally, per object type
+STORED_OBJECTS = {
+    "contacts": {"upsert": upsert_contacts, "schema": ContactSchema, "associations": None},
+    "deals": {
+        "upsert": upsert_deals,
+        "schema": DealSchema,
+        "associations": lambda row: {"contacts": [row["contact_id"]]},
+    },
+    "tickets": {
+        "upsert": upsert_tickets,
+        "schema": TicketSchema,
+        "associations": lambda row: {"contacts": [row["contact_id"]], "deals": row.get("deal_ids") or []},
+    },
+}
+
+class HubSpotWriteError(Exception):
+    """HubSpot did not confirm a write; ``status`` is its HTTP status, or None when no response came back.
+
+    ``applied`` is False only when HubSpot certainly did not apply the write: it
+    answered with a 4xx, or the connection failed before the request was sent.
+    """
+
+    def __init__(self, message, status=None, applied=True):
+        super().__init__(message)
+        self.status = status
+        self.applied = applied
+
+    @classmethod
+    def from_request_error(cls, e):
+        status = e.response.status_code if e.response is not None else None
+        if status is not None:
+            applied = status >= 500
+        else:
+            # Same test the client's retry policy uses for a connection that never carried the request
+            applied = isinstance(e, requests.Timeout) and not isinstance(e, requests.ConnectTimeout)
+        return cls(str(e), status, applied)
+
+    @property
+    def retryable(self):
+        """Throttling, server errors and lost connections may pass; any other 4xx fails the same way again."""
+        return self.status is None or self.status == 429 or self.status >= 500
+
+def _send(url, data, action):
+    try:
+        response = hubspot_client.post(url, json=data)
+        response.raise_for_status()
+        return response.json()
+    except requests.RequestException as e:
+        logging.error(f"Failed to {action}: {str(e)}")
+        raise HubSpotWriteError.from_request_error(e) from e
 
+def store(object_type, row):
+    """Stores a record HubSpot has already accepted and returns it dumped; raises if the database fails.
 
-HUBSPOT_API_BASE = "https://api.hubapi.com"
-def create_or_update_contact(email, firstname, lastname, phone, **kwargs):
-    """Create or update a contact in HubSpot and save to the database."""
-    token = get_access_token()
-    if not token:
-        logging.error("Failed to retrieve access token.")
-        return None
+    ``row`` carries the HubSpot contact ID in ``contact_id``; it is stored as the
+    local ``contacts.id``, or NULL while that contact is not synced.
+    """
+    spec = STORED_OBJECTS[object_type]
+    try:
+        stored = dict(row)
+        if "contact_id" in stored:
+            stored["contact_id"] = local_contact_ids([row["contact_id"]]).get(str(row["contact_id"]))
+        saved = dump(spec["schema"], spec["upsert"]([stored])[0])
+    except Exception:
+        db.session.rollback()
+        raise
+    if spec["associations"]:
+        try:
+            association_store.record_created(object_type, {row["hubspot_id"]: spec["associations"](row)})
+        except Exception as e:
+            logging.error(f"Failed to record associations of {row['hubspot_id']}: {str(e)}")
+    return saved
+
+def _save(object_type, row):
+    """``store``, except that a database failure returns the HubSpot copy with a ``warning``.
+
+    The record exists in HubSpot either way, so the write is not reported as failed.
+    """
+    try:
+        return store(object_type, row)
+    except Exception as e:
+        logging.error(f"Database error: {str(e)}")
+        return dict(row, warning=SAVE_WARNING)
 
-    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
-    url = f"{HUBSPOT_API_BASE}/contacts/v1/contact/createOrUpdate/email/{email}"
+def send_contact(email, firstname, lastname, phone, **kwargs):
+    """Create or update a contact in HubSpot; returns the row to store. Raises HubSpotWriteError."""
+    url = f"/contacts/v1/contact/createOrUpdate/email/{email}"
 
     data = {
         "properties": [
@@ -29,41 +118,20 @@ def create_or_update_contact(email, firstname, lastname, phone, **kwargs):
     for key, value in kwargs.items():
         data["properties"].append({"property": key, "value": value})
 
-    try:
-        response = requests.post(url, headers=headers, json=data)
-        response.raise_for_status()
-        hubspot_data = response.json()
-
-        # Save to database
-        contact = Contact(
-            hubspot_id=hubspot_data.get("vid"),
-            email=email,
-            firstname=firstname,
-            lastname=lastname,
-            phone=phone,
-            **kwargs
-        )
-        db.session.add(contact)
-        db.session.commit()
-
-        return ContactSchema().dump(contact)
-    except requests.RequestException as e:
-        logging.error(f"Failed to create/update contact: {str(e)}")
-        return None
-    except Exception as e:
-        db.session.rollback()
-        logging.error(f"Database error: {str(e)}")
-        return None
-
-def create_or_update_deal(dealname, amount, dealstage, contact_id, **kwargs):
-    """Create or update a deal in HubSpot and save to the database."""
-    token = get_access_token()
-    if not token:
-        logging.error("Failed to retrieve access token.")
-        return None
-
-    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
-    url = f"{HUBSPOT_API_BASE}/deals/v1/deal"
+    hubspot_data = _send(url, data, "create/update contact")
+    invalidate_object_type("contacts")
+    return dict(
+        kwargs,
+        hubspot_id=str(hubspot_data.get("vid")),
+        email=email,
+        firstname=firstname,
+        lastname=lastname,
+        phone=phone,
+    )
+
+def send_deal(dealname, amount, dealstage, contact_id, **kwargs):
+    """Create a deal in HubSpot; returns the row to store. Raises HubSpotWriteError."""
+    url = "/deals/v1/deal"
 
     data = {
         "properties": [
@@ -80,41 +148,20 @@ def create_or_update_deal(dealname, amount, dealstage, contact_id, **kwargs):
     for key, value in kwargs.items():
         data["properties"].append({"name": key, "value": value})
 
-    try:
-        response = requests.post(url, headers=headers, json=data)
-        response.raise_for_status()
-        hubspot_data = response.json()
-
-        # Save to database
-        deal = Deal(
-            hubspot_id=hubspot_data.get("dealId"),
-            dealname=dealname,
-            amount=amount,
-            dealstage=dealstage,
-            contact_id=contact_id,
-            **kwargs
-        )
-        db.session.add(deal)
-        db.session.commit()
-
-        return DealSchema().dump(deal)
-    except requests.RequestException as e:
-        logging.error(f"Failed to create/update deal: {str(e)}")
-        return None
-    except Exception as e:
-        db.session.rollback()
-        logging.error(f"Database error: {str(e)}")
-        return None
-
-def create_support_ticket(subject, description, category, pipeline, hs_ticket_priority, hs_pipeline_stage, contact_id, deal_ids, **kwargs):
-    """Create a new support ticket in HubSpot and save to the database."""
-    token = get_access_token()
-    if not token:
-        logging.error("Failed to retrieve access token.")
-        return None
-
-    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
-    url = f"{HUBSPOT_API_BASE}/crm-objects/v1/objects/tickets"
+    hubspot_data = _send(url, data, "create/update deal")
+    invalidate_object_type("deals")
+    return dict(
+        kwargs,
+        hubspot_id=str(hubspot_data.get("dealId")),
+        dealname=dealname,
+        amount=amount,
+        dealstage=dealstage,
+        contact_id=contact_id,
+    )
+
+def send_ticket(subject, description, category, pipeline, hs_ticket_priority, hs_pipeline_stage, contact_id, deal_ids, **kwargs):
+    """Create a support ticket in HubSpot; returns the row to store. Raises HubSpotWriteError."""
+    url = "/crm-objects/v1/objects/tickets"
 
     data = {
         "properties": [
@@ -135,32 +182,32 @@ def create_support_ticket(subject, description, category, pipeline, hs_ticket_pr
     for key, value in kwargs.items():
         data["properties"].append({"name": key, "value": value})
 
-    try:
-        response = requests.post(url, headers=headers, json=data)
-        response.raise_for_status()
-        hubspot_data = response.json()
-
-        # Save to database
-        ticket = Ticket(
-            hubspot_id=hubspot_data.get("id"),
-            subject=subject,
-            description=description,
-            category=category,
-            pipeline=pipeline,
-            hs_ticket_priority=hs_ticket_priority,
-            hs_pipeline_stage=hs_pipeline_stage,
-            contact_id=contact_id,
-            deal_ids=deal_ids,
-            **kwargs
-        )
-        db.session.add(ticket)
-        db.session.commit()
-
-        return TicketSchema().dump(ticket)
-    except requests.RequestException as e:
-        logging.error(f"Failed to create support ticket: {str(e)}")
-        return None
-    except Exception as e:
-        db.session.rollback()
-        logging.error(f"Database error: {str(e)}")
-        return None
+    hubspot_data = _send(url, data, "create support ticket")
+    invalidate_object_type("tickets")
+    return dict(
+        kwargs,
+        hubspot_id=str(hubspot_data.get("objectId", hubspot_data.get("id"))),
+        subject=subject,
+        description=description,
+        category=category,
+        pipeline=pipeline,
+        hs_ticket_priority=hs_ticket_priority,
+        hs_pipeline_stage=hs_pipeline_stage,
+        contact_id=contact_id,
+        deal_ids=deal_ids,
+    )
+
+def create_or_update_contact(email, firstname, lastname, phone, **kwargs):
+    """Create or update a contact in HubSpot and save to the database; raises HubSpotWriteError."""
+    return _save("contacts", send_contact(email, firstname, lastname, phone, **kwargs))
+
+def create_or_update_deal(dealname, amount, dealstage, contact_id, **kwargs):
+    """Create or update a deal in HubSpot and save to the database; raises HubSpotWriteError."""
+    return _save("deals", send_deal(dealname, amount, dealstage, contact_id, **kwargs))
+
+def create_support_ticket(subject, description, category, pipeline, hs_ticket_priority, hs_pipeline_stage, contact_id, deal_ids, **kwargs):
+    """Create a new support ticket in HubSpot and save to the database; raises HubSpotWriteError."""
+    row = send_ticket(
+        subject, description, category, pipeline, hs_ticket_priority, hs_pipeline_stage, contact_id, deal_ids, **kwargs
+    )
+    return _save("tickets", row)
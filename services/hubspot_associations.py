@@ -0,0 +1,82 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from flask import has_app_context
+from config import load_config
+from services import association_store
+from services.hubspot_client import hubspot_client
+from services.metrics import observe_fanout
+
+config = load_config()
+
+
+def chunked(items, size):
+    """Yields successive ``size``-long slices of ``items``."""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def read_associations(from_type, to_type, ids, refresh=False):
+    """Returns ``{from_id: [to_id, ...]}``, from the association store or the v4 batch association endpoint.
+
+    IDs the store knows (see ``services.association_store``) cost no HubSpot call
+    unless ``refresh`` is set; the rest are resolved in chunks of
+    ``HUBSPOT_BATCH_SIZE`` and stored. A chunk whose batch call fails falls back
+    to single lookups with bounded concurrency.
+    """
+    ids = list(dict.fromkeys(str(object_id) for object_id in ids))
+    associations = {object_id: [] for object_id in ids}
+    use_store = has_app_context() and association_store.enabled()
+    pending = ids
+    if use_store and not refresh:
+        known, pending = association_store.lookup(from_type, to_type, ids)
+        associations.update(known)
+    failed = []
+
+    for chunk in chunked(pending, config.HUBSPOT_BATCH_SIZE):
+        url = f"/crm/v4/associations/{from_type}/{to_type}/batch/read"
+        try:
+            response = hubspot_client.post(url, json={"inputs": [{"id": object_id} for object_id in chunk]})
+            response.raise_for_status()
+        except requests.RequestException as e:
+            logging.error(f"Batch association read failed for {from_type}->{to_type}: {str(e)}")
+            failed.extend(chunk)
+            continue
+
+        for result in response.json().get("results", []):
+            from_id = str(result["from"]["id"])
+            associations[from_id] = [str(item["toObjectId"]) for item in result.get("to", [])]
+
+    if failed:
+        with ThreadPoolExecutor(max_workers=config.HUBSPOT_FALLBACK_CONCURRENCY) as pool:
+            for from_id, to_ids in pool.map(lambda object_id: _read_single(from_type, to_type, object_id), failed):
+                associations[from_id] = to_ids
+
+    if use_store:
+        association_store.replace(from_type, to_type, {object_id: associations[object_id] for object_id in pending})
+    observe_fanout(from_type, to_type, associations)
+    return associations
+
+
+def _read_single(from_type, to_type, object_id):
+    url = f"/crm/v4/objects/{from_type}/{object_id}/associations/{to_type}"
+    response = hubspot_client.get(url)
+    response.raise_for_status()
+    return object_id, [str(item["toObjectId"]) for item in response.json().get("results", [])]
+
+
+def read_objects(object_type, ids, properties=None):
+    """Returns ``{id: object}`` for ``ids`` using the CRM v3 batch read endpoint."""
+    ids = list(dict.fromkeys(str(object_id) for object_id in ids))
+    objects = {}
+
+    for chunk in chunked(ids, config.HUBSPOT_BATCH_SIZE):
+        body = {"inputs": [{"id": object_id} for object_id in chunk]}
+        if properties:
+            body["properties"] = list(properties)
+        response = hubspot_client.post(f"/crm/v3/objects/{object_type}/batch/read", json=body)
+        response.raise_for_status()
+        for obj in response.json().get("results", []):
+            objects[str(obj["id"])] = obj
+
+    return objects
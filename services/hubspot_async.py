@@ -0,0 +1,348 @@
+import asyncio
+import logging
+import threading
+import httpx
+from flask import current_app, has_app_context
+from config import load_config
+from services import association_store
+from services.hubspot_auth import token_manager
+from services.hubspot_client import InFlight
+from services.hubspot_ratelimit import rate_limiter, retry_policy
+from services.hubspot_associations import chunked
+from services.metrics import HUBSPOT_IN_FLIGHT, hubspot_call, observe_fanout
+from services.cache import acached_fetch, cache_key
+from schemas.serialization import compact_record
+from services.pagination import CRM_OBJECT_TYPES, encode_cursor, decode_cursor, to_epoch_ms
+
+config = load_config()
+
+DEAL_PROPERTIES = ["dealname", "amount", "dealstage", "pipeline", "closedate"]
+CONTACT_PROPERTIES = ["email", "firstname", "lastname", "phone"]
+TICKET_PROPERTIES = ["subject", "content", "hs_ticket_category", "hs_pipeline", "hs_ticket_priority", "hs_pipeline_stage"]
+
+# How /new-crm-objects filters map onto CRM v3 search when reading straight from HubSpot.
+# "associations" is (to_type, key to attach them under, properties to read) or None.
+SEARCH_OBJECTS = {
+    "contacts": {
+        "modified_property": "lastmodifieddate",
+        "properties": CONTACT_PROPERTIES,
+        "filters": {"hubspot_contact_id": "hs_object_id"},
+        "associations": ("deals", "deals", DEAL_PROPERTIES),
+    },
+    "deals": {
+        "modified_property": "hs_lastmodifieddate",
+        "properties": DEAL_PROPERTIES,
+        "filters": {"dealstage": "dealstage", "pipeline": "pipeline", "hubspot_contact_id": "associations.contact"},
+        "associations": ("contacts", "contacts", CONTACT_PROPERTIES),
+    },
+    "tickets": {
+        "modified_property": "hs_lastmodifieddate",
+        "properties": TICKET_PROPERTIES,
+        "filters": {"pipeline": "hs_pipeline", "hubspot_contact_id": "associations.contact"},
+        "associations": None,
+    },
+}
+
+
+class AsyncHubSpotClient:
+    """``httpx.AsyncClient`` wrapper that caps in-flight HubSpot calls with a semaphore.
+
+    Pacing and retries share the rate limiter and retry policy of the sync client.
+    """
+
+    def __init__(self, base_url, token_manager, max_concurrency=10, connect_timeout=3.05,
+                 read_timeout=10, pool_maxsize=20, rate_limiter=None, retry_policy=None):
+        self.token_manager = token_manager
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
+        self.in_flight = InFlight(HUBSPOT_IN_FLIGHT.labels("async"))
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.client = httpx.AsyncClient(
+            base_url=base_url.rstrip("/"),
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=pool_maxsize, max_keepalive_connections=pool_maxsize),
+        )
+
+    async def request(self, method, path, **kwargs):
+        with self.in_flight:
+            return await self._request(method, path, **kwargs)
+
+    async def _request(self, method, path, **kwargs):
+        headers = dict(kwargs.pop("headers", None) or {})
+        attempt = 0
+        reauthenticated = False
+
+        while True:
+            # A refresh blocks on the token endpoint (and the token store's flock), so it runs
+            # off the loop; every other in-flight call would otherwise stall behind it
+            token = self.token_manager.cached_token() or await asyncio.to_thread(self.token_manager.get_token)
+            if not token:
+                raise httpx.HTTPError("Failed to retrieve access token.")
+            headers["Authorization"] = f"Bearer {token}"
+
+            async with self.semaphore:
+                if self.rate_limiter:
+                    delay = self.rate_limiter.reserve()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                try:
+                    with hubspot_call(method, path) as call:
+                        response = await self.client.request(method, path, headers=headers, **kwargs)
+                        call["status"] = response.status_code
+                except httpx.TransportError as e:
+                    connect_error = isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout))
+                    if not (self.retry_policy and self.retry_policy.can_retry_error(method, attempt, connect_error, path)):
+                        raise
+                    delay = self.retry_policy.delay(attempt)
+                    logging.warning(f"HubSpot {method} {path} failed ({str(e)}), retrying in {delay:.2f}s")
+                    await asyncio.sleep(delay)
+                    attempt += 1
+                    continue
+
+            if self.rate_limiter:
+                self.rate_limiter.update(response.headers)
+
+            if response.status_code == 401 and not reauthenticated:
+                await asyncio.to_thread(self.token_manager.invalidate)
+                reauthenticated = True
+                continue
+
+            if not (self.retry_policy and self.retry_policy.should_retry(
+                method, response.status_code, attempt, response.headers, path
+            )):
+                return response
+
+            delay = self.retry_policy.delay(attempt, response.headers)
+            if response.status_code == 429 and self.rate_limiter:
+                self.rate_limiter.pause(delay)
+            logging.warning(f"HubSpot {method} {path} returned {response.status_code}, retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def get(self, path, **kwargs):
+        return await self.request("GET", path, **kwargs)
+
+    async def post(self, path, **kwargs):
+        return await self.request("POST", path, **kwargs)
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+class _LoopThread:
+    """Owns a long-lived event loop (and its client) so connections survive across Flask requests."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.loop = None
+        self.client = None
+
+    def _start(self):
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, name="hubspot-async", daemon=True).start()
+
+        async def build_client():
+            return AsyncHubSpotClient(
+                base_url=config.HUBSPOT_API_BASE_URL,
+                token_manager=token_manager,
+                max_concurrency=config.HUBSPOT_MAX_CONCURRENCY,
+                connect_timeout=config.HUBSPOT_CONNECT_TIMEOUT,
+                read_timeout=config.HUBSPOT_READ_TIMEOUT,
+                pool_maxsize=config.HUBSPOT_POOL_MAXSIZE,
+                rate_limiter=rate_limiter,
+                retry_policy=retry_policy,
+            )
+
+        self.client = asyncio.run_coroutine_threadsafe(build_client(), self.loop).result()
+
+    def run(self, coro_factory):
+        with self._lock:
+            if self.loop is None:
+                self._start()
+        return asyncio.run_coroutine_threadsafe(coro_factory(self.client), self.loop).result()
+
+    def shutdown(self, timeout=None):
+        """Waits up to ``timeout`` seconds for in-flight calls, then closes the client and stops the loop."""
+        with self._lock:
+            if self.loop is None:
+                return True
+            drained = self.client.in_flight.wait_idle(timeout)
+            asyncio.run_coroutine_threadsafe(self.client.aclose(), self.loop).result(timeout=5)
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.loop = self.client = None
+        return drained
+
+
+_loop_thread = _LoopThread()
+
+
+def shutdown(timeout=None):
+    """Drains and closes the shared async client; returns False if calls were still running at ``timeout``."""
+    return _loop_thread.shutdown(timeout)
+
+
+def run_sync(coro_factory):
+    """Runs ``coro_factory(client)`` on the shared HubSpot event loop and blocks for its result.
+
+    This is the bridge Flask's synchronous views use to call the async layer.
+    """
+    return _loop_thread.run(coro_factory)
+
+
+async def resolve_associations(client, from_type, to_type, ids, properties=None, app=None):
+    """Returns ``{from_id: [associated object, ...]}`` for every ID in ``ids``; chunks run concurrently.
+
+    Associations are read with the v4 batch endpoint and the associated objects
+    hydrated with one CRM v3 batch read per chunk of distinct target IDs, so the
+    call count grows with ``n / HUBSPOT_BATCH_SIZE`` rather than with ``n``.
+
+    Given the Flask ``app``, the association store is consulted and filled on
+    worker threads, so the event loop never waits on the database.
+    """
+    ids = list(dict.fromkeys(str(object_id) for object_id in ids))
+    associations = {object_id: [] for object_id in ids}
+    use_store = app is not None and app.config["CRM_ASSOCIATION_TTL"] > 0
+    pending = ids
+    if use_store:
+        known, pending = await asyncio.to_thread(
+            association_store.in_context, app, association_store.lookup, from_type, to_type, ids
+        )
+        associations.update(known)
+
+    async def read_chunk(chunk):
+        url = f"/crm/v4/associations/{from_type}/{to_type}/batch/read"
+        try:
+            response = await client.post(url, json={"inputs": [{"id": object_id} for object_id in chunk]})
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            logging.error(f"Batch association read failed for {from_type}->{to_type}: {str(e)}")
+            return await asyncio.gather(*(read_single(object_id) for object_id in chunk))
+        return [
+            (str(result["from"]["id"]), [str(item["toObjectId"]) for item in result.get("to", [])])
+            for result in response.json().get("results", [])
+        ]
+
+    async def read_single(object_id):
+        response = await client.get(f"/crm/v4/objects/{from_type}/{object_id}/associations/{to_type}")
+        response.raise_for_status()
+        return object_id, [str(item["toObjectId"]) for item in response.json().get("results", [])]
+
+    for pairs in await asyncio.gather(*(read_chunk(chunk) for chunk in chunked(pending, config.HUBSPOT_BATCH_SIZE))):
+        associations.update(pairs)
+    if use_store:
+        await asyncio.to_thread(
+            association_store.in_context, app, association_store.replace, from_type, to_type,
+            {object_id: associations[object_id] for object_id in pending},
+        )
+    observe_fanout(from_type, to_type, associations)
+
+    target_ids = list({to_id for to_ids in associations.values() for to_id in to_ids})
+
+    async def read_objects(chunk):
+        body = {"inputs": [{"id": object_id} for object_id in chunk]}
+        if properties:
+            body["properties"] = list(properties)
+        response = await client.post(f"/crm/v3/objects/{to_type}/batch/read", json=body)
+        response.raise_for_status()
+        return response.json().get("results", [])
+
+    objects = {}
+    for results in await asyncio.gather(*(read_objects(chunk) for chunk in chunked(target_ids, config.HUBSPOT_BATCH_SIZE))):
+        objects.update((str(obj["id"]), obj) for obj in results)
+
+    return {
+        from_id: [objects[to_id] for to_id in to_ids if to_id in objects]
+        for from_id, to_ids in associations.items()
+    }
+
+
+def search_body(object_type, filters, limit, after=None, properties=None):
+    """Builds the CRM v3 search request for one page of ``object_type``, newest changes first.
+
+    ``properties`` replaces the default property list; HubSpot always returns the record ID.
+    """
+    spec = SEARCH_OBJECTS[object_type]
+    conditions = []
+    if filters.get("since"):
+        conditions.append({"propertyName": spec["modified_property"], "operator": "GTE",
+                           "value": str(to_epoch_ms(filters["since"]))})
+    for name, property_name in spec["filters"].items():
+        if filters.get(name) is not None:
+            conditions.append({"propertyName": property_name, "operator": "EQ", "value": str(filters[name])})
+
+    body = {
+        "sorts": [{"propertyName": spec["modified_property"], "direction": "DESCENDING"}],
+        "properties": list(properties) if properties else spec["properties"] + [spec["modified_property"]],
+        "limit": limit,
+    }
+    if conditions:
+        body["filterGroups"] = [{"filters": conditions}]
+    if after:
+        body["after"] = after
+    return body
+
+
+async def search_page(client, object_type, filters, limit, position=None, properties=None, associations=True, app=None):
+    """Fetches one filtered page of ``object_type`` through CRM search, optionally with its associations.
+
+    Returns ``{"items": [...], "next_cursor": ...}``, or None if HubSpot failed. Records
+    are projected with ``compact_record`` unless CRM_COMPACT_RECORDS is off.
+    """
+    spec = SEARCH_OBJECTS[object_type]
+    after = (position or {}).get("after")
+    nested = {}
+    try:
+        response = await client.post(f"/crm/v3/objects/{object_type}/search",
+                                     json=search_body(object_type, filters, limit, after, properties))
+        response.raise_for_status()
+        data = response.json()
+        records = data.get("results", [])
+        if associations and spec["associations"] and records:
+            to_type, target_key, to_properties = spec["associations"]
+            resolved = await resolve_associations(client, object_type, to_type, [r["id"] for r in records],
+                                                  to_properties, app)
+            for record in records:
+                record[target_key] = resolved.get(str(record["id"]), [])
+            nested[target_key] = to_properties
+    except httpx.HTTPError as e:
+        logging.error(f"Failed to search {object_type}: {str(e)}")
+        return None
+
+    if config.CRM_COMPACT_RECORDS:
+        records = [compact_record(record, properties or spec["properties"], nested) for record in records]
+
+    next_after = data.get("paging", {}).get("next", {}).get("after")
+    return {"items": records, "next_cursor": encode_cursor(object_type, after=next_after) if next_after else None}
+
+
+async def fetch_crm_pages(client, object_types, positions, filters, limit, fields, associations, app=None):
+    """Searches the requested object types concurrently; each result goes through the feed cache."""
+    async def fetch(object_type):
+        position = positions.get(object_type)
+        properties = fields.get(object_type)
+        key = cache_key(after=(position or {}).get("after"), limit=limit, associations=associations,
+                        properties=",".join(properties or []), **filters)
+        return await acached_fetch(object_type, key, lambda: search_page(
+            client, object_type, filters, limit, position, properties, associations, app
+        ))
+
+    return await asyncio.gather(*(fetch(object_type) for object_type in object_types))
+
+
+def load_crm_pages(cursors, filters, limit, object_types=CRM_OBJECT_TYPES, fields=None, associations=True):
+    """Sync entry point for the HubSpot-backed /new-crm-objects payload.
+
+    Cursors are decoded up front so a malformed one raises ValueError before any call is made.
+    ``fields`` maps object types to the HubSpot properties to request.
+    """
+    positions = {object_type: decode_cursor(object_type, cursors.get(object_type)) for object_type in object_types}
+    app = current_app._get_current_object() if has_app_context() else None
+    pages = run_sync(lambda client: fetch_crm_pages(
+        client, object_types, positions, filters, limit, fields or {}, associations, app
+    ))
+
+    payload = {"pagination": {"limit": limit, "next_cursors": {}}}
+    for object_type, page in zip(object_types, pages):
+        payload[object_type] = page["items"] if page else []
+        payload["pagination"]["next_cursors"][object_type] = page["next_cursor"] if page else None
+    return payload
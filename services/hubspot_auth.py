@@ -1,29 +1,219 @@
+import fcntl
+import json
+import logging
 import os
+import threading
+import time
 import requests
-from dotenv import load_dotenv
-import logging
+from config import load_config
+from services.metrics import TOKEN_REFRESHES, hubspot_call
 
-load_dotenv()
+config = load_config()
 
-HUBSPOT_CLIENT_ID = os.getenv("HUBSPOT_CLIENT_ID")
-HUBSPOT_CLIENT_SECRET = os.getenv("HUBSPOT_CLIENT_SECRET")
-HUBSPOT_REFRESH_TOKEN = os.getenv("HUBSPOT_REFRESH_TOKEN")
-HUBSPOT_TOKEN_URL = "https://api.hubapi.com/oauth/v1/token"
 
-logging.basicConfig(filename="logs/hubspot_auth.log", level=logging.INFO)
+class FileTokenStore:
+    """Shares the current access token between processes through a JSON file.
 
-def get_access_token():
-    """Fetches a new access token using the refresh token."""
-    try:
-        response = requests.post(HUBSPOT_TOKEN_URL, data={
-            "grant_type": "refresh_token",
-            "client_id": HUBSPOT_CLIENT_ID,
-            "client_secret": HUBSPOT_CLIENT_SECRET,
-            "refresh_token": HUBSPOT_REFRESH_TOKEN
-        })
-        response.raise_for_status()
-        token_data = response.json()
-        return token_data.get("access_token")
-    except requests.RequestException as e:
-        logging.error(f"HubSpot Auth Failed: {str(e)}")
+    A sibling ``.lock`` file serialises refreshes so only one gunicorn worker
+    talks to the OAuth endpoint at a time; the others pick up its result.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock_path = f"{path}.lock"
+
+    def load(self):
+        """Returns ``(access_token, expires_at)`` or ``(None, 0)`` if nothing usable is stored."""
+        try:
+            with open(self.path) as fh:
+                data = json.load(fh)
+            return data.get("access_token"), float(data.get("expires_at", 0))
+        except (OSError, ValueError):
+            return None, 0
+
+    def save(self, access_token, expires_at):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w") as fh:
+                json.dump({"access_token": access_token, "expires_at": expires_at}, fh)
+            os.chmod(tmp_path, 0o600)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logging.error(f"Failed to persist HubSpot token: {str(e)}")
+
+    def acquire(self):
+        """Takes the cross-process refresh lock; returns a handle for ``release``."""
+        try:
+            handle = open(self.lock_path, "a")
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            return handle
+        except OSError as e:
+            logging.error(f"Failed to lock HubSpot token store: {str(e)}")
+            return None
+
+    def release(self, handle):
+        if handle is not None:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+            handle.close()
+
+
+class TokenManager:
+    """Caches the HubSpot OAuth access token and refreshes it shortly before expiry.
+
+    Concurrent callers that find the token stale block on a single in-flight
+    refresh instead of each POSTing to the token endpoint.
+    """
+
+    def __init__(self, client_id, client_secret, refresh_token, token_url,
+                 refresh_buffer=60, access_token=None, expires_at=0,
+                 store=None, background_refresh=True):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.refresh_token = refresh_token
+        self.token_url = token_url
+        self.refresh_buffer = refresh_buffer
+        self.store = store
+        self.background_refresh = background_refresh
+
+        self._access_token = access_token
+        self._expires_at = expires_at if access_token else 0
+        self._lock = threading.Lock()
+        self._timer = None
+        self._stats = {"cache_hits": 0, "store_hits": 0, "refreshes": 0, "refresh_failures": 0}
+        self._last_refresh_failed = False
+
+    def _is_fresh(self, expires_at, now=None):
+        return (now or time.time()) < expires_at - self.refresh_buffer
+
+    def cached_token(self):
+        """Returns the cached token while it is fresh, else None; never blocks or calls HubSpot."""
+        token, expires_at = self._access_token, self._expires_at
+        if token and self._is_fresh(expires_at):
+            self._stats["cache_hits"] += 1
+            return token
         return None
+
+    def get_token(self):
+        """Returns a valid access token, refreshing it only when it is about to expire."""
+        token = self.cached_token()
+        if token:
+            return token
+
+        with self._lock:
+            # Another thread may have refreshed while we were waiting for the lock.
+            if self._access_token and self._is_fresh(self._expires_at):
+                self._stats["cache_hits"] += 1
+                return self._access_token
+            return self._refresh_locked()
+
+    def invalidate(self):
+        """Drops the cached token so the next call refreshes it (e.g. after a 401)."""
+        with self._lock:
+            self._access_token = None
+            self._expires_at = 0
+
+    def stats(self):
+        """Returns counters for cache hits and refreshes plus the current expiry."""
+        return dict(self._stats, expires_at=self._expires_at)
+
+    def health(self):
+        """Reports the token state for readiness probes without calling HubSpot.
+
+        ``state`` is ``valid``, ``refresh_failed`` (no usable token and the last
+        refresh failed) or ``not_loaded`` (nothing fetched yet; the first call will).
+        """
+        now = time.time()
+        if self._access_token and now < self._expires_at:
+            return {"state": "valid", "expires_in": int(self._expires_at - now)}
+        return {"state": "refresh_failed" if self._last_refresh_failed else "not_loaded", "expires_in": 0}
+
+    def _refresh_locked(self, horizon=0):
+        handle = self.store.acquire() if self.store else None
+        try:
+            if self.store:
+                token, expires_at = self.store.load()
+                if token and self._is_fresh(expires_at, time.time() + horizon):
+                    self._stats["store_hits"] += 1
+                    self._set_token(token, expires_at)
+                    return token
+
+            token, expires_at = self._request_token()
+            if not token:
+                # Keep serving the old token while it has not actually expired.
+                if self._access_token and time.time() < self._expires_at:
+                    return self._access_token
+                return None
+
+            self._set_token(token, expires_at)
+            if self.store:
+                self.store.save(token, expires_at)
+            return token
+        finally:
+            if self.store:
+                self.store.release(handle)
+
+    def _request_token(self):
+        try:
+            with hubspot_call("POST", self.token_url) as call:
+                response = requests.post(self.token_url, data={
+                    "grant_type": "refresh_token",
+                    "client_id": self.client_id,
+                    "client_secret": self.client_secret,
+                    "refresh_token": self.refresh_token
+                }, timeout=10)
+                call["status"] = response.status_code
+            response.raise_for_status()
+            token_data = response.json()
+        except requests.RequestException as e:
+            self._stats["refresh_failures"] += 1
+            TOKEN_REFRESHES.labels("failure").inc()
+            self._last_refresh_failed = True
+            logging.error(f"HubSpot Auth Failed: {str(e)}")
+            return None, 0
+
+        self._stats["refreshes"] += 1
+        TOKEN_REFRESHES.labels("success").inc()
+        self._last_refresh_failed = False
+        expires_in = float(token_data.get("expires_in", 0))
+        return token_data.get("access_token"), time.time() + expires_in
+
+    def _set_token(self, token, expires_at):
+        self._access_token = token
+        self._expires_at = expires_at
+        if self.background_refresh:
+            self._schedule_refresh()
+
+    def _schedule_refresh(self):
+        """Refreshes in the background one buffer ahead of the point callers would block."""
+        if self._timer:
+            self._timer.cancel()
+        delay = self._expires_at - 2 * self.refresh_buffer - time.time()
+        if delay <= 0:
+            return
+        self._timer = threading.Timer(delay, self._background_refresh)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _background_refresh(self):
+        with self._lock:
+            if self._is_fresh(self._expires_at, time.time() + self.refresh_buffer):
+                return
+            self._refresh_locked(horizon=self.refresh_buffer)
+
+
+token_manager = TokenManager(
+    client_id=config.HUBSPOT_CLIENT_ID,
+    client_secret=config.HUBSPOT_CLIENT_SECRET,
+    refresh_token=config.HUBSPOT_REFRESH_TOKEN,
+    token_url=config.HUBSPOT_OAUTH_TOKEN_URL,
+    refresh_buffer=config.TOKEN_REFRESH_BUFFER,
+    access_token=config.HUBSPOT_ACCESS_TOKEN,
+    expires_at=config.HUBSPOT_TOKEN_EXPIRES_AT,
+    store=FileTokenStore(config.HUBSPOT_TOKEN_STORE_PATH) if config.HUBSPOT_TOKEN_STORE_PATH else None,
+    background_refresh=config.HUBSPOT_TOKEN_BACKGROUND_REFRESH,
+)
+
+
+def get_access_token():
+    """Returns a cached access token, refreshing it via the refresh token when needed."""
+    return token_manager.get_token()
@@ -0,0 +1,183 @@
+import logging
+import requests
+from marshmallow import INCLUDE, ValidationError
+from config import load_config
+from extensions import db
+from services.hubspot_client import hubspot_client
+from services.hubspot_api import HubSpotWriteError
+from services.hubspot_associations import chunked
+from services.persistence import local_contact_ids, upsert_contacts, upsert_deals, upsert_tickets
+from services.cache import invalidate_object_type
+from services import association_store
+from schemas.schemas import ContactSchema, DealSchema, TicketSchema
+from schemas.serialization import dump, get_schema
+
+config = load_config()
+
+# HubSpot-defined association type IDs used when creating records in batch
+DEAL_TO_CONTACT = 3
+TICKET_TO_CONTACT = 16
+TICKET_TO_DEAL = 28
+
+
+def _association(to_id, type_id):
+    return {"to": {"id": str(to_id)}, "types": [{"associationCategory": "HUBSPOT_DEFINED", "associationTypeId": type_id}]}
+
+
+def _extra_properties(item, schema):
+    """Fields outside the schema are forwarded to HubSpot as-is, like the single-object endpoints do."""
+    return {key: value for key, value in item.items() if key not in schema.fields}
+
+
+def contact_input(item):
+    properties = dict(_extra_properties(item, get_schema(ContactSchema)), **{
+        "email": item["email"],
+        "firstname": item["firstname"],
+        "lastname": item["lastname"],
+    })
+    if item.get("phone"):
+        properties["phone"] = item["phone"]
+    return {"idProperty": "email", "id": item["email"], "properties": properties}
+
+
+def deal_input(item):
+    properties = dict(_extra_properties(item, get_schema(DealSchema)), **{
+        "dealname": item["dealname"],
+        "amount": item["amount"],
+        "dealstage": item["dealstage"],
+    })
+    if item.get("pipeline"):
+        properties["pipeline"] = item["pipeline"]
+    return {"properties": properties, "associations": [_association(item["contact_id"], DEAL_TO_CONTACT)]}
+
+
+def ticket_input(item):
+    properties = dict(_extra_properties(item, get_schema(TicketSchema)), **{
+        "subject": item["subject"],
+        "content": item["description"],
+        "hs_ticket_category": item["category"],
+        "hs_pipeline": item["pipeline"],
+        "hs_ticket_priority": item["hs_ticket_priority"],
+        "hs_pipeline_stage": item["hs_pipeline_stage"],
+    })
+    associations = [_association(item["contact_id"], TICKET_TO_CONTACT)]
+    associations += [_association(deal_id, TICKET_TO_DEAL) for deal_id in item.get("deal_ids", [])]
+    return {"properties": properties, "associations": associations}
+
+
+def deal_associations(item):
+    return {"contacts": [item["contact_id"]]}
+
+
+def ticket_associations(item):
+    return {"contacts": [item["contact_id"]], "deals": item.get("deal_ids", [])}
+
+
+def _row(item, schema, hubspot_id, contact_ids):
+    """The local row for an item HubSpot stored; its HubSpot ``contact_id`` becomes the local one, or None."""
+    row = {key: value for key, value in item.items() if key in schema.load_fields}
+    row["hubspot_id"] = str(hubspot_id)
+    if "contact_id" in row:
+        row["contact_id"] = contact_ids.get(str(row["contact_id"]))
+    return row
+
+
+BATCH_OBJECTS = {
+    "contacts": {"schema": ContactSchema, "mode": "upsert", "to_input": contact_input, "upsert": upsert_contacts,
+                 "associations": None},
+    "deals": {"schema": DealSchema, "mode": "create", "to_input": deal_input, "upsert": upsert_deals,
+              "associations": deal_associations},
+    "tickets": {"schema": TicketSchema, "mode": "create", "to_input": ticket_input, "upsert": upsert_tickets,
+                "associations": ticket_associations},
+}
+
+
+def _error_indexes(error):
+    trace_ids = (error.get("context") or {}).get("objectWriteTraceId") or []
+    return [int(trace_id) for trace_id in trace_ids if str(trace_id).isdigit()]
+
+
+def _write_chunk(object_type, spec, chunk, results):
+    """Sends one chunk to HubSpot, persists what HubSpot accepted and fills ``results``."""
+    schema = get_schema(spec["schema"])
+    inputs = [dict(spec["to_input"](item), objectWriteTraceId=str(index)) for index, item in chunk]
+    try:
+        response = hubspot_client.post(f"/crm/v3/objects/{object_type}/batch/{spec['mode']}", json={"inputs": inputs})
+        response.raise_for_status()
+    except requests.RequestException as e:
+        logging.error(f"Batch {spec['mode']} of {object_type} failed: {str(e)}")
+        # False when HubSpot certainly did not apply the chunk, so resending these items can't duplicate them
+        applied = HubSpotWriteError.from_request_error(e).applied
+        for index, _ in chunk:
+            results[index] = {"index": index, "status": "error", "error": str(e), "applied": applied}
+        return
+
+    body = response.json()
+    invalidate_object_type(object_type)
+    items = dict(chunk)
+    written = {}
+    for obj in body.get("results", []):
+        trace_id = obj.get("objectWriteTraceId")
+        if trace_id is None and object_type == "contacts":
+            email = (obj.get("properties") or {}).get("email", "").lower()
+            trace_id = next((i for i, item in chunk if item["email"].lower() == email), None)
+        if trace_id is not None and int(trace_id) in items:
+            written[int(trace_id)] = obj
+
+    for error in body.get("errors", []):
+        for index in _error_indexes(error):
+            results[index] = {"index": index, "status": "error", "error": error.get("message", "HubSpot rejected item")}
+
+    if written:
+        try:
+            contact_ids = local_contact_ids(items[index].get("contact_id") for index in written)
+            stored = spec["upsert"]([
+                _row(items[index], schema, obj["id"], contact_ids) for index, obj in written.items()
+            ])
+        except Exception as e:
+            db.session.rollback()
+            for index, obj in written.items():
+                results[index] = {"index": index, "status": "error", "hubspot_id": str(obj["id"]),
+                                  "error": f"Database error: {str(e)}"}
+        else:
+            stored_by_id = {row["hubspot_id"]: row for row in stored}
+            for index, obj in written.items():
+                if str(obj["id"]) not in stored_by_id:
+                    # bulk_upsert skips a row whose unique fields belong to another stored record
+                    results[index] = {"index": index, "status": "error", "hubspot_id": str(obj["id"]),
+                                      "error": "Saved in HubSpot but conflicts with another local record"}
+                    continue
+                status = "created" if obj.get("new", spec["mode"] == "create") else "updated"
+                data = dump(spec["schema"], stored_by_id[str(obj["id"])])
+                results[index] = {"index": index, "status": status, "data": data}
+            if spec["associations"]:
+                association_store.record_created(object_type, {
+                    str(obj["id"]): spec["associations"](items[index]) for index, obj in written.items()
+                })
+
+    for index, _ in chunk:
+        results.setdefault(index, {"index": index, "status": "error", "error": "HubSpot did not return this item"})
+
+
+def batch_write(object_type, items):
+    """Validates ``items`` and writes them through HubSpot's CRM v3 batch endpoints.
+
+    Items go to HubSpot in chunks of ``HUBSPOT_BATCH_SIZE`` and every accepted
+    chunk is persisted in one DB transaction. Returns one result per input item,
+    in input order.
+    """
+    spec = BATCH_OBJECTS[object_type]
+    schema = get_schema(spec["schema"])
+    results = {}
+    valid = []
+
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, schema.load(item, partial=("hubspot_id",), unknown=INCLUDE)))
+        except ValidationError as e:
+            results[index] = {"index": index, "status": "invalid", "errors": e.messages}
+
+    for chunk in chunked(valid, config.HUBSPOT_BATCH_SIZE):
+        _write_chunk(object_type, spec, chunk, results)
+
+    return [results[index] for index in range(len(items))]
@@ -0,0 +1,156 @@
+import logging
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from config import load_config
+from services.hubspot_auth import token_manager
+from services.hubspot_ratelimit import rate_limiter, retry_policy
+from services.metrics import HUBSPOT_IN_FLIGHT, hubspot_call
+
+config = load_config()
+
+
+class HubSpotAuthError(requests.RequestException):
+    """Raised when no access token could be obtained for a HubSpot call."""
+
+
+class InFlight:
+    """Counts HubSpot calls in progress so a shutting-down worker can wait for them.
+
+    The count is mirrored to ``gauge`` when one is given.
+    """
+
+    def __init__(self, gauge=None):
+        self._count = 0
+        self._idle = threading.Condition()
+        self.gauge = gauge
+
+    def __enter__(self):
+        with self._idle:
+            self._count += 1
+        if self.gauge:
+            self.gauge.inc()
+
+    def __exit__(self, *exc_info):
+        if self.gauge:
+            self.gauge.dec()
+        with self._idle:
+            self._count -= 1
+            if not self._count:
+                self._idle.notify_all()
+
+    @property
+    def count(self):
+        return self._count
+
+    def wait_idle(self, timeout=None):
+        """Blocks until no call is in progress; returns False if ``timeout`` ran out first."""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._count == 0, timeout)
+
+
+class HubSpotClient:
+    """Shared HubSpot HTTP client with a pooled keep-alive session.
+
+    Owns the base URL, bearer token injection, connect/read timeouts, request
+    pacing and retries so the service modules only deal with paths and payloads.
+    """
+
+    def __init__(self, base_url, token_manager, connect_timeout=3.05, read_timeout=10,
+                 pool_connections=10, pool_maxsize=20, rate_limiter=None, retry_policy=None):
+        self.base_url = base_url.rstrip("/")
+        self.token_manager = token_manager
+        self.timeout = (connect_timeout, read_timeout)
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
+        self.in_flight = InFlight(HUBSPOT_IN_FLIGHT.labels("sync"))
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def url(self, path):
+        if path.startswith(("http://", "https://")):
+            return path
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def request(self, method, path, **kwargs):
+        """Sends an authenticated request and returns the ``requests.Response``.
+
+        Requests are paced by the shared rate limiter and retried with backoff on
+        429s, gateway errors and connection failures; a 401 refreshes the token once.
+        """
+        with self.in_flight:
+            return self._request(method, path, **kwargs)
+
+    def _request(self, method, path, **kwargs):
+        headers = dict(kwargs.pop("headers", None) or {})
+        kwargs.setdefault("timeout", self.timeout)
+        url = self.url(path)
+        attempt = 0
+        reauthenticated = False
+
+        while True:
+            token = self.token_manager.get_token()
+            if not token:
+                raise HubSpotAuthError("Failed to retrieve access token.")
+            headers["Authorization"] = f"Bearer {token}"
+
+            if self.rate_limiter:
+                self.rate_limiter.wait()
+            try:
+                with hubspot_call(method, path) as call:
+                    response = self.session.request(method, url, headers=headers, **kwargs)
+                    call["status"] = response.status_code
+            except (requests.ConnectionError, requests.Timeout) as e:
+                connect_error = isinstance(e, requests.ConnectTimeout) or not isinstance(e, requests.Timeout)
+                if not (self.retry_policy and self.retry_policy.can_retry_error(method, attempt, connect_error, path)):
+                    raise
+                delay = self.retry_policy.delay(attempt)
+                logging.warning(f"HubSpot {method} {path} failed ({str(e)}), retrying in {delay:.2f}s")
+                time.sleep(delay)
+                attempt += 1
+                continue
+
+            if self.rate_limiter:
+                self.rate_limiter.update(response.headers)
+
+            if response.status_code == 401 and not reauthenticated:
+                self.token_manager.invalidate()
+                reauthenticated = True
+                continue
+
+            if not (self.retry_policy and self.retry_policy.should_retry(
+                method, response.status_code, attempt, response.headers, path
+            )):
+                return response
+
+            delay = self.retry_policy.delay(attempt, response.headers)
+            if response.status_code == 429 and self.rate_limiter:
+                self.rate_limiter.pause(delay)
+            logging.warning(f"HubSpot {method} {path} returned {response.status_code}, retrying in {delay:.2f}s")
+            time.sleep(delay)
+            attempt += 1
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+hubspot_client = HubSpotClient(
+    base_url=config.HUBSPOT_API_BASE_URL,
+    token_manager=token_manager,
+    connect_timeout=config.HUBSPOT_CONNECT_TIMEOUT,
+    read_timeout=config.HUBSPOT_READ_TIMEOUT,
+    pool_connections=config.HUBSPOT_POOL_CONNECTIONS,
+    pool_maxsize=config.HUBSPOT_POOL_MAXSIZE,
+    rate_limiter=rate_limiter,
+    retry_policy=retry_policy,
+)
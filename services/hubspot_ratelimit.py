@@ -0,0 +1,178 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from config import load_config
+
+config = load_config()
+
+
+class TokenBucket:
+    """Classic token bucket: ``capacity`` requests refilled evenly over ``period`` seconds."""
+
+    def __init__(self, capacity, period):
+        self.capacity = float(capacity)
+        self.period = float(period)
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+
+    @property
+    def rate(self):
+        return self.capacity / self.period
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def reserve(self, now):
+        """Takes one token and returns how long the caller must wait before using it."""
+        self._refill(now)
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def resize(self, capacity, period, now):
+        self._refill(now)
+        self.capacity, self.period = float(capacity), float(period)
+        self.tokens = min(self.tokens, self.capacity)
+
+    def clamp(self, remaining, now):
+        """Never believe we have more budget than HubSpot says is left."""
+        self._refill(now)
+        self.tokens = min(self.tokens, float(remaining))
+
+
+class RateLimiter:
+    """Client-side pacing for HubSpot calls, kept in sync with ``X-HubSpot-RateLimit-*`` headers.
+
+    One bucket tracks the rolling interval quota (``-Max``/``-Interval-Milliseconds``)
+    and a second one the per-second quota when HubSpot reports it. Callers reserve
+    a slot before sending and sleep for the returned delay, so bursts are spread
+    out ahead of time instead of being rejected with 429s.
+    """
+
+    def __init__(self, capacity=100, period=10.0):
+        self._lock = threading.Lock()
+        self.interval = TokenBucket(capacity, period)
+        self.secondly = None
+        self.paused_until = 0.0
+
+    def reserve(self):
+        """Returns the number of seconds to wait before the next request may be sent."""
+        with self._lock:
+            now = time.monotonic()
+            delay = self.interval.reserve(now)
+            if self.secondly:
+                delay = max(delay, self.secondly.reserve(now))
+            return max(delay, self.paused_until - now)
+
+    def wait(self):
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    def update(self, headers):
+        """Adjusts the buckets from the rate limit headers of a HubSpot response."""
+        with self._lock:
+            now = time.monotonic()
+            limit = _header_float(headers, "X-HubSpot-RateLimit-Max")
+            interval_ms = _header_float(headers, "X-HubSpot-RateLimit-Interval-Milliseconds")
+            if limit and interval_ms:
+                self.interval.resize(limit, interval_ms / 1000.0, now)
+            remaining = _header_float(headers, "X-HubSpot-RateLimit-Remaining")
+            if remaining is not None:
+                self.interval.clamp(remaining, now)
+
+            secondly = _header_float(headers, "X-HubSpot-RateLimit-Secondly")
+            if secondly:
+                if self.secondly is None:
+                    self.secondly = TokenBucket(secondly, 1.0)
+                else:
+                    self.secondly.resize(secondly, 1.0, now)
+            secondly_remaining = _header_float(headers, "X-HubSpot-RateLimit-Secondly-Remaining")
+            if self.secondly and secondly_remaining is not None:
+                self.secondly.clamp(secondly_remaining, now)
+
+    def pause(self, seconds):
+        """Holds every caller back for ``seconds`` (used when HubSpot answers 429)."""
+        with self._lock:
+            now = time.monotonic()
+            self.paused_until = max(self.paused_until, now + seconds)
+            self.interval.tokens = min(self.interval.tokens, 0.0)
+
+
+class RetryPolicy:
+    """Jittered exponential backoff driven by ``HUBSPOT_MAX_RETRIES``/``HUBSPOT_BACKOFF_*``."""
+
+    IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+    # CRM search and batch reads are POSTs that change nothing, so they retry like GETs
+    READ_ONLY_POST_SUFFIXES = ("/search", "/batch/read")
+    # Only these mean HubSpot did not process the request. A 502 or 504 comes from a
+    # gateway that may have passed the write on, so replaying a POST could duplicate it.
+    THROTTLED = 429
+    UNAVAILABLE = 503
+
+    def __init__(self, max_retries=3, backoff_factor=2.0, backoff_multiplier=1.0, max_backoff=60.0):
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.backoff_multiplier = backoff_multiplier
+        self.max_backoff = max_backoff
+
+    def idempotent(self, method, path=None):
+        if method.upper() in self.IDEMPOTENT_METHODS:
+            return True
+        return method.upper() == "POST" and bool(path) and path.split("?")[0].endswith(self.READ_ONLY_POST_SUFFIXES)
+
+    def should_retry(self, method, status_code, attempt, headers=None, path=None):
+        """Any 5xx is retried for reads; writes only on 429, or 503 with ``Retry-After``."""
+        if attempt >= self.max_retries:
+            return False
+        if status_code == self.THROTTLED:
+            return True
+        if self.idempotent(method, path):
+            return status_code >= 500
+        return status_code == self.UNAVAILABLE and _retry_after(headers or {}) is not None
+
+    def can_retry_error(self, method, attempt, connect_error, path=None):
+        """Connection failures are only replayed when the request cannot have reached HubSpot."""
+        if attempt >= self.max_retries:
+            return False
+        return connect_error or self.idempotent(method, path)
+
+    def delay(self, attempt, headers=None):
+        """Seconds to wait before retry number ``attempt + 1``, honouring ``Retry-After``."""
+        retry_after = _retry_after(headers or {})
+        if retry_after is not None:
+            return min(retry_after, self.max_backoff)
+        backoff = min(self.backoff_multiplier * self.backoff_factor ** attempt, self.max_backoff)
+        return random.uniform(backoff / 2, backoff)
+
+
+def _header_float(headers, name):
+    value = headers.get(name)
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _retry_after(headers):
+    value = headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+rate_limiter = RateLimiter(capacity=config.HUBSPOT_RATE_LIMIT, period=config.HUBSPOT_RATE_LIMIT_INTERVAL)
+
+retry_policy = RetryPolicy(
+    max_retries=config.HUBSPOT_MAX_RETRIES,
+    backoff_factor=config.HUBSPOT_BACKOFF_FACTOR,
+    backoff_multiplier=config.HUBSPOT_BACKOFF_MULTIPLIER,
+)
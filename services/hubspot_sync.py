@@ -0,0 +1,321 @@
+import logging
+import threading
+import time
+from datetime import datetime
+import click
+import requests
+from sqlalchemy import func, select, text
+from sqlalchemy.exc import SQLAlchemyError
+from services.hubspot_client import hubspot_client
+from services.hubspot_associations import read_associations
+from services.persistence import bulk_upsert, local_contact_ids
+from extensions import db
+from models.models import Contact, Deal, Ticket, SyncState
+
+# CRM search stops paging at 10,000 results per query; past that we restart
+# from the last seen modification time.
+SEARCH_RESULT_LIMIT = 10000
+SEARCH_PAGE_SIZE = 100
+# Advisory lock key held by the one process that runs the scheduler; any bigint shared by all processes
+SCHEDULER_LOCK_KEY = 0x6875627370  # "hubsp"
+
+
+def to_epoch_ms(value):
+    """Normalises HubSpot timestamps (epoch ms or ISO-8601 strings) to epoch milliseconds."""
+    if value in (None, ""):
+        return 0
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return int(datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp() * 1000)
+
+
+def _first_contact_ids(object_type, records):
+    # Records reach here because they changed, so their stored associations are revalidated
+    associations = read_associations(object_type, "contacts", [record["id"] for record in records], refresh=True)
+    local_ids = local_contact_ids({ids[0] for ids in associations.values() if ids})
+    return {
+        object_id: local_ids.get(ids[0]) if ids else None
+        for object_id, ids in associations.items()
+    }
+
+
+def contact_rows(records):
+    rows = []
+    for record in records:
+        props = record.get("properties", {})
+        if not props.get("email"):
+            logging.warning(f"Skipping HubSpot contact {record['id']} without an email")
+            continue
+        rows.append({
+            "hubspot_id": str(record["id"]),
+            "email": props["email"],
+            "firstname": props.get("firstname") or "",
+            "lastname": props.get("lastname") or "",
+            "phone": props.get("phone"),
+        })
+    return rows
+
+
+def deal_rows(records):
+    contact_ids = _first_contact_ids("deals", records)
+    return [
+        {
+            "hubspot_id": str(record["id"]),
+            "dealname": record["properties"].get("dealname") or "",
+            "amount": float(record["properties"].get("amount") or 0),
+            "dealstage": record["properties"].get("dealstage") or "",
+            "pipeline": record["properties"].get("pipeline"),
+            "contact_id": contact_ids.get(str(record["id"])),
+        }
+        for record in records
+    ]
+
+
+def ticket_rows(records):
+    contact_ids = _first_contact_ids("tickets", records)
+    deal_ids = read_associations("tickets", "deals", [record["id"] for record in records], refresh=True)
+    return [
+        {
+            "hubspot_id": str(record["id"]),
+            "subject": record["properties"].get("subject") or "",
+            "description": record["properties"].get("content") or "",
+            "category": record["properties"].get("hs_ticket_category") or "",
+            "pipeline": record["properties"].get("hs_pipeline") or "",
+            "hs_ticket_priority": record["properties"].get("hs_ticket_priority") or "",
+            "hs_pipeline_stage": record["properties"].get("hs_pipeline_stage") or "",
+            "contact_id": contact_ids.get(str(record["id"])),
+            "deal_ids": [int(deal_id) for deal_id in deal_ids.get(str(record["id"]), [])],
+        }
+        for record in records
+    ]
+
+
+# Contacts come first so deals and tickets can resolve their local contact_id.
+SYNC_OBJECTS = {
+    "contacts": {
+        "model": Contact,
+        "modified_property": "lastmodifieddate",
+        "properties": ["email", "firstname", "lastname", "phone"],
+        "to_rows": contact_rows,
+    },
+    "deals": {
+        "model": Deal,
+        "modified_property": "hs_lastmodifieddate",
+        "properties": ["dealname", "amount", "dealstage", "pipeline"],
+        "to_rows": deal_rows,
+    },
+    "tickets": {
+        "model": Ticket,
+        "modified_property": "hs_lastmodifieddate",
+        "properties": ["subject", "content", "hs_ticket_category", "hs_pipeline",
+                       "hs_ticket_priority", "hs_pipeline_stage"],
+        "to_rows": ticket_rows,
+    },
+}
+
+
+def search_modified_since(object_type, since, modified_property, properties, max_records=None):
+    """Yields pages of ``object_type`` records modified at or after ``since`` (epoch ms), oldest first.
+
+    Pages are requested as the caller consumes them, so memory stays at one page.
+    ``max_records`` stops the search once that many records were yielded.
+    """
+    remaining = max_records
+    while True:
+        body = {
+            "filterGroups": [{"filters": [
+                {"propertyName": modified_property, "operator": "GTE", "value": str(since)}
+            ]}],
+            "sorts": [{"propertyName": modified_property, "direction": "ASCENDING"}],
+            "properties": list(properties) + [modified_property],
+            "limit": SEARCH_PAGE_SIZE,
+        }
+        last_seen = since
+        while True:
+            response = hubspot_client.post(f"/crm/v3/objects/{object_type}/search", json=body)
+            response.raise_for_status()
+            data = response.json()
+            results = data.get("results", [])
+            if remaining is not None:
+                results = results[:remaining]
+                remaining -= len(results)
+            if results:
+                last_seen = to_epoch_ms(results[-1]["properties"].get(modified_property))
+                yield results
+            if remaining == 0:
+                return
+
+            after = data.get("paging", {}).get("next", {}).get("after")
+            if not after:
+                return
+            if int(after) >= SEARCH_RESULT_LIMIT:
+                break
+            body["after"] = after
+
+        if last_seen <= since:
+            logging.warning(f"More than {SEARCH_RESULT_LIMIT} {object_type} share one modification time; stopping")
+            return
+        since = last_seen
+
+
+def sync_object_type(object_type, full=False):
+    """Pulls ``object_type`` changes since its high-water mark into the local table.
+
+    Each page is committed together with the advanced high-water mark, so an
+    interrupted run resumes where it stopped.
+    """
+    spec = SYNC_OBJECTS[object_type]
+    state = db.session.get(SyncState, object_type) or SyncState(object_type=object_type, high_water_mark=0)
+    since = 0 if full else state.high_water_mark
+    synced = 0
+
+    for records in search_modified_since(object_type, since, spec["modified_property"], spec["properties"]):
+        rows = spec["to_rows"](records)
+        try:
+            bulk_upsert(spec["model"], rows, commit=False)
+            state.high_water_mark = max(
+                state.high_water_mark or 0,
+                max(to_epoch_ms(record["properties"].get(spec["modified_property"])) for record in records),
+            )
+            state.last_run_at = datetime.utcnow()
+            db.session.add(state)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        synced += len(rows)
+
+    logging.info(f"Synced {synced} {object_type} from HubSpot")
+    return synced
+
+
+def sync_all(full=False):
+    """Syncs every object type; returns ``{object_type: records synced}``."""
+    results = {}
+    for object_type in SYNC_OBJECTS:
+        try:
+            results[object_type] = sync_object_type(object_type, full=full)
+        except requests.RequestException as e:
+            logging.error(f"Failed to sync {object_type}: {str(e)}")
+            results[object_type] = None
+    return results
+
+
+class SchedulerLease:
+    """A Postgres advisory lock that makes one process in the deployment the sync scheduler.
+
+    Every worker and replica starts a scheduler thread, but only the holder of
+    the lock runs ``sync_all``; the others check again on each tick. The lock is
+    session-level, so it lives on a dedicated connection, and Postgres releases
+    it when the holder's process or connection dies.
+    """
+
+    def __init__(self, key=SCHEDULER_LOCK_KEY):
+        self.key = key
+        self._connection = None
+
+    def acquire(self):
+        """Returns True while this process holds the lock, taking it if it is free."""
+        if self._connection is not None:
+            try:
+                self._connection.execute(text("SELECT 1"))
+                return True
+            except SQLAlchemyError as e:
+                logging.warning(f"Lost the sync scheduler lock: {str(e)}")
+                self._close()
+        connection = None
+        try:
+            # Autocommit, so the connection does not sit idle in a transaction while it holds the lock
+            connection = db.engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+            if connection.execute(select(func.pg_try_advisory_lock(self.key))).scalar():
+                self._connection = connection
+                return True
+        except SQLAlchemyError as e:
+            logging.error(f"Failed to take the sync scheduler lock: {str(e)}")
+        if connection is not None:
+            connection.close()
+        return False
+
+    def release(self):
+        if self._connection is None:
+            return
+        try:
+            self._connection.execute(select(func.pg_advisory_unlock(self.key)))
+        except SQLAlchemyError as e:
+            logging.error(f"Failed to release the sync scheduler lock: {str(e)}")
+        self._close()
+
+    def _close(self):
+        try:
+            self._connection.close()
+        except SQLAlchemyError:
+            pass
+        self._connection = None
+
+
+def start_sync_scheduler(app, interval, stop=None):
+    """Runs ``sync_all`` every ``interval`` seconds on a daemon thread until ``stop`` is set.
+
+    Only the process holding the ``SchedulerLease`` runs the sync, so the
+    deployment makes one set of HubSpot calls per interval however many
+    workers start a scheduler.
+    """
+    stop = stop or threading.Event()
+
+    def run():
+        lease = SchedulerLease()
+        while not stop.is_set():
+            with app.app_context():
+                if lease.acquire():
+                    try:
+                        sync_all()
+                    except Exception as e:
+                        logging.error(f"HubSpot sync run failed: {str(e)}")
+            stop.wait(interval)
+        with app.app_context():
+            lease.release()
+
+    thread = threading.Thread(target=run, name="hubspot-sync", daemon=True)
+    thread.start()
+    return thread
+
+
+def init_app(app):
+    """Registers the ``flask sync-hubspot`` command."""
+
+    @app.cli.command("sync-hubspot")
+    @click.option("--object-type", type=click.Choice(list(SYNC_OBJECTS)), help="Sync a single object type.")
+    @click.option("--full", is_flag=True, help="Ignore the stored high-water marks.")
+    def sync_hubspot_command(object_type, full):
+        """Pull HubSpot changes into the local contacts/deals/tickets tables."""
+        if object_type:
+            click.echo(f"{object_type}: {sync_object_type(object_type, full=full)}")
+        else:
+            for name, count in sync_all(full=full).items():
+                click.echo(f"{name}: {count}")
+
+
+_stop = threading.Event()
+_threads = []
+
+
+def start(app):
+    """Starts the background scheduler when HUBSPOT_SYNC_INTERVAL is set; called once per process.
+
+    Every process starts one, and the ``SchedulerLease`` lets a single one of them sync.
+    """
+    interval = app.config.get("HUBSPOT_SYNC_INTERVAL", 0)
+    if interval > 0:
+        _threads.append(start_sync_scheduler(app, interval, stop=_stop))
+
+
+def stop(timeout=None):
+    """Stops the scheduler after its current run, waiting up to ``timeout`` seconds for it.
+
+    Pages are committed as they arrive, so a run cut off at the deadline resumes next time.
+    """
+    _stop.set()
+    deadline = None if timeout is None else time.monotonic() + timeout
+    for thread in _threads:
+        thread.join(None if deadline is None else max(0, deadline - time.monotonic()))
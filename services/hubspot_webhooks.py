@@ -0,0 +1,258 @@
+import base64
+import hashlib
+import hmac
+import logging
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import Float, update
+from sqlalchemy.dialects.postgresql import insert
+from extensions import db
+from models.models import WebhookEvent
+from services import association_store
+from services.cache import invalidate_object_type
+from services.hubspot_associations import read_objects
+from services.hubspot_sync import SYNC_OBJECTS
+from services.persistence import bulk_upsert
+
+# "contact.propertyChange" -> "contacts"
+SUBSCRIPTION_OBJECTS = {"contact": "contacts", "deal": "deals", "ticket": "tickets"}
+
+# HubSpot property -> local column, for property changes we can apply without a read
+PROPERTY_COLUMNS = {
+    "contacts": {"email": "email", "firstname": "firstname", "lastname": "lastname", "phone": "phone"},
+    "deals": {"dealname": "dealname", "amount": "amount", "dealstage": "dealstage", "pipeline": "pipeline"},
+    "tickets": {
+        "subject": "subject",
+        "content": "description",
+        "hs_ticket_category": "category",
+        "hs_pipeline": "pipeline",
+        "hs_ticket_priority": "hs_ticket_priority",
+        "hs_pipeline_stage": "hs_pipeline_stage",
+    },
+}
+
+# Events that carry no property values; the object is read from HubSpot instead
+FETCH_EVENTS = {"creation", "restore", "merge", "associationChange"}
+
+# Percent-escapes HubSpot decodes in the URI before signing it
+SIGNATURE_URI_ESCAPES = {
+    "%3A": ":", "%2F": "/", "%3F": "?", "%40": "@", "%21": "!", "%24": "$",
+    "%27": "'", "%28": "(", "%29": ")", "%2A": "*", "%2C": ",", "%3B": ";",
+}
+
+
+def signature_uri(url):
+    for escape, char in SIGNATURE_URI_ESCAPES.items():
+        url = url.replace(escape, char).replace(escape.lower(), char)
+    return url
+
+
+def verify_signature(secret, method, uri, body, timestamp, signature, max_age=300):
+    """Checks HubSpot's ``X-HubSpot-Signature-v3`` header.
+
+    The signature is the base64 HMAC-SHA256, keyed with the app's client secret,
+    of method + URI + raw body + ``X-HubSpot-Request-Timestamp``. Requests whose
+    timestamp is more than ``max_age`` seconds away from now are rejected so a
+    captured request cannot be replayed later.
+    """
+    if not secret or not signature or not timestamp:
+        return False
+    try:
+        sent_at = int(timestamp) / 1000
+    except ValueError:
+        return False
+    if abs(time.time() - sent_at) > max_age:
+        return False
+
+    message = f"{method}{signature_uri(uri)}".encode() + body + timestamp.encode()
+    expected = base64.b64encode(hmac.new(secret.encode(), message, hashlib.sha256).digest()).decode()
+    return hmac.compare_digest(expected, signature)
+
+
+def _record_new(events):
+    """Inserts the events' IDs into ``webhook_events`` and returns the events not seen before.
+
+    Runs in the caller's transaction, so the IDs are only kept if the changes
+    they describe are committed too; a failed delivery is applied on HubSpot's retry.
+    """
+    rows = {}
+    for event in events:
+        rows.setdefault(int(event["eventId"]), {
+            "event_id": int(event["eventId"]),
+            "subscription_type": event["subscriptionType"],
+            "object_id": str(event.get("objectId") or event.get("fromObjectId") or "") or None,
+            "occurred_at": event.get("occurredAt"),
+        })
+    if not rows:
+        return []
+    stmt = (
+        insert(WebhookEvent.__table__)
+        .values(list(rows.values()))
+        .on_conflict_do_nothing(index_elements=["event_id"])
+        .returning(WebhookEvent.__table__.c.event_id)
+    )
+    new_ids = set(db.session.execute(stmt).scalars())
+    seen = set()
+    fresh = []
+    for event in events:
+        event_id = int(event["eventId"])
+        if event_id in new_ids and event_id not in seen:
+            seen.add(event_id)
+            fresh.append(event)
+    return fresh
+
+
+def _column_value(model, column, value):
+    """Coerces a webhook ``propertyValue`` the way the sync coerces search results."""
+    column = model.__table__.c[column]
+    if isinstance(column.type, Float):
+        return float(value or 0)
+    if column.nullable:
+        return value or None
+    return value or ""
+
+
+def _plan(events):
+    """Splits events into ``{object_type: {object_id: {column: value}}}`` updates and objects to read.
+
+    Property changes are applied in ``occurredAt`` order. Objects that were created,
+    restored, merged or re-associated, or that are not in the local table yet,
+    are read from HubSpot in full instead.
+    """
+    updates = {object_type: {} for object_type in SYNC_OBJECTS}
+    fetch = {object_type: set() for object_type in SYNC_OBJECTS}
+
+    for event in sorted(events, key=lambda event: event.get("occurredAt") or 0):
+        prefix, _, action = event["subscriptionType"].partition(".")
+        object_type = SUBSCRIPTION_OBJECTS.get(prefix)
+        object_id = str(event.get("objectId") or event.get("fromObjectId") or "")
+        if object_type is None or not object_id:
+            continue
+        if action in FETCH_EVENTS:
+            fetch[object_type].add(object_id)
+            # The other side of an association change embeds it too (deal.contact_id, ticket.deal_ids)
+            to_type = SUBSCRIPTION_OBJECTS.get(str(event.get("associationType", "")).rpartition("_TO_")[2].lower())
+            if action == "associationChange" and to_type and event.get("toObjectId"):
+                fetch[to_type].add(str(event["toObjectId"]))
+        elif action == "propertyChange":
+            column = PROPERTY_COLUMNS[object_type].get(event.get("propertyName"))
+            if column:
+                updates[object_type].setdefault(object_id, {})[column] = event.get("propertyValue")
+        # Deletions are acknowledged but leave the local row in place, like the sync does
+
+    return updates, fetch
+
+
+def _association_plan(events):
+    """Returns the association store changes ``events`` imply.
+
+    ``(added, removed, forgotten, deleted)``: edges to add and remove as
+    ``(type, id, type, id)`` tuples, the last change to a pair winning, plus
+    ``{object_type: ids}`` whose stored associations are stale (restored and
+    merged objects) or gone (deleted and merged-away objects).
+    """
+    edges = {}
+    forgotten = {object_type: set() for object_type in SYNC_OBJECTS}
+    deleted = {object_type: set() for object_type in SYNC_OBJECTS}
+
+    for event in sorted(events, key=lambda event: event.get("occurredAt") or 0):
+        prefix, _, action = event["subscriptionType"].partition(".")
+        object_type = SUBSCRIPTION_OBJECTS.get(prefix)
+        object_id = str(event.get("objectId") or event.get("fromObjectId") or "")
+        if object_type is None or not object_id:
+            continue
+        if action == "associationChange":
+            to_type = SUBSCRIPTION_OBJECTS.get(str(event.get("associationType", "")).rpartition("_TO_")[2].lower())
+            if to_type and event.get("toObjectId"):
+                pair = tuple(sorted([(object_type, object_id), (to_type, str(event["toObjectId"]))]))
+                edges[pair] = not event.get("associationRemoved")
+        elif action == "deletion":
+            deleted[object_type].add(object_id)
+        elif action in ("restore", "merge"):
+            forgotten[object_type].add(object_id)
+            merged = {str(merged_id) for merged_id in event.get("mergedObjectIds") or []}
+            deleted[object_type].update(merged - {object_id})
+
+    added = [a + b for (a, b), present in edges.items() if present]
+    removed = [a + b for (a, b), present in edges.items() if not present]
+    return added, removed, forgotten, deleted
+
+
+def _apply_associations(events):
+    """Mirrors association changes into the association store, in the caller's transaction.
+
+    Runs after the fetches: their association reads write the store on their own
+    connection, which would wait on rows this transaction had already locked.
+    """
+    if not association_store.enabled():
+        return
+    added, removed, forgotten, deleted = _association_plan(events)
+    association_store.add_edges(added, commit=False)
+    association_store.remove_edges(removed, commit=False)
+    for object_type in SYNC_OBJECTS:
+        association_store.forget(object_type, forgotten[object_type], commit=False)
+        association_store.remove_objects(object_type, deleted[object_type], commit=False)
+
+
+def _apply_updates(object_type, changes, fetch):
+    """Writes property changes to rows we already have; unknown objects are added to ``fetch``."""
+    model = SYNC_OBJECTS[object_type]["model"]
+    pending = {object_id: columns for object_id, columns in changes.items() if object_id not in fetch}
+    if not pending:
+        return 0
+    local_ids = dict(
+        db.session.query(model.hubspot_id, model.id).filter(model.hubspot_id.in_(list(pending)))
+    )
+    rows = []
+    now = datetime.utcnow()
+    for object_id, columns in pending.items():
+        if object_id not in local_ids:
+            fetch.add(object_id)
+            continue
+        row = {column: _column_value(model, column, value) for column, value in columns.items()}
+        rows.append(dict(row, id=local_ids[object_id], updated_at=now))
+    if rows:
+        db.session.execute(update(model), rows)
+    return len(rows)
+
+
+def _fetch_and_upsert(object_type, object_ids):
+    """Reads ``object_ids`` in batches and upserts them; objects HubSpot no longer has are skipped."""
+    spec = SYNC_OBJECTS[object_type]
+    records = list(read_objects(object_type, object_ids, spec["properties"]).values())
+    if not records:
+        return 0
+    return len(bulk_upsert(spec["model"], spec["to_rows"](records), commit=False))
+
+
+def process_events(events, retention_days=7):
+    """Applies a batch of HubSpot webhook events to the local tables in one transaction.
+
+    Already-processed ``eventId``s are skipped. Contacts are handled before deals
+    and tickets so those resolve their local ``contact_id``. Raises on failure
+    after rolling back, so the delivery is answered with an error and retried.
+    Returns counts for the response.
+    """
+    try:
+        fresh = _record_new(events)
+        updates, fetch = _plan(fresh)
+        updated = fetched = 0
+        for object_type in SYNC_OBJECTS:
+            updated += _apply_updates(object_type, updates[object_type], fetch[object_type])
+            if fetch[object_type]:
+                fetched += _fetch_and_upsert(object_type, fetch[object_type])
+        _apply_associations(fresh)
+        # HubSpot stops retrying after three days, so older IDs can't come back
+        db.session.query(WebhookEvent).filter(
+            WebhookEvent.received_at < datetime.utcnow() - timedelta(days=retention_days)
+        ).delete(synchronize_session=False)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"Failed to process HubSpot webhook events: {str(e)}")
+        raise
+
+    for object_type in SYNC_OBJECTS:
+        if updates[object_type] or fetch[object_type]:
+            invalidate_object_type(object_type)
+    return {"received": len(events), "duplicates": len(events) - len(fresh), "updated": updated, "fetched": fetched}
@@ -0,0 +1,206 @@
+import hashlib
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+from functools import wraps
+from flask import current_app, g, jsonify, make_response, request
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import SQLAlchemyError
+from werkzeug.exceptions import HTTPException
+from extensions import api_client_key
+from models.models import IdempotencyKey
+from services.metrics import IDEMPOTENT_REQUESTS
+from services.persistence import transaction
+
+keys = IdempotencyKey.__table__
+
+HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+# Response headers stored with the body; the rest are regenerated on replay
+STORED_HEADERS = ("Content-Type", "Location", "Preference-Applied")
+MAX_KEY_LENGTH = 255
+
+# Expired keys are swept at most this often, per process
+PRUNE_INTERVAL = 60
+_pruned_at = 0
+
+
+def fingerprint():
+    """Hashes the request's method, path and body; JSON bodies are compared by value, not by formatting."""
+    body = request.get_json(silent=True)
+    if body is None:
+        payload = request.get_data()
+    else:
+        payload = json.dumps(body, sort_keys=True, separators=(",", ":")).encode()
+    return hashlib.sha256(f"{request.method} {request.path}\n".encode() + payload).hexdigest()
+
+
+def _prune(connection, now):
+    global _pruned_at
+    if time.monotonic() - _pruned_at >= PRUNE_INTERVAL:
+        _pruned_at = time.monotonic()
+        connection.execute(delete(keys).where(keys.c.expires_at <= now))
+
+
+def _where(client, key):
+    return and_(keys.c.client == client, keys.c.key == key)
+
+
+def claim(client, key, digest):
+    """Takes ``key`` for this request; returns None if it did, else the row that holds it.
+
+    A key that expired, or whose request died while processing (``locked_until``
+    passed) with the same fingerprint, is taken over. Runs in its own
+    transaction so the claim is visible to duplicates straight away.
+    """
+    now = datetime.utcnow()
+    values = {
+        "client": client,
+        "key": key,
+        "fingerprint": digest,
+        "status": "processing",
+        "response_status": None,
+        "response_body": None,
+        "response_headers": None,
+        "locked_until": now + timedelta(seconds=current_app.config["IDEMPOTENCY_LOCK_TIMEOUT"]),
+        "created_at": now,
+        "expires_at": now + timedelta(seconds=current_app.config["IDEMPOTENCY_TTL"]),
+    }
+    statement = insert(keys).values(values)
+    statement = statement.on_conflict_do_update(
+        index_elements=["client", "key"],
+        set_={column: statement.excluded[column] for column in values if column not in ("client", "key")},
+        where=or_(
+            keys.c.expires_at <= now,
+            and_(keys.c.status == "processing", keys.c.locked_until <= now, keys.c.fingerprint == digest),
+        ),
+    ).returning(keys.c.key)
+    with transaction() as connection:
+        _prune(connection, now)
+        if connection.execute(statement).first() is not None:
+            return None
+        return connection.execute(select(keys).where(_where(client, key))).first()
+
+
+def complete(client, key, response):
+    """Stores ``response`` as the answer to ``key``; on failure the key is left to expire its lock."""
+    headers = {name: response.headers[name] for name in STORED_HEADERS if name in response.headers}
+    try:
+        with transaction() as connection:
+            connection.execute(update(keys).where(_where(client, key)).values(
+                status="completed",
+                response_status=response.status_code,
+                response_body=response.get_data(as_text=True),
+                response_headers=headers,
+                locked_until=None,
+            ))
+    except SQLAlchemyError as e:
+        logging.error(f"Failed to store idempotent response: {str(e)}")
+
+
+def release(client, key):
+    """Frees ``key`` after a failure, so a retry runs the request again."""
+    try:
+        with transaction() as connection:
+            connection.execute(delete(keys).where(_where(client, key), keys.c.status == "processing"))
+    except SQLAlchemyError as e:
+        logging.error(f"Failed to release idempotency key: {str(e)}")
+
+
+def allow_retry():
+    """Marks the current request as failed before its write reached HubSpot.
+
+    ``idempotent`` then frees the key instead of storing the response, so a retry
+    with the same key runs the write again.
+    """
+    g.idempotency_retry = True
+
+
+def replay(row):
+    response = current_app.response_class(row.response_body, status=row.response_status)
+    for name, value in (row.response_headers or {}).items():
+        response.headers[name] = value
+    response.headers[REPLAYED_HEADER] = "true"
+    return response
+
+
+def _error(message, status):
+    IDEMPOTENT_REQUESTS.labels({409: "in_progress", 422: "mismatch"}.get(status, "invalid")).inc()
+    return jsonify({"error": message}), status
+
+
+def _wait(client, key, digest):
+    """Claims ``key`` or waits for the request holding it; returns None once claimed, else a response."""
+    deadline = time.monotonic() + current_app.config["IDEMPOTENCY_WAIT_TIMEOUT"]
+    delay = 0.05
+    while True:
+        row = claim(client, key, digest)
+        if row is None:
+            return None
+        if row.fingerprint != digest:
+            return _error(f"{HEADER} was already used with a different request", 422)
+        if row.status == "completed":
+            IDEMPOTENT_REQUESTS.labels("replayed").inc()
+            return replay(row)
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            response = make_response(_error(f"A request with this {HEADER} is still in progress", 409))
+            response.headers["Retry-After"] = "1"
+            return response
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, 1)
+
+
+def idempotent(view):
+    """Makes a write route safe to retry with an ``Idempotency-Key`` header.
+
+    The first request with a key runs the view and its response is stored for
+    IDEMPOTENCY_TTL seconds; repeats with the same body get that response back,
+    marked ``Idempotent-Replayed: true``, without calling HubSpot. A repeat that
+    arrives while the first is still running waits for it. Reusing a key with a
+    different body is a 422.
+
+    Every response is stored, errors included, because a failed write may still
+    have reached HubSpot. The key is freed only when the view calls
+    ``allow_retry`` (or fails reading the request), i.e. when HubSpot never saw
+    the write. If the view raises, the key stays in progress until
+    IDEMPOTENCY_LOCK_TIMEOUT passes. Requests without the header, or when the
+    key store can't be reached, run as usual.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None:
+            return view(*args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return _error(f"{HEADER} must be 1 to {MAX_KEY_LENGTH} characters", 400)
+
+        client, digest = api_client_key(), fingerprint()
+        try:
+            answer = _wait(client, key, digest)
+        except SQLAlchemyError as e:
+            logging.error(f"Failed to claim idempotency key: {str(e)}")
+            return view(*args, **kwargs)
+        if answer is not None:
+            return answer
+
+        try:
+            response = make_response(view(*args, **kwargs))
+        except HTTPException:
+            # Raised while reading the request (e.g. an unparsable body), before any HubSpot call
+            release(client, key)
+            raise
+        except Exception:
+            if g.get("idempotency_retry"):
+                release(client, key)
+            raise
+        if g.get("idempotency_retry"):
+            release(client, key)
+        else:
+            complete(client, key, response)
+            IDEMPOTENT_REQUESTS.labels("processed").inc()
+        return response
+
+    return wrapper
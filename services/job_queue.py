@@ -0,0 +1,270 @@
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from sqlalchemy import and_, exists, or_
+from sqlalchemy.orm import aliased
+from extensions import db
+from models.models import Job
+from services.hubspot_api import (
+    CONTACT_FIELDS, DEAL_FIELDS, TICKET_FIELDS, HubSpotWriteError, send_contact, send_deal, send_ticket, store,
+)
+
+# Only contacts are upserted (by email). Every deal and ticket job creates a new
+# record in HubSpot, so those are never coalesced, and never sent again once
+# HubSpot may have applied them (``resend``).
+JOB_KINDS = {
+    "contact": {
+        "fields": CONTACT_FIELDS,
+        "object_type": "contacts",
+        "send": send_contact,
+        "coalesce_key": lambda payload: f"contact:{payload['email'].lower()}",
+        "resend": True,
+    },
+    "deal": {
+        "fields": DEAL_FIELDS,
+        "object_type": "deals",
+        "send": send_deal,
+        "coalesce_key": lambda payload: None,
+        "resend": False,
+    },
+    "ticket": {
+        "fields": TICKET_FIELDS,
+        "object_type": "tickets",
+        "send": send_ticket,
+        "coalesce_key": lambda payload: None,
+        "resend": False,
+    },
+}
+MAX_RETRY_DELAY = 60
+
+
+def enqueue_job(kind, payload):
+    """Stores a pending job for ``payload``; returns the Job, or None if the insert failed."""
+    job = Job(
+        id=str(uuid.uuid4()),
+        kind=kind,
+        status="pending",
+        payload=payload,
+        coalesce_key=JOB_KINDS[kind]["coalesce_key"](payload),
+    )
+    try:
+        db.session.add(job)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"Failed to enqueue {kind} job: {str(e)}")
+        return None
+    return job
+
+
+def get_job(job_id):
+    return db.session.get(Job, job_id)
+
+
+def job_status(job):
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "attempts": job.attempts,
+        "hubspot_id": job.hubspot_id,
+        "coalesced_into": job.coalesced_into,
+        "result": job.result,
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "updated_at": job.updated_at.isoformat() if job.updated_at else None,
+    }
+
+
+def _claimable(now):
+    """Pending jobs whose backoff has passed, plus running jobs whose worker went away."""
+    stale = now - timedelta(seconds=current_app.config["JOB_VISIBILITY_TIMEOUT"])
+    return or_(
+        and_(Job.status == "pending", or_(Job.run_after.is_(None), Job.run_after <= now)),
+        and_(Job.status == "running", Job.updated_at < stale),
+    )
+
+
+def _head_of_key():
+    """Excludes jobs queued behind an unfinished job with the same coalesce key, so writes keep their order."""
+    older = aliased(Job)
+    return ~exists().where(and_(
+        older.coalesce_key == Job.coalesce_key,
+        older.created_at < Job.created_at,
+        older.status.in_(("pending", "running")),
+    ))
+
+
+def claim_next():
+    """Locks the oldest claimable job and every claimable job sharing its coalesce key.
+
+    Rows are selected ``FOR UPDATE SKIP LOCKED`` so concurrent workers never
+    claim the same job, and marked running before the lock is released.
+    """
+    now = datetime.utcnow()
+    job = (
+        Job.query.filter(_claimable(now), _head_of_key())
+        .order_by(Job.created_at)
+        .with_for_update(skip_locked=True)
+        .first()
+    )
+    if job is None:
+        db.session.rollback()
+        return []
+
+    group = [job]
+    if job.coalesce_key:
+        # A group HubSpot already accepted is retried as it was; newer jobs wait for the next write
+        sent = Job.hubspot_id == job.hubspot_id if job.hubspot_id else Job.hubspot_id.is_(None)
+        group += (
+            Job.query.filter(_claimable(now), Job.kind == job.kind, Job.coalesce_key == job.coalesce_key, sent,
+                             Job.id != job.id)
+            .order_by(Job.created_at)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+    for claimed in group:
+        claimed.status = "running"
+        claimed.attempts += 1
+        claimed.updated_at = now
+    db.session.commit()
+    return group
+
+
+def run_group(group):
+    """Merges the payloads of ``group`` (later jobs win per field), writes them once and stores the result.
+
+    Returns ``(result, error, retry)``. Once HubSpot accepted the write, every job
+    in the group records its ``hubspot_id``, so a retry after a database failure
+    only repeats the database step and never creates the record twice.
+    """
+    primary = group[0]
+    spec = JOB_KINDS[primary.kind]
+    payload = {}
+    for job in group:
+        payload.update(job.payload)
+
+    if primary.hubspot_id is None:
+        args = [payload.get(field) for field in spec["fields"]]
+        extra = {key: value for key, value in payload.items() if key not in spec["fields"]}
+        try:
+            row = spec["send"](*args, **extra)
+        except HubSpotWriteError as e:
+            if e.applied and not spec["resend"]:
+                # A 5xx or read timeout may hide a record HubSpot created; sending again could duplicate it
+                return None, f"HubSpot write failed and may have been applied, so it is not sent again: {str(e)}", False
+            return None, f"HubSpot write failed: {str(e)}", e.retryable
+        except Exception as e:
+            # Whether HubSpot applied the write is unknown, so it is not sent again
+            logging.error(f"{primary.kind} job {primary.id} raised: {str(e)}")
+            return None, f"HubSpot write raised: {str(e)}", False
+        for job in group:
+            job.hubspot_id = row["hubspot_id"]
+        db.session.commit()
+
+    try:
+        return store(spec["object_type"], dict(payload, hubspot_id=primary.hubspot_id)), None, False
+    except Exception as e:
+        logging.error(f"Storing {primary.kind} job {primary.id} failed: {str(e)}")
+        return None, f"Saved in HubSpot as {primary.hubspot_id}, but storing it failed: {str(e)}", True
+
+
+def finish_group(group, result, error=None, retry=False):
+    primary = group[0]
+    max_attempts = current_app.config["JOB_MAX_ATTEMPTS"]
+    for job in group:
+        job.coalesced_into = primary.id if job is not primary else None
+        if result:
+            job.status, job.result, job.error = "succeeded", result, None
+        elif not retry:
+            job.status, job.error = "failed", error
+        elif job.attempts >= max_attempts:
+            job.status, job.error = "failed", f"{error} (gave up after {job.attempts} attempts)"
+        else:
+            job.status, job.error = "pending", f"{error}; retrying"
+            job.run_after = datetime.utcnow() + timedelta(seconds=min(2 ** job.attempts, MAX_RETRY_DELAY))
+    db.session.commit()
+
+
+def process_next():
+    """Claims and runs one job group; returns False when nothing was claimable."""
+    group = claim_next()
+    if not group:
+        return False
+    if len(group) > 1:
+        logging.info(f"Coalesced {len(group)} {group[0].kind} jobs into {group[0].id}")
+    finish_group(group, *run_group(group))
+    return True
+
+
+def run_worker(app, stop, drain=False):
+    """Processes jobs until ``stop`` is set, or until the queue is empty when ``drain`` is true."""
+    poll_interval = app.config["JOB_POLL_INTERVAL"]
+    while not stop.is_set():
+        with app.app_context():
+            try:
+                processed = process_next()
+            except Exception as e:
+                db.session.rollback()
+                logging.error(f"Job worker iteration failed: {str(e)}")
+                processed = False
+        if not processed:
+            if drain:
+                return
+            stop.wait(poll_interval)
+
+
+def start_workers(app, threads, stop=None, drain=False, daemon=True):
+    """Starts ``threads`` worker threads sharing ``stop``; returns them."""
+    stop = stop or threading.Event()
+    workers = [
+        threading.Thread(target=run_worker, args=(app, stop, drain), name=f"job-worker-{n}", daemon=daemon)
+        for n in range(threads)
+    ]
+    for worker in workers:
+        worker.start()
+    return workers
+
+
+def init_app(app):
+    """Registers the ``flask run-job-worker`` command."""
+
+    @app.cli.command("run-job-worker")
+    @click.option("--threads", default=4, show_default=True, help="Number of worker threads.")
+    @click.option("--drain", is_flag=True, help="Exit once the queue is empty.")
+    def run_job_worker_command(threads, drain):
+        """Process queued contact/deal/ticket writes."""
+        stop = threading.Event()
+        workers = start_workers(app, threads, stop=stop, drain=drain, daemon=False)
+        try:
+            for worker in workers:
+                while worker.is_alive():
+                    worker.join(1)
+        except KeyboardInterrupt:
+            click.echo("Stopping job workers...")
+            stop.set()
+            for worker in workers:
+                worker.join()
+
+
+_stop = threading.Event()
+_workers = []
+
+
+def start(app):
+    """Starts JOB_WORKER_THREADS in-process workers, if configured; called once per process."""
+    threads = app.config.get("JOB_WORKER_THREADS", 0)
+    if threads > 0:
+        _workers.extend(start_workers(app, threads, stop=_stop))
+
+
+def stop(timeout=None):
+    """Lets in-process workers finish their current job and waits up to ``timeout`` seconds for them."""
+    _stop.set()
+    deadline = None if timeout is None else time.monotonic() + timeout
+    for worker in _workers:
+        worker.join(None if deadline is None else max(0, deadline - time.monotonic()))
@@ -0,0 +1,146 @@
+import os
+import re
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+from flask import Response, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Under gunicorn, set PROMETHEUS_MULTIPROC_DIR so every worker writes its samples
+# there and /metrics reports the sum over all workers, not the one that answered.
+
+HUBSPOT_REQUEST_SECONDS = Histogram(
+    "hubspot_request_duration_seconds",
+    "HubSpot API latency per HTTP attempt; retries are separate observations.",
+    ["method", "endpoint", "status"],
+)
+HUBSPOT_IN_FLIGHT = Gauge(
+    "hubspot_requests_in_flight",
+    "HubSpot calls in progress, including pacing and retry waits.",
+    ["client"],
+    multiprocess_mode="livesum",
+)
+TOKEN_REFRESHES = Counter("hubspot_token_refreshes_total", "OAuth access token refreshes.", ["result"])
+ASSOCIATION_FANOUT = Histogram(
+    "hubspot_association_fanout",
+    "Associated objects resolved per source object.",
+    ["from_type", "to_type"],
+    buckets=(0, 1, 2, 5, 10, 25, 50, 100, 250, 500),
+)
+CACHE_LOOKUPS = Counter("crm_cache_lookups_total", "CRM feed cache lookups.", ["namespace", "result"])
+COALESCED_FETCHES = Counter(
+    "crm_fetches_coalesced_total", "Feed fetches answered by an identical fetch already in flight.", ["namespace"]
+)
+IDEMPOTENT_REQUESTS = Counter(
+    "idempotent_requests_total", "Writes sent with an Idempotency-Key, by how they were answered.", ["outcome"]
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Request latency per route.", ["method", "route", "status"]
+)
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "Requests being served.", multiprocess_mode="livesum")
+DB_COMMIT_SECONDS = Histogram(
+    "db_commit_duration_seconds",
+    "Postgres commit latency. scope=session is an ORM session flush + commit; "
+    "scope=connection is a Core transaction's COMMIT (persistence.transaction).",
+    ["scope"],
+)
+
+# Path segments that are record IDs or emails, collapsed so label values stay bounded
+ID_SEGMENT = re.compile(r"^(\d+|.*(@|%40).*)$")
+
+
+def endpoint_label(path):
+    """``/crm/v3/objects/contacts/123?x=1`` -> ``/crm/v3/objects/contacts/{id}``."""
+    path = urlsplit(path).path
+    return "/".join("{id}" if ID_SEGMENT.match(segment) else segment for segment in path.split("/"))
+
+
+@contextmanager
+def hubspot_call(method, path):
+    """Times one HTTP attempt against HubSpot; the caller stores the response status in ``call["status"]``.
+
+    Attempts that raise are recorded with status ``error``.
+    """
+    call = {"status": "error"}
+    started = time.perf_counter()
+    try:
+        yield call
+    finally:
+        HUBSPOT_REQUEST_SECONDS.labels(method, endpoint_label(path), str(call["status"])).observe(
+            time.perf_counter() - started
+        )
+
+
+def observe_fanout(from_type, to_type, associations):
+    """Records the size of each ``{from_id: [to_id, ...]}`` entry."""
+    histogram = ASSOCIATION_FANOUT.labels(from_type, to_type)
+    for to_ids in associations.values():
+        histogram.observe(len(to_ids))
+
+
+def _commit_started(session):
+    session.info["commit_started"] = time.perf_counter()
+
+
+def _commit_finished(session):
+    started = session.info.pop("commit_started", None)
+    if started is not None:
+        DB_COMMIT_SECONDS.labels("session").observe(time.perf_counter() - started)
+
+
+def _commit_failed(session):
+    session.info.pop("commit_started", None)
+
+
+def _request_started():
+    g.metrics_started = time.perf_counter()
+    HTTP_IN_FLIGHT.inc()
+
+
+def _record_status(response):
+    g.metrics_status = response.status_code
+    return response
+
+
+def _request_finished(exc):
+    started = g.pop("metrics_started", None)
+    if started is None:
+        return
+    HTTP_IN_FLIGHT.dec()
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    status = g.pop("metrics_status", 500)
+    HTTP_REQUEST_SECONDS.labels(request.method, route, str(status)).observe(time.perf_counter() - started)
+
+
+def metrics_response():
+    """Renders every metric in the Prometheus text format."""
+    registry = REGISTRY
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
+
+def init_app(app):
+    """Times every request and every DB session commit.
+
+    Call before other extensions register their request hooks, so requests they
+    reject (e.g. rate-limited ones) are measured too.
+    """
+    app.before_request(_request_started)
+    app.after_request(_record_status)
+    app.teardown_request(_request_finished)
+    if not event.contains(Session, "before_commit", _commit_started):
+        event.listen(Session, "before_commit", _commit_started)
+        event.listen(Session, "after_commit", _commit_finished)
+        event.listen(Session, "after_rollback", _commit_failed)
+
+
+def mark_process_dead(pid):
+    """Drops an exited worker's live gauges from the shared multiprocess directory."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid)
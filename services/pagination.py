@@ -0,0 +1,113 @@
+import base64
+import json
+from datetime import datetime, timezone
+
+CRM_OBJECT_TYPES = ("contacts", "deals", "tickets")
+FILTER_PARAMS = ("since", "dealstage", "pipeline", "hubspot_contact_id")
+
+
+def encode_cursor(object_type, **position):
+    """Packs a position in ``object_type``'s listing into an opaque URL-safe token."""
+    raw = json.dumps(dict(position, t=object_type), separators=(",", ":"), sort_keys=True)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(object_type, cursor):
+    """Returns the position packed by ``encode_cursor``, or None for an empty cursor.
+
+    Raises ValueError for malformed cursors and for cursors issued for another object type.
+    """
+    if not cursor:
+        return None
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid {object_type} cursor")
+    if not isinstance(position, dict) or position.pop("t", None) != object_type:
+        raise ValueError(f"Invalid {object_type} cursor")
+    return position
+
+
+def parse_limit(value, default, maximum):
+    """Parses the ``limit`` query parameter and clamps it to ``1..maximum``."""
+    if value in (None, ""):
+        return min(default, maximum)
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    return max(1, min(limit, maximum))
+
+
+def parse_max_records(value):
+    """Parses the optional ``max_records`` query parameter; None means no cap."""
+    if value in (None, ""):
+        return None
+    if not value.isdigit() or int(value) < 1:
+        raise ValueError("max_records must be a positive integer")
+    return int(value)
+
+
+def parse_since(value):
+    """Parses ``since`` (epoch milliseconds or ISO-8601) into a naive UTC datetime."""
+    if value.isdigit():
+        return datetime.utcfromtimestamp(int(value) / 1000)
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError("since must be epoch milliseconds or an ISO-8601 timestamp")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def read_filters(args):
+    """Collects the supported filters from the query string; absent filters are omitted."""
+    filters = {name: args[name] for name in FILTER_PARAMS if args.get(name)}
+    if "since" in filters:
+        filters["since"] = parse_since(filters["since"])
+    if "hubspot_contact_id" in filters and not filters["hubspot_contact_id"].isdigit():
+        raise ValueError("hubspot_contact_id must be an integer")
+    return filters
+
+
+def to_epoch_ms(value):
+    """Converts a naive UTC datetime to epoch milliseconds."""
+    return int(value.replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def parse_include(value, default_types=CRM_OBJECT_TYPES):
+    """Parses ``include`` into ``(object_types, expand_associations)``.
+
+    ``include`` lists object types and/or ``associations``; listing no types keeps
+    ``default_types``. Returns ``(default_types, None)`` when the parameter is absent.
+    """
+    if value is None:
+        return default_types, None
+    tokens = {token.strip() for token in value.split(",") if token.strip()}
+    unknown = tokens - set(CRM_OBJECT_TYPES) - {"associations"}
+    if unknown:
+        raise ValueError(f"Unknown include value(s): {', '.join(sorted(unknown))}")
+    object_types = tuple(object_type for object_type in default_types if object_type in tokens)
+    if tokens & set(CRM_OBJECT_TYPES) and not object_types:
+        raise ValueError(f"include may only list {', '.join(default_types)}")
+    return object_types or default_types, "associations" in tokens
+
+
+def parse_fields(value, object_types):
+    """Parses ``fields`` into ``{object_type: [names]}``.
+
+    ``deals.amount`` selects a field of one type; a bare ``email`` applies to every
+    requested type. Types without an entry are returned in full.
+    """
+    fields = {}
+    for entry in (entry.strip() for entry in (value or "").split(",")):
+        if not entry:
+            continue
+        object_type, _, name = entry.rpartition(".")
+        if object_type and object_type not in CRM_OBJECT_TYPES:
+            raise ValueError(f"Unknown object type in fields: {object_type}")
+        for target in ((object_type,) if object_type else object_types):
+            if target in object_types and name not in fields.setdefault(target, []):
+                fields[target].append(name)
+    return fields
@@ -0,0 +1,148 @@
+import logging
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from sqlalchemy import or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from extensions import db
+from models.models import Contact, Deal, Ticket
+from services.metrics import DB_COMMIT_SECONDS
+
+# Columns an upsert must never overwrite on an existing row
+IMMUTABLE_COLUMNS = {"id", "created_at"}
+
+
+@contextmanager
+def transaction():
+    """``db.engine.begin()`` for Core writes outside the ORM session, with its commit timed.
+
+    Session commits are timed by ``metrics.init_app``; this records the
+    connection's COMMIT in the same ``db_commit_duration_seconds`` histogram,
+    so every write path shows up there. Rolls back if the block raises.
+    """
+    with db.engine.connect() as connection:
+        pending = connection.begin()
+        try:
+            yield connection
+        except BaseException:
+            pending.rollback()
+            raise
+        started = time.perf_counter()
+        pending.commit()
+        DB_COMMIT_SECONDS.labels("connection").observe(time.perf_counter() - started)
+
+
+def _rekey(model, rows, conflict_column, column):
+    """Lines ``rows`` up with stored rows that hold the same unique ``column`` value under another key.
+
+    Such a row is re-keyed to the incoming key, so the upsert updates it instead
+    of tripping the unique index on ``column`` (HubSpot merged or re-created the
+    record). If the incoming key already belongs to another row too, storing it
+    would break one of the two indexes, so it is skipped with a warning.
+    Returns the rows to upsert.
+    """
+    table = model.__table__
+    # Within the batch, the last row for a value wins, as it does for the conflict key
+    rows = list({id(row) if row.get(column) is None else row[column]: row for row in rows}.values())
+    values = [row[column] for row in rows if row.get(column) is not None]
+    if not values:
+        return rows
+
+    existing = db.session.execute(select(table.c[conflict_column], table.c[column]).where(or_(
+        table.c[column].in_(values), table.c[conflict_column].in_([row[conflict_column] for row in rows]),
+    ))).all()
+    holders = {value: key for key, value in existing if value in values}
+    taken = {key for key, _ in existing}
+
+    kept = []
+    for row in rows:
+        holder = holders.get(row.get(column))
+        if holder is not None and holder != row[conflict_column]:
+            if row[conflict_column] in taken:
+                logging.warning(
+                    f"Skipping {model.__tablename__} {row[conflict_column]}: "
+                    f"{column} {row[column]} is stored for {holder}"
+                )
+                continue
+            db.session.execute(
+                update(table).where(table.c[conflict_column] == holder).values({conflict_column: row[conflict_column]})
+            )
+        kept.append(row)
+    return kept
+
+
+def bulk_upsert(model, rows, conflict_column="hubspot_id", commit=True):
+    """Upserts ``rows`` with ``INSERT ... ON CONFLICT (conflict_column) DO UPDATE``.
+
+    Rows are sent as one executemany per distinct column set and committed
+    once. Keys that are not columns of ``model`` are dropped, and duplicates of
+    the same conflict key keep the last occurrence. A stored row that holds the
+    value of another unique column (a contact's email) under a different
+    conflict key is re-keyed first, see ``_rekey``. Returns the stored rows as
+    dicts; rows ``_rekey`` skipped are missing from it.
+    """
+    columns = {column.name for column in model.__table__.columns}
+    deduped = {}
+    for row in rows:
+        row = {key: value for key, value in row.items() if key in columns}
+        deduped[row[conflict_column]] = row
+    if not deduped:
+        return []
+
+    stored = []
+    try:
+        rows = list(deduped.values())
+        for column in model.__table__.columns:
+            if column.unique and column.name != conflict_column:
+                rows = _rekey(model, rows, conflict_column, column.name)
+
+        # executemany needs a uniform parameter set, so group rows by their keys
+        groups = {}
+        for row in rows:
+            groups.setdefault(frozenset(row), []).append(row)
+
+        for keys, group in groups.items():
+            stmt = insert(model.__table__)
+            assignments = {
+                key: stmt.excluded[key]
+                for key in keys if key not in IMMUTABLE_COLUMNS and key != conflict_column
+            }
+            # onupdate defaults do not fire for ON CONFLICT updates
+            if "updated_at" in columns:
+                assignments["updated_at"] = datetime.utcnow()
+            stmt = stmt.on_conflict_do_update(index_elements=[conflict_column], set_=assignments)
+            result = db.session.execute(stmt.returning(*model.__table__.columns), group)
+            stored.extend(dict(row._mapping) for row in result)
+        if commit:
+            db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"Bulk upsert into {model.__tablename__} failed: {str(e)}")
+        raise
+
+    return stored
+
+
+def local_contact_ids(hubspot_ids):
+    """Maps HubSpot contact IDs to the local ``contacts.id`` of the ones already stored.
+
+    Deals and tickets reference contacts by HubSpot ID in the API and by local ID
+    in the database; IDs of contacts not synced yet are missing from the result.
+    """
+    hubspot_ids = {str(hubspot_id) for hubspot_id in hubspot_ids if hubspot_id is not None}
+    if not hubspot_ids:
+        return {}
+    rows = db.session.query(Contact.hubspot_id, Contact.id).filter(Contact.hubspot_id.in_(hubspot_ids))
+    return {hubspot_id: local_id for hubspot_id, local_id in rows}
+
+
+def upsert_contacts(rows, commit=True):
+    return bulk_upsert(Contact, rows, commit=commit)
+
+
+def upsert_deals(rows, commit=True):
+    return bulk_upsert(Deal, rows, commit=commit)
+
+
+def upsert_tickets(rows, commit=True):
+    return bulk_upsert(Ticket, rows, commit=commit)
@@ -0,0 +1,119 @@
+import time
+from limits.storage import MovingWindowSupport, Storage
+from sqlalchemy import case, delete, func, insert, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import SQLAlchemyError
+from extensions import db
+from models.models import RateLimitCounter, RateLimitHit
+from services.persistence import transaction
+
+hits = RateLimitHit.__table__
+counters = RateLimitCounter.__table__
+
+# Expired rows of keys nobody hits any more are swept at most this often, per process
+PRUNE_INTERVAL = 60
+
+
+class DatabaseStorage(Storage, MovingWindowSupport):
+    """Rate limit storage in the application's Postgres database, selected with ``db://``.
+
+    Every worker and replica reads and writes the same rows, so a limit holds
+    across the whole fleet instead of once per process. Each moving-window
+    check takes a transaction-scoped advisory lock on its key, so concurrent
+    requests from different workers cannot both take the last slot. Runs on the
+    Flask-SQLAlchemy engine and therefore needs an app context, which every
+    request has.
+    """
+
+    STORAGE_SCHEME = ["db"]
+
+    def __init__(self, uri=None, wrap_exceptions=False, **options):
+        super().__init__(uri, wrap_exceptions, **options)
+        self._pruned_at = 0
+
+    @property
+    def base_exceptions(self):
+        return SQLAlchemyError
+
+    def _lock(self, connection, key):
+        connection.execute(text("SELECT pg_advisory_xact_lock(hashtext(:key))"), {"key": key})
+
+    def _prune(self, connection, now):
+        if now - self._pruned_at >= PRUNE_INTERVAL:
+            self._pruned_at = now
+            connection.execute(delete(hits).where(hits.c.expires_at <= now))
+            connection.execute(delete(counters).where(counters.c.expires_at <= now))
+
+    def incr(self, key, expiry, amount=1):
+        """Adds ``amount`` to a fixed-window counter, starting a new window once the old one expired."""
+        now = time.time()
+        expired = counters.c.expires_at <= now
+        statement = pg_insert(counters).values(key=key, count=amount, expires_at=now + expiry)
+        statement = statement.on_conflict_do_update(
+            index_elements=[counters.c.key],
+            set_={
+                "count": case((expired, amount), else_=counters.c.count + amount),
+                "expires_at": case((expired, now + expiry), else_=counters.c.expires_at),
+            },
+        ).returning(counters.c.count)
+        with transaction() as connection:
+            self._prune(connection, now)
+            return connection.execute(statement).scalar_one()
+
+    def get(self, key):
+        with db.engine.connect() as connection:
+            count = connection.execute(
+                select(counters.c.count).where(counters.c.key == key, counters.c.expires_at > time.time())
+            ).scalar()
+        return count or 0
+
+    def get_expiry(self, key):
+        with db.engine.connect() as connection:
+            expires_at = connection.execute(select(counters.c.expires_at).where(counters.c.key == key)).scalar()
+        return expires_at or time.time()
+
+    def acquire_entry(self, key, limit, expiry, amount=1):
+        """Records ``amount`` hits on ``key`` unless that would exceed ``limit`` within the last ``expiry`` seconds."""
+        if amount > limit:
+            return False
+        now = time.time()
+        with transaction() as connection:
+            self._lock(connection, key)
+            used = connection.execute(
+                select(func.coalesce(func.sum(hits.c.amount), 0)).where(hits.c.key == key, hits.c.hit_at > now - expiry)
+            ).scalar_one()
+            if used + amount > limit:
+                return False
+            connection.execute(insert(hits).values(key=key, amount=amount, hit_at=now, expires_at=now + expiry))
+            self._prune(connection, now)
+        return True
+
+    def get_moving_window(self, key, limit, expiry):
+        """Returns ``(oldest hit in the window, hits in the window)``."""
+        now = time.time()
+        with db.engine.connect() as connection:
+            oldest, count = connection.execute(
+                select(func.min(hits.c.hit_at), func.coalesce(func.sum(hits.c.amount), 0))
+                .where(hits.c.key == key, hits.c.hit_at > now - expiry)
+            ).one()
+        return (oldest or now), count
+
+    def check(self):
+        try:
+            with db.engine.connect() as connection:
+                connection.execute(select(counters.c.key).limit(1))
+                connection.execute(select(hits.c.id).limit(1))
+            return True
+        except SQLAlchemyError:
+            return False
+
+    def reset(self):
+        with transaction() as connection:
+            removed = connection.execute(delete(hits)).rowcount
+            removed += connection.execute(delete(counters)).rowcount
+        return removed
+
+    def clear(self, key):
+        with transaction() as connection:
+            connection.execute(delete(hits).where(hits.c.key == key))
+            connection.execute(delete(counters).where(counters.c.key == key))
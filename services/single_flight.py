@@ -0,0 +1,60 @@
+import asyncio
+import fcntl
+import hashlib
+import logging
+import os
+
+
+class AsyncSingleFlight:
+    """Collapses concurrent calls with the same key, on one event loop, into one.
+
+    The first caller for a key starts ``factory()``; callers that arrive while it
+    runs await the same task and receive its result, or its exception. The key
+    is free again as soon as the task finishes, so nothing is cached here.
+    """
+
+    def __init__(self):
+        self._calls = {}
+
+    async def do(self, key, factory):
+        """Awaits ``factory()`` once per key; returns ``(result, shared)``."""
+        task = self._calls.get(key)
+        shared = task is not None
+        if not shared:
+            task = self._calls[key] = asyncio.ensure_future(factory())
+            task.add_done_callback(lambda done: self._calls.pop(key, None) if self._calls.get(key) is done else None)
+        # A waiter that is cancelled (e.g. its request timed out) must not cancel the others' fetch
+        return await asyncio.shield(task), shared
+
+
+class HostLock:
+    """Exclusive ``flock`` per key, shared by every process on the host.
+
+    Keys hash onto a fixed set of lock files in ``directory``, so the number of
+    files stays bounded; unrelated keys occasionally share a stripe and queue
+    behind each other. If a lock file cannot be opened the caller proceeds
+    unlocked, which only costs a duplicate fetch.
+    """
+
+    def __init__(self, directory, stripes=64):
+        self.directory = directory
+        self.stripes = stripes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        stripe = int(hashlib.sha1(repr(key).encode()).hexdigest(), 16) % self.stripes
+        return os.path.join(self.directory, f"single-flight.{stripe}.lock")
+
+    def acquire(self, key):
+        try:
+            handle = open(self._path(key), "a")
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            return handle
+        except OSError as e:
+            logging.error(f"Failed to take single-flight lock: {str(e)}")
+            return None
+
+    def release(self, handle):
+        if handle is not None:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+            handle.close()
@@ -0,0 +1,80 @@
+import os
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError
+
+# Settings are read when the app's modules are imported, so they are fixed here first
+os.environ["FLASK_ENV"] = "testing"
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("HUBSPOT_CLIENT_SECRET", "test-secret")
+
+from benchmarks.fake_hubspot import FakeHubSpot
+
+# Every HubSpot call the tests make goes to this in-process fake
+hubspot = FakeHubSpot(contacts=5, deals_per_contact=1, tickets=5, seed=1).start()
+os.environ["HUBSPOT_API_BASE_URL"] = hubspot.url
+os.environ["HUBSPOT_OAUTH_TOKEN_URL"] = f"{hubspot.url}/oauth/v1/token"
+
+from config import TestingConfig
+
+
+def _create_database(url):
+    """Creates the test database if it is missing; returns False when Postgres can't be reached."""
+    url = make_url(url)
+    engine = create_engine(url.set(database="postgres"), isolation_level="AUTOCOMMIT")
+    try:
+        with engine.connect() as connection:
+            exists = connection.execute(
+                text("SELECT 1 FROM pg_database WHERE datname = :name"), {"name": url.database}
+            ).first()
+            if not exists:
+                connection.execute(text(f'CREATE DATABASE "{url.database}"'))
+    except OperationalError:
+        return False
+    finally:
+        engine.dispose()
+    return True
+
+
+@pytest.fixture(scope="session")
+def app():
+    """The app bound to TEST_DATABASE_URL (or the TestingConfig database), with the schema created."""
+    if not _create_database(TestingConfig.SQLALCHEMY_DATABASE_URI):
+        pytest.skip("test database is not reachable; set TEST_DATABASE_URL")
+
+    from app import app as flask_app
+    from extensions import db
+
+    with flask_app.app_context():
+        # Rebuilt every run, so a column type changed since the last run is picked up
+        db.drop_all()
+        db.create_all()
+    yield flask_app
+    with flask_app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def db_session(app):
+    """An app context on an empty database; every table is truncated afterwards."""
+    from extensions import db
+
+    with app.app_context():
+        yield db.session
+        db.session.remove()
+        tables = ", ".join(f'"{table.name}"' for table in db.metadata.sorted_tables)
+        with db.engine.begin() as connection:
+            connection.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+
+
+@pytest.fixture
+def client(app, db_session):
+    return app.test_client()
+
+
+@pytest.fixture
+def fake_hubspot():
+    hubspot.reset_calls()
+    return hubspot
@@ -0,0 +1,73 @@
+import asyncio
+import pytest
+from services.cache import FileCache, MemoryCache, acached_fetch, crm_cache, invalidate_object_type
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    crm_cache.invalidate("tickets")
+    yield
+    crm_cache.invalidate("tickets")
+
+
+def test_concurrent_misses_share_one_fetch():
+    fetches = []
+
+    async def fetch():
+        fetches.append(1)
+        await asyncio.sleep(0.05)
+        return {"results": [1]}
+
+    async def burst():
+        return await asyncio.gather(*[acached_fetch("tickets", "limit=10", fetch) for _ in range(5)])
+
+    assert asyncio.run(burst()) == [{"results": [1]}] * 5
+    assert len(fetches) == 1
+    assert crm_cache.get("tickets", "limit=10") == {"results": [1]}
+
+
+def test_invalidation_during_a_fill_drops_the_fetched_value():
+    async def fetch():
+        # A write lands while HubSpot is still answering the read
+        invalidate_object_type("tickets")
+        return {"results": ["stale"]}
+
+    assert asyncio.run(acached_fetch("tickets", "limit=10", fetch)) == {"results": ["stale"]}
+    assert crm_cache.get("tickets", "limit=10") is None
+
+
+def test_none_is_not_cached():
+    async def fetch():
+        return None
+
+    assert asyncio.run(acached_fetch("tickets", "limit=10", fetch)) is None
+    assert crm_cache.get("tickets", "limit=10") is None
+
+
+@pytest.mark.parametrize("build", [
+    lambda tmp_path: MemoryCache(ttl=60),
+    lambda tmp_path: FileCache(str(tmp_path), ttl=60),
+])
+def test_invalidate_changes_the_generation_and_drops_entries(build, tmp_path):
+    cache = build(tmp_path)
+    cache.set("deals", "a", {"v": 1})
+    cache.set("contacts", "a", {"v": 2})
+    before = cache.generation("deals")
+
+    cache.invalidate("deals")
+
+    assert cache.generation("deals") != before
+    assert cache.get("deals", "a") is None
+    assert cache.get("contacts", "a") == {"v": 2}
+    cache.delete("contacts", "a")
+    assert cache.get("contacts", "a") is None
+
+
+def test_file_cache_generation_is_shared_between_instances(tmp_path):
+    first, second = FileCache(str(tmp_path)), FileCache(str(tmp_path))
+    second.set("deals", "a", {"v": 1})
+
+    first.invalidate("deals")
+
+    assert second.generation("deals") == first.generation("deals") != ""
+    assert second.get("deals", "a") is None
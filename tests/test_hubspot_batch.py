@@ -0,0 +1,50 @@
+import requests
+from models.models import Deal
+from services import hubspot_batch
+from services.persistence import upsert_contacts
+
+
+def test_batch_maps_hubspot_contact_ids_to_local_ones(client, fake_hubspot):
+    [stored] = upsert_contacts([{"hubspot_id": "1", "email": "ada@example.com", "firstname": "Ada", "lastname": "L"}])
+
+    response = client.post("/api/v1/deals/batch", json=[
+        {"dealname": "Synced", "amount": 1, "dealstage": "won", "contact_id": 1},
+        {"dealname": "Unsynced", "amount": 2, "dealstage": "won", "contact_id": 404},
+        {"dealname": "Invalid"},
+    ])
+
+    assert response.status_code == 207
+    body = response.get_json()
+    assert [result["status"] for result in body["results"]] == ["created", "created", "invalid"]
+    assert body["succeeded"] == 2
+    assert fake_hubspot.calls["batch_write"] == 1
+    contacts = dict(Deal.query.with_entities(Deal.dealname, Deal.contact_id))
+    assert contacts == {"Synced": stored["id"], "Unsynced": None}
+
+
+def test_unsent_chunk_is_reported_as_not_applied(client, monkeypatch):
+    def refuse(*args, **kwargs):
+        raise requests.ConnectionError("connection refused")
+    monkeypatch.setattr(hubspot_batch.hubspot_client, "post", refuse)
+
+    response = client.post("/api/v1/deals/batch", json=[
+        {"dealname": "Engine", "amount": 1, "dealstage": "won", "contact_id": 1},
+    ])
+
+    assert response.status_code == 207
+    [result] = response.get_json()["results"]
+    assert result["status"] == "error"
+    assert result["applied"] is False
+    assert Deal.query.count() == 0
+
+
+def test_timed_out_chunk_may_have_been_applied(client, monkeypatch):
+    def time_out(*args, **kwargs):
+        raise requests.ReadTimeout("read timed out")
+    monkeypatch.setattr(hubspot_batch.hubspot_client, "post", time_out)
+
+    response = client.post("/api/v1/deals/batch", json=[
+        {"dealname": "Engine", "amount": 1, "dealstage": "won", "contact_id": 1},
+    ])
+
+    assert response.get_json()["results"][0]["applied"] is True
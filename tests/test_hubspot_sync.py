@@ -0,0 +1,50 @@
+import threading
+import time
+from models.models import Ticket
+from services import hubspot_sync
+from services.persistence import upsert_tickets
+
+# Past int32, as HubSpot object IDs regularly are
+LARGE_DEAL_ID = 2 ** 31 + 7
+
+
+def test_ticket_rows_keep_deal_ids_past_int32(db_session, monkeypatch):
+    def read_associations(from_type, to_type, object_ids, refresh=False):
+        return {"5001": [str(LARGE_DEAL_ID), "1001"] if to_type == "deals" else []}
+    monkeypatch.setattr(hubspot_sync, "read_associations", read_associations)
+    records = [{"id": "5001", "properties": {"subject": "Broken", "content": "It broke"}}]
+
+    [row] = hubspot_sync.ticket_rows(records)
+    upsert_tickets([row])
+
+    assert row["deal_ids"] == [LARGE_DEAL_ID, 1001]
+    assert Ticket.query.filter_by(hubspot_id="5001").one().deal_ids == [LARGE_DEAL_ID, 1001]
+
+
+def test_scheduler_lease_is_held_by_one_process_at_a_time(db_session):
+    first, second = hubspot_sync.SchedulerLease(), hubspot_sync.SchedulerLease()
+    try:
+        assert first.acquire()
+        assert first.acquire()
+        assert not second.acquire()
+
+        first.release()
+        assert second.acquire()
+    finally:
+        first.release()
+        second.release()
+
+
+def test_only_one_scheduler_syncs(app, db_session, monkeypatch):
+    runs = []
+    monkeypatch.setattr(hubspot_sync, "sync_all", lambda: runs.append(threading.get_ident()))
+    stop = threading.Event()
+    threads = [hubspot_sync.start_sync_scheduler(app, 0.02, stop=stop) for _ in range(3)]
+
+    time.sleep(0.3)
+    stop.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(runs) > 1
+    assert len(set(runs)) == 1
@@ -0,0 +1,139 @@
+import json
+import pytest
+from extensions import api_client_key
+from models.models import IdempotencyKey, Ticket
+from routes import routes
+from services.hubspot_api import HubSpotWriteError
+from services.idempotency import HEADER, REPLAYED_HEADER, claim, fingerprint
+
+TICKET = {
+    "subject": "Broken", "description": "It broke", "category": "PRODUCT_ISSUE", "pipeline": "0",
+    "hs_ticket_priority": "HIGH", "hs_pipeline_stage": "1", "contact_id": 1,
+}
+
+
+def post_ticket(client, key, body=TICKET, **headers):
+    return client.post("/api/v1/tickets", json=body, headers=dict(headers, **{HEADER: key}))
+
+
+def failing(error):
+    def create_support_ticket(*args, **kwargs):
+        raise error
+    return create_support_ticket
+
+
+@pytest.fixture
+def no_wait(app, monkeypatch):
+    monkeypatch.setitem(app.config, "IDEMPOTENCY_WAIT_TIMEOUT", 0)
+
+
+def test_repeat_is_replayed_without_calling_hubspot(client, fake_hubspot):
+    first = post_ticket(client, "k1")
+    # Same JSON value, different formatting
+    again = client.post("/api/v1/tickets", data=json.dumps(TICKET, indent=2),
+                        headers={HEADER: "k1", "Content-Type": "application/json"})
+
+    assert first.status_code == again.status_code == 201
+    assert again.headers[REPLAYED_HEADER] == "true"
+    assert again.get_json() == first.get_json()
+    assert fake_hubspot.calls["create_ticket"] == 1
+    assert Ticket.query.count() == 1
+
+
+def test_requests_without_a_key_are_not_deduplicated(client, fake_hubspot):
+    client.post("/api/v1/tickets", json=TICKET)
+    client.post("/api/v1/tickets", json=TICKET)
+
+    assert fake_hubspot.calls["create_ticket"] == 2
+
+
+def test_key_reused_with_another_body_is_rejected(client, fake_hubspot):
+    post_ticket(client, "k1")
+    response = post_ticket(client, "k1", dict(TICKET, subject="Other"))
+
+    assert response.status_code == 422
+    assert fake_hubspot.calls["create_ticket"] == 1
+
+
+def test_keys_are_scoped_per_client(client, fake_hubspot):
+    post_ticket(client, "k1", **{"X-API-Key": "a"})
+    response = post_ticket(client, "k1", **{"X-API-Key": "b"})
+
+    assert REPLAYED_HEADER not in response.headers
+    assert fake_hubspot.calls["create_ticket"] == 2
+
+
+def test_key_still_in_progress_is_a_conflict(app, client, no_wait, fake_hubspot):
+    with app.test_request_context("/api/v1/tickets", method="POST", json=TICKET):
+        assert claim(api_client_key(), "k1", fingerprint()) is None
+
+    response = post_ticket(client, "k1")
+
+    assert response.status_code == 409
+    assert response.headers["Retry-After"] == "1"
+    assert fake_hubspot.calls["create_ticket"] == 0
+
+
+@pytest.mark.parametrize("error", [
+    HubSpotWriteError("400 Client Error", 400, applied=False),
+    HubSpotWriteError("connection refused", None, applied=False),
+])
+def test_failure_before_hubspot_applied_the_write_frees_the_key(client, monkeypatch, error):
+    monkeypatch.setattr(routes, "create_support_ticket", failing(error))
+    assert post_ticket(client, "k1").status_code == 500
+    monkeypatch.undo()
+
+    response = post_ticket(client, "k1")
+
+    assert response.status_code == 201
+    assert REPLAYED_HEADER not in response.headers
+
+
+@pytest.mark.parametrize("error", [
+    HubSpotWriteError("502 Server Error", 502),
+    HubSpotWriteError("read timed out", None),
+])
+def test_failure_after_the_write_may_have_reached_hubspot_is_stored(client, monkeypatch, fake_hubspot, error):
+    monkeypatch.setattr(routes, "create_support_ticket", failing(error))
+    assert post_ticket(client, "k1").status_code == 500
+    monkeypatch.undo()
+
+    response = post_ticket(client, "k1")
+
+    assert response.status_code == 500
+    assert response.headers[REPLAYED_HEADER] == "true"
+    assert fake_hubspot.calls["create_ticket"] == 0
+
+
+def test_view_that_raises_keeps_the_key_in_progress(client, monkeypatch, no_wait):
+    monkeypatch.setattr(routes, "create_support_ticket", failing(RuntimeError("boom")))
+    with pytest.raises(RuntimeError):
+        post_ticket(client, "k1")
+
+    assert IdempotencyKey.query.filter_by(key="k1").one().status == "processing"
+    assert post_ticket(client, "k1").status_code == 409
+
+
+def test_failed_enqueue_frees_the_key(client, monkeypatch):
+    monkeypatch.setattr(routes, "enqueue_job", lambda kind, payload: None)
+    assert post_ticket(client, "k1", Prefer="respond-async").status_code == 500
+    monkeypatch.undo()
+
+    response = post_ticket(client, "k1", Prefer="respond-async")
+
+    assert response.status_code == 202
+    assert REPLAYED_HEADER not in response.headers
+
+
+def test_batch_that_never_reached_hubspot_frees_the_key(client, monkeypatch, fake_hubspot):
+    monkeypatch.setattr(routes, "batch_write", lambda object_type, items: [
+        {"index": 0, "status": "error", "error": "connection refused", "applied": False},
+    ])
+    body = [{"dealname": "Engine", "amount": 1, "dealstage": "won", "contact_id": 1}]
+    assert client.post("/api/v1/deals/batch", json=body, headers={HEADER: "k1"}).status_code == 207
+    monkeypatch.undo()
+
+    response = client.post("/api/v1/deals/batch", json=body, headers={HEADER: "k1"})
+
+    assert response.status_code == 201
+    assert fake_hubspot.calls["batch_write"] == 1
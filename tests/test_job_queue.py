@@ -0,0 +1,145 @@
+import pytest
+from models.models import Job, Ticket
+from services import job_queue
+from services.hubspot_api import HubSpotWriteError
+
+TICKET = {
+    "subject": "Broken", "description": "It broke", "category": "PRODUCT_ISSUE", "pipeline": "0",
+    "hs_ticket_priority": "HIGH", "hs_pipeline_stage": "1", "contact_id": 1, "deal_ids": [],
+}
+
+
+def drain():
+    while job_queue.process_next():
+        pass
+
+
+def make_due(db_session, *jobs):
+    """Skips the retry backoff of ``jobs``."""
+    for job in jobs:
+        job.run_after = None
+    db_session.commit()
+
+
+def test_contact_jobs_for_one_email_are_coalesced(db_session, fake_hubspot):
+    jobs = [
+        job_queue.enqueue_job("contact", {"email": "Ada@example.com", "firstname": f"v{i}", "lastname": "L", "phone": "1"})
+        for i in range(3)
+    ]
+
+    drain()
+
+    assert fake_hubspot.calls["create_or_update_contact"] == 1
+    assert [job.status for job in jobs] == ["succeeded"] * 3
+    assert [job.coalesced_into for job in jobs] == [None, jobs[0].id, jobs[0].id]
+    assert jobs[0].result["firstname"] == "v2"
+
+
+def test_deal_jobs_are_never_coalesced(db_session, fake_hubspot):
+    payload = {"dealname": "Same", "amount": 5, "dealstage": "won", "contact_id": 1}
+    jobs = [job_queue.enqueue_job("deal", payload) for _ in range(2)]
+
+    drain()
+
+    assert fake_hubspot.calls["create_deal"] == 2
+    assert len({job.hubspot_id for job in jobs}) == 2
+
+
+def test_client_error_fails_without_retry(db_session, monkeypatch):
+    def reject(*args, **kwargs):
+        raise HubSpotWriteError("400 Client Error", 400, applied=False)
+    monkeypatch.setitem(job_queue.JOB_KINDS["ticket"], "send", reject)
+    job = job_queue.enqueue_job("ticket", TICKET)
+
+    drain()
+
+    assert job.status == "failed"
+    assert job.attempts == 1
+
+
+def test_server_error_is_retried_until_max_attempts(app, db_session, monkeypatch):
+    def unavailable(*args, **kwargs):
+        raise HubSpotWriteError("503 Server Error", 503, applied=False)
+    monkeypatch.setitem(job_queue.JOB_KINDS["ticket"], "send", unavailable)
+    monkeypatch.setitem(app.config, "JOB_MAX_ATTEMPTS", 2)
+    job = job_queue.enqueue_job("ticket", TICKET)
+
+    drain()
+    assert job.status == "pending"
+    assert job.run_after is not None
+
+    make_due(db_session, job)
+    drain()
+    assert job.status == "failed"
+    assert job.attempts == 2
+    assert "gave up after 2 attempts" in job.error
+
+
+@pytest.mark.parametrize("error", [
+    HubSpotWriteError("502 Server Error", 502),
+    HubSpotWriteError("read timed out", None),
+])
+def test_write_hubspot_may_have_applied_is_not_sent_again(db_session, monkeypatch, error):
+    sent = []
+
+    def maybe_applied(*args, **kwargs):
+        sent.append(1)
+        raise error
+    monkeypatch.setitem(job_queue.JOB_KINDS["ticket"], "send", maybe_applied)
+    job = job_queue.enqueue_job("ticket", TICKET)
+
+    drain()
+    make_due(db_session, job)
+    drain()
+
+    assert job.status == "failed"
+    assert "may have been applied" in job.error
+    assert sent == [1]
+
+
+def test_contact_upsert_that_may_have_applied_is_retried(db_session, monkeypatch):
+    def maybe_applied(*args, **kwargs):
+        raise HubSpotWriteError("read timed out", None)
+    monkeypatch.setitem(job_queue.JOB_KINDS["contact"], "send", maybe_applied)
+    job = job_queue.enqueue_job("contact", {"email": "ada@example.com", "firstname": "Ada", "lastname": "L", "phone": "1"})
+
+    drain()
+
+    assert job.status == "pending"
+
+
+def test_database_failure_retries_only_the_database_step(db_session, fake_hubspot, monkeypatch):
+    store = job_queue.store
+    stored = []
+
+    def flaky_store(object_type, row):
+        stored.append(row["hubspot_id"])
+        if len(stored) == 1:
+            raise RuntimeError("database is down")
+        return store(object_type, row)
+    monkeypatch.setattr(job_queue, "store", flaky_store)
+    job = job_queue.enqueue_job("ticket", TICKET)
+
+    drain()
+    assert job.status == "pending"
+    assert job.hubspot_id is not None
+
+    make_due(db_session, job)
+    drain()
+    assert job.status == "succeeded"
+    assert fake_hubspot.calls["create_ticket"] == 1
+    assert stored == [job.hubspot_id, job.hubspot_id]
+    assert Ticket.query.filter_by(hubspot_id=job.hubspot_id).count() == 1
+
+
+def test_jobs_already_sent_are_not_coalesced_with_new_ones(db_session):
+    payload = {"email": "ada@example.com", "firstname": "Ada", "lastname": "L", "phone": "1"}
+    sent = job_queue.enqueue_job("contact", payload)
+    sent.hubspot_id = "1"
+    db_session.commit()
+    newer = job_queue.enqueue_job("contact", dict(payload, firstname="Newer"))
+
+    assert job_queue.claim_next() == [sent]
+    job_queue.finish_group([sent], {"id": 1})
+    assert job_queue.claim_next() == [newer]
+    assert Job.query.filter_by(status="running").count() == 1
@@ -0,0 +1,30 @@
+from prometheus_client import REGISTRY
+from services.idempotency import claim
+from services.persistence import transaction, upsert_contacts
+
+
+def commits(scope):
+    return REGISTRY.get_sample_value("db_commit_duration_seconds_count", {"scope": scope}) or 0
+
+
+def test_session_and_core_commits_share_one_histogram(app, db_session):
+    session, connection = commits("session"), commits("connection")
+
+    upsert_contacts([{"hubspot_id": "1", "email": "ada@example.com", "firstname": "Ada", "lastname": "L"}])
+    assert commits("session") == session + 1
+
+    with app.test_request_context("/api/v1/tickets", method="POST", json={}):
+        claim("ip:127.0.0.1", "k1", "digest")
+    assert commits("connection") == connection + 1
+
+
+def test_rolled_back_transaction_is_not_counted(db_session):
+    before = commits("connection")
+
+    try:
+        with transaction():
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+
+    assert commits("connection") == before
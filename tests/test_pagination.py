@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+import pytest
+from models.models import Contact
+from services.pagination import decode_cursor, encode_cursor, read_filters
+from services.persistence import upsert_contacts, upsert_deals
+
+NOW = datetime(2024, 1, 1, 12, 0, 0)
+
+
+def add_contacts(db_session, count, updated_at=lambda i: NOW):
+    upsert_contacts([
+        {"hubspot_id": str(i), "email": f"c{i}@example.com", "firstname": f"F{i}", "lastname": "L"}
+        for i in range(1, count + 1)
+    ])
+    for contact in Contact.query:
+        contact.updated_at = updated_at(int(contact.hubspot_id))
+    db_session.commit()
+
+
+def pages(client, path, limit):
+    cursor, seen = None, []
+    while True:
+        response = client.get(path, query_string={"limit": limit, "cursor": cursor} if cursor else {"limit": limit})
+        assert response.status_code == 200
+        body = response.get_json()
+        seen.append([item["hubspot_id"] for item in body["results"]])
+        cursor = body["pagination"]["next_cursor"]
+        if cursor is None:
+            return seen
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor("contacts", u="2024-01-01T12:00:00", i=7)
+
+    assert decode_cursor("contacts", cursor) == {"u": "2024-01-01T12:00:00", "i": 7}
+    assert "=" not in cursor
+    assert decode_cursor("contacts", "") is None
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!", encode_cursor("deals", u="x", i=1), "bnVsbA"])
+def test_cursor_for_another_type_or_malformed_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor("contacts", cursor)
+
+
+def test_pages_cover_every_row_once_newest_first(client, db_session):
+    add_contacts(db_session, 5, lambda i: NOW + timedelta(minutes=i))
+
+    assert pages(client, "/api/v1/contacts", 2) == [["5", "4"], ["3", "2"], ["1"]]
+
+
+def test_rows_with_the_same_updated_at_are_ordered_by_id(client, db_session):
+    add_contacts(db_session, 5)
+
+    assert sum(pages(client, "/api/v1/contacts", 2), []) == ["5", "4", "3", "2", "1"]
+
+
+def test_rows_changed_after_the_first_page_do_not_shift_later_pages(client, db_session):
+    add_contacts(db_session, 4, lambda i: NOW + timedelta(minutes=i))
+    first = client.get("/api/v1/contacts", query_string={"limit": 2}).get_json()
+
+    upsert_contacts([{"hubspot_id": "9", "email": "new@example.com", "firstname": "New", "lastname": "L"}])
+    second = client.get("/api/v1/contacts", query_string={"limit": 2, "cursor": first["pagination"]["next_cursor"]})
+
+    assert [item["hubspot_id"] for item in second.get_json()["results"]] == ["2", "1"]
+
+
+def test_invalid_cursor_is_a_bad_request(client, db_session):
+    response = client.get("/api/v1/contacts", query_string={"cursor": encode_cursor("deals", u="x", i=1)})
+
+    assert response.status_code == 400
+
+
+def test_hubspot_contact_id_filter(client, db_session):
+    add_contacts(db_session, 2)
+    ids = dict(db_session.query(Contact.hubspot_id, Contact.id))
+    upsert_deals([
+        {"hubspot_id": "101", "dealname": "A", "amount": 1, "dealstage": "won", "contact_id": ids["1"]},
+        {"hubspot_id": "102", "dealname": "B", "amount": 1, "dealstage": "won", "contact_id": ids["2"]},
+    ])
+
+    response = client.get("/api/v1/deals", query_string={"hubspot_contact_id": "2"})
+
+    assert [item["hubspot_id"] for item in response.get_json()["results"]] == ["102"]
+    assert client.get("/api/v1/deals", query_string={"hubspot_contact_id": "abc"}).status_code == 400
+
+
+def test_read_filters_keeps_hubspot_contact_id_as_a_string():
+    assert read_filters({"hubspot_contact_id": "0042"}) == {"hubspot_contact_id": "0042"}
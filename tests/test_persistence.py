@@ -0,0 +1,102 @@
+from models.models import Contact, Deal
+from services.persistence import local_contact_ids, upsert_contacts, upsert_deals
+
+
+def contact(hubspot_id, email, firstname="Ada"):
+    return {"hubspot_id": hubspot_id, "email": email, "firstname": firstname, "lastname": "Lovelace"}
+
+
+def test_upsert_inserts_then_updates_on_conflict(db_session):
+    [inserted] = upsert_contacts([contact("1", "ada@example.com")])
+    [updated] = upsert_contacts([dict(contact("1", "ada@example.com", "Augusta"), phone="555")])
+
+    assert updated["id"] == inserted["id"]
+    assert updated["firstname"] == "Augusta"
+    assert updated["created_at"] == inserted["created_at"]
+    assert updated["updated_at"] >= inserted["updated_at"]
+    assert Contact.query.count() == 1
+
+
+def test_upsert_keeps_last_duplicate_and_drops_unknown_keys(db_session):
+    stored = upsert_contacts([
+        contact("1", "ada@example.com", "First"),
+        dict(contact("1", "ada@example.com", "Last"), not_a_column="x"),
+        contact("2", "grace@example.com"),
+    ])
+
+    assert sorted(row["hubspot_id"] for row in stored) == ["1", "2"]
+    assert db_session.query(Contact.firstname).filter_by(hubspot_id="1").scalar() == "Last"
+
+
+def test_upsert_without_commit_rolls_back_with_the_session(db_session):
+    upsert_contacts([contact("1", "ada@example.com")], commit=False)
+    db_session.rollback()
+
+    assert Contact.query.count() == 0
+
+
+def test_email_moved_to_a_new_hubspot_id_rekeys_the_stored_contact(db_session):
+    [old] = upsert_contacts([contact("1", "ada@example.com")])
+    [new] = upsert_contacts([contact("9", "ada@example.com", "Merged")])
+
+    assert new["id"] == old["id"]
+    assert new["hubspot_id"] == "9"
+    assert new["firstname"] == "Merged"
+    assert Contact.query.count() == 1
+
+
+def test_email_held_by_another_stored_contact_is_skipped(db_session):
+    upsert_contacts([contact("1", "ada@example.com"), contact("2", "grace@example.com")])
+
+    stored = upsert_contacts([contact("2", "ada@example.com"), contact("3", "alan@example.com")])
+
+    assert [row["hubspot_id"] for row in stored] == ["3"]
+    assert db_session.query(Contact.email).filter_by(hubspot_id="2").scalar() == "grace@example.com"
+
+
+def test_last_row_per_email_wins_within_a_batch(db_session):
+    stored = upsert_contacts([contact("1", "ada@example.com", "First"), contact("2", "ada@example.com", "Last")])
+
+    assert [(row["hubspot_id"], row["firstname"]) for row in stored] == [("2", "Last")]
+
+
+def test_local_contact_ids_maps_stored_hubspot_ids_only(db_session):
+    [stored] = upsert_contacts([contact("1", "ada@example.com")])
+
+    assert local_contact_ids([1, "1", "404", None]) == {"1": stored["id"]}
+    assert local_contact_ids([]) == {}
+
+
+def test_post_deal_stores_the_local_id_of_its_hubspot_contact(client, fake_hubspot):
+    created = client.post("/api/v1/contacts", json={
+        "email": "ada@example.com", "firstname": "Ada", "lastname": "Lovelace", "phone": "555",
+    })
+    assert created.status_code == 201
+    vid = int(created.get_json()["hubspot_id"])
+
+    response = client.post("/api/v1/deals", json={
+        "dealname": "Engine", "amount": 100, "dealstage": "appointmentscheduled", "contact_id": vid,
+    })
+
+    assert response.status_code == 201
+    deal = Deal.query.filter_by(hubspot_id=response.get_json()["hubspot_id"]).one()
+    assert deal.contact_id == created.get_json()["id"]
+    assert fake_hubspot.deal_contacts[deal.hubspot_id] == [str(vid)]
+
+
+def test_post_deal_for_an_unsynced_contact_stores_no_contact(client):
+    response = client.post("/api/v1/deals", json={
+        "dealname": "Engine", "amount": 100, "dealstage": "appointmentscheduled", "contact_id": 1,
+    })
+
+    assert response.status_code == 201
+    assert Deal.query.filter_by(hubspot_id=response.get_json()["hubspot_id"]).one().contact_id is None
+
+
+def test_upsert_deals_keeps_contact_reference(db_session):
+    [stored_contact] = upsert_contacts([contact("1", "ada@example.com")])
+    [deal] = upsert_deals([{
+        "hubspot_id": "10", "dealname": "Engine", "amount": 1, "dealstage": "won", "contact_id": stored_contact["id"],
+    }])
+
+    assert deal["contact_id"] == stored_contact["id"]
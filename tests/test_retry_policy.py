@@ -0,0 +1,54 @@
+import pytest
+from services.hubspot_ratelimit import RetryPolicy
+
+policy = RetryPolicy(max_retries=3, backoff_factor=2.0, backoff_multiplier=1.0, max_backoff=60.0)
+
+
+@pytest.mark.parametrize("method, path, status, headers, expected", [
+    ("GET", "/crm/v3/objects/contacts", 500, None, True),
+    ("GET", "/crm/v3/objects/contacts", 502, None, True),
+    ("GET", "/crm/v3/objects/contacts", 404, None, False),
+    ("POST", "/crm/v3/objects/contacts/search", 502, None, True),
+    ("POST", "/crm/v3/objects/contacts/batch/read", 500, None, True),
+    ("POST", "/deals/v1/deal", 429, None, True),
+    ("POST", "/deals/v1/deal", 500, None, False),
+    ("POST", "/deals/v1/deal", 502, None, False),
+    ("POST", "/deals/v1/deal", 504, None, False),
+    ("POST", "/deals/v1/deal", 503, None, False),
+    ("POST", "/deals/v1/deal", 503, {"Retry-After": "2"}, True),
+    ("POST", "/crm/v3/objects/deals/batch/create", 500, None, False),
+])
+def test_should_retry(method, path, status, headers, expected):
+    assert policy.should_retry(method, status, 0, headers, path) is expected
+
+
+def test_should_retry_stops_after_max_retries():
+    assert not policy.should_retry("GET", 500, 3, path="/crm/v3/objects/contacts")
+    assert not policy.should_retry("POST", 429, 3, path="/deals/v1/deal")
+
+
+@pytest.mark.parametrize("method, path, connect_error, expected", [
+    ("GET", "/crm/v3/objects/contacts", False, True),
+    ("POST", "/crm/v3/objects/contacts/search", False, True),
+    ("POST", "/deals/v1/deal", False, False),
+    ("POST", "/deals/v1/deal", True, True),
+])
+def test_can_retry_error(method, path, connect_error, expected):
+    assert policy.can_retry_error(method, 0, connect_error, path) is expected
+
+
+def test_search_query_string_is_ignored():
+    assert policy.idempotent("POST", "/crm/v3/objects/contacts/search?limit=10")
+    assert not policy.idempotent("POST", None)
+
+
+def test_delay_honours_retry_after_up_to_max_backoff():
+    assert policy.delay(0, {"Retry-After": "5"}) == 5
+    assert policy.delay(0, {"Retry-After": "600"}) == 60
+
+
+def test_delay_is_jittered_exponential_backoff():
+    for attempt in range(4):
+        backoff = 2.0 ** attempt
+        assert backoff / 2 <= policy.delay(attempt) <= backoff
+    assert policy.delay(10) <= 60
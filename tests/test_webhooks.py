@@ -0,0 +1,85 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+from models.models import Contact
+from services.hubspot_webhooks import verify_signature
+from services.persistence import upsert_contacts
+
+URL = "http://localhost/api/v1/webhooks/hubspot"
+
+
+def sign(secret, body, uri=URL, method="POST", timestamp=None):
+    timestamp = timestamp or str(int(time.time() * 1000))
+    message = f"{method}{uri}".encode() + body + timestamp.encode()
+    signature = base64.b64encode(hmac.new(secret.encode(), message, hashlib.sha256).digest()).decode()
+    return {"X-HubSpot-Request-Timestamp": timestamp, "X-HubSpot-Signature-v3": signature}
+
+
+def deliver(client, app, events, headers=None):
+    body = json.dumps(events).encode()
+    headers = headers or sign(app.config["HUBSPOT_CLIENT_SECRET"], body)
+    return client.post("/api/v1/webhooks/hubspot", data=body, headers=dict(headers, **{"Content-Type": "application/json"}))
+
+
+def email_change(event_id, object_id="1", email="new@example.com"):
+    return {"eventId": event_id, "subscriptionType": "contact.propertyChange", "objectId": object_id,
+            "propertyName": "email", "propertyValue": email, "occurredAt": int(time.time() * 1000)}
+
+
+def test_verify_signature_accepts_hubspots_signature():
+    body = b'[{"eventId": 1}]'
+    headers = sign("secret", body)
+
+    assert verify_signature("secret", "POST", URL, body, headers["X-HubSpot-Request-Timestamp"],
+                            headers["X-HubSpot-Signature-v3"])
+
+
+def test_verify_signature_decodes_escaped_uri_characters():
+    body = b"[]"
+    headers = sign("secret", body, uri=f"{URL}?portal=1:2")
+
+    assert verify_signature("secret", "POST", f"{URL}?portal=1%3A2", body, headers["X-HubSpot-Request-Timestamp"],
+                            headers["X-HubSpot-Signature-v3"])
+
+
+def test_verify_signature_rejects_tampering_and_old_or_missing_headers():
+    body = b"[]"
+    headers = sign("secret", body)
+    timestamp, signature = headers["X-HubSpot-Request-Timestamp"], headers["X-HubSpot-Signature-v3"]
+    old = sign("secret", body, timestamp=str(int((time.time() - 600) * 1000)))
+
+    assert not verify_signature("other", "POST", URL, body, timestamp, signature)
+    assert not verify_signature("secret", "POST", URL, b"[{}]", timestamp, signature)
+    assert not verify_signature("secret", "POST", URL + "x", body, timestamp, signature)
+    assert not verify_signature("secret", "POST", URL, body, old["X-HubSpot-Request-Timestamp"],
+                                old["X-HubSpot-Signature-v3"])
+    assert not verify_signature("secret", "POST", URL, body, None, signature)
+    assert not verify_signature("secret", "POST", URL, body, "not-a-number", signature)
+    assert not verify_signature("", "POST", URL, body, timestamp, signature)
+
+
+def test_signed_delivery_is_applied_once(client, app):
+    upsert_contacts([{"hubspot_id": "1", "email": "old@example.com", "firstname": "Ada", "lastname": "L"}])
+
+    first = deliver(client, app, [email_change(1)])
+    again = deliver(client, app, [email_change(1)])
+
+    assert first.status_code == 200
+    assert first.get_json() == {"received": 1, "duplicates": 0, "updated": 1, "fetched": 0}
+    assert again.get_json()["duplicates"] == 1
+    assert Contact.query.filter_by(hubspot_id="1").one().email == "new@example.com"
+
+
+def test_unsigned_or_forged_delivery_is_rejected(client, app):
+    upsert_contacts([{"hubspot_id": "1", "email": "old@example.com", "firstname": "Ada", "lastname": "L"}])
+    forged = sign("not-the-client-secret", json.dumps([email_change(1)]).encode())
+
+    assert deliver(client, app, [email_change(1)], headers={"X-HubSpot-Signature-v3": "x"}).status_code == 401
+    assert deliver(client, app, [email_change(1)], headers=forged).status_code == 401
+    assert Contact.query.filter_by(hubspot_id="1").one().email == "old@example.com"
+
+
+def test_malformed_events_are_a_bad_request(client, app):
+    assert deliver(client, app, {"eventId": 1}).status_code == 400